@@ -1,38 +1,24 @@
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import pandas as pd
-from sqlalchemy import create_engine, text
-import pymysql
 import matplotlib.pyplot as plt
 import seaborn as sns
-from config import MYSQL_CONFIG
+from config import (USE_SUMMARY_TABLES, ANALYSIS_QUERY_WORKERS, ANALYSIS_RENDER_WORKERS, SNAPSHOT_DIR, ANALYSIS_DIR,
+                    RENDER_FORMATS)
+from db import get_engine, print_pool_metrics
+from summaries import summaries_available
+from query_cache import get_query_cache, data_version
+from instrumentation import run_report, stage
+from render import figure_digest, up_to_date, render_figure
 import os
-from pathlib import Path
 
 # Create analysis_results directory
-ANALYSIS_DIR = Path(__file__).resolve().parent.parent / "analysis_results"
-ANALYSIS_DIR.mkdir(exist_ok=True)
+ANALYSIS_DIR.mkdir(parents=True, exist_ok=True)
 
-def get_mysql_engine():
-    try:
-        connection_str = f"mysql+pymysql://{MYSQL_CONFIG['user']}:{MYSQL_CONFIG['password']}@" \
-                        f"{MYSQL_CONFIG['host']}:{MYSQL_CONFIG['port']}/{MYSQL_CONFIG['database']}"
-        engine = create_engine(connection_str, echo=False)
-        return engine
-    except Exception as e:
-        print(f"Error connecting to database: {e}")
-        raise
-
-def execute_query(engine, query):
-    """Execute a SQL query and return results as a pandas DataFrame"""
-    try:
-        with engine.connect() as conn:
-            return pd.read_sql(query, conn)
-    except Exception as e:
-        print(f"Error executing query: {e}")
-        raise
-
-def analyze_medals_by_country():
-    """Analyze medal counts by country"""
-    query = """
+# SQL behind each analysis, by analysis name
+QUERIES = {
+    'medals_by_country': """
     SELECT 
         c.Region as Country,
         COUNT(CASE WHEN r.medal = 'Gold' THEN 1 END) as Gold,
@@ -45,14 +31,143 @@ def analyze_medals_by_country():
     GROUP BY c.Region
     ORDER BY Total_Medals DESC
     LIMIT 10;
+    """,
+    'athlete_performance': """
+    SELECT 
+        g.year,
+        g.season,
+        COUNT(DISTINCT r.athlete_id) as Total_Athletes,
+        AVG(r.age) as Avg_Age,
+        AVG(r.height_cm) as Avg_Height,
+        AVG(r.weight_kg) as Avg_Weight
+    FROM results r
+    JOIN games g ON r.game_id = g.game_id
+    GROUP BY g.year, g.season
+    ORDER BY g.year;
+    """,
+    'sports_distribution': """
+    SELECT 
+        s.sport_name,
+        COUNT(DISTINCT e.event_id) as Event_Count,
+        COUNT(DISTINCT r.athlete_id) as Athlete_Count
+    FROM sports s
+    LEFT JOIN events e ON s.sport_id = e.sport_id
+    LEFT JOIN results r ON e.event_id = r.event_id
+    GROUP BY s.sport_name
+    ORDER BY Event_Count DESC;
+    """,
+    'gender_distribution': """
+    SELECT 
+        g.year,
+        g.season,
+        a.sex,
+        COUNT(DISTINCT r.athlete_id) as Athlete_Count
+    FROM results r
+    JOIN games g ON r.game_id = g.game_id
+    JOIN athletes a ON r.athlete_id = a.athlete_id
+    GROUP BY g.year, g.season, a.sex
+    ORDER BY g.year;
     """
-    
-    df = execute_query(get_mysql_engine(), query)
-    print("\nTop 10 Countries by Total Medals:")
+}
+
+# The same analyses answered from the summary tables built by summaries.py
+SUMMARY_QUERIES = {
+    'medals_by_country': """
+    SELECT 
+        Region as Country,
+        SUM(CASE WHEN medal = 'Gold' THEN medal_count ELSE 0 END) as Gold,
+        SUM(CASE WHEN medal = 'Silver' THEN medal_count ELSE 0 END) as Silver,
+        SUM(CASE WHEN medal = 'Bronze' THEN medal_count ELSE 0 END) as Bronze,
+        SUM(medal_count) as Total_Medals
+    FROM summary_medals
+    GROUP BY Region
+    ORDER BY Total_Medals DESC
+    LIMIT 10;
+    """,
+    'athlete_performance': """
+    SELECT 
+        year,
+        season,
+        SUM(athlete_count) as Total_Athletes,
+        SUM(age_sum) / SUM(age_count) as Avg_Age,
+        SUM(height_sum) / SUM(height_count) as Avg_Height,
+        SUM(weight_sum) / SUM(weight_count) as Avg_Weight
+    FROM summary_participation
+    GROUP BY year, season
+    ORDER BY year;
+    """,
+    'sports_distribution': """
+    SELECT 
+        sport_name,
+        event_count as Event_Count,
+        athlete_count as Athlete_Count
+    FROM summary_sports
+    ORDER BY Event_Count DESC;
+    """,
+    'gender_distribution': """
+    SELECT 
+        year,
+        season,
+        sex,
+        SUM(athlete_count) as Athlete_Count
+    FROM summary_participation
+    WHERE has_athlete = 1
+    GROUP BY year, season, sex
+    ORDER BY year;
+    """
+}
+
+def execute_query(engine, query):
+    """Execute a SQL query and return results as a pandas DataFrame.
+
+    Results are served from the on-disk query cache while the data version
+    stamped by load and clean is unchanged.
+    """
+    try:
+        cache = get_query_cache()
+        version = data_version(engine) if cache is not None else None
+        if version is not None:
+            key = cache.key(engine, query, version)
+            df = cache.get(key)
+            if df is not None:
+                return df
+
+        with engine.connect() as conn:
+            df = pd.read_sql(query, conn)
+
+        if version is not None:
+            cache.put(key, df)
+        return df
+    except Exception as e:
+        print(f"Error executing query: {e}")
+        raise
+
+def analysis_query(engine, name):
+    """SQL for an analysis, read from the summary tables when they exist"""
+    if USE_SUMMARY_TABLES and summaries_available(engine):
+        return SUMMARY_QUERIES[name]
+    return QUERIES[name]
+
+def fetch_analysis(name, snapshot_dir=None):
+    """Run the query behind an analysis on the shared engine, or compute it
+    from the Parquet snapshot in ``snapshot_dir`` without a database"""
+    with stage(f"query {name}") as current:
+        if snapshot_dir is not None:
+            from snapshot import snapshot_analysis
+            df = snapshot_analysis(name, snapshot_dir)
+        else:
+            engine = get_engine()
+            df = execute_query(engine, analysis_query(engine, name))
+        current.rows = len(df)
+    return df
+
+def print_analysis(name, df):
+    print(f"\n{ANALYSES[name][0]}:")
     print(df)
-    
+
+def plot_medals_by_country(df):
+    """Plot medal counts by country"""
     # Create a bar plot
-    plt.figure(figsize=(12, 6))
     df_melted = pd.melt(df, id_vars=['Country'], 
                         value_vars=['Gold', 'Silver', 'Bronze'],
                         var_name='Medal Type', value_name='Count')
@@ -76,32 +191,10 @@ def analyze_medals_by_country():
     plt.title('Medal Distribution for Top 10 Countries')
     plt.xticks(rotation=45, ha='right')
     plt.tight_layout()
-    plt.savefig(ANALYSIS_DIR / 'medals_by_country.png')
-    plt.close()
 
-def analyze_athlete_performance():
-    """Analyze athlete performance over time"""
-    query = """
-    SELECT 
-        g.year,
-        g.season,
-        COUNT(DISTINCT r.athlete_id) as Total_Athletes,
-        AVG(r.age) as Avg_Age,
-        AVG(r.height_cm) as Avg_Height,
-        AVG(r.weight_kg) as Avg_Weight
-    FROM results r
-    JOIN games g ON r.game_id = g.game_id
-    GROUP BY g.year, g.season
-    ORDER BY g.year;
-    """
-    
-    df = execute_query(get_mysql_engine(), query)
-    print("\nAthlete Statistics Over Time:")
-    print(df)
-    
+def plot_athlete_performance(df):
+    """Plot athlete statistics over time"""
     # Create line plots for trends
-    plt.figure(figsize=(15, 10))
-    
     plt.subplot(2, 2, 1)
     plt.plot(df['year'], df['Total_Athletes'])
     plt.title('Number of Athletes Over Time')
@@ -127,58 +220,19 @@ def analyze_athlete_performance():
     plt.ylabel('Average Weight (kg)')
     
     plt.tight_layout()
-    plt.savefig(ANALYSIS_DIR / 'athlete_trends.png')
-    plt.close()
 
-def analyze_sports_distribution():
-    """Analyze the distribution of sports and events"""
-    query = """
-    SELECT 
-        s.sport_name,
-        COUNT(DISTINCT e.event_id) as Event_Count,
-        COUNT(DISTINCT r.athlete_id) as Athlete_Count
-    FROM sports s
-    LEFT JOIN events e ON s.sport_id = e.sport_id
-    LEFT JOIN results r ON e.event_id = r.event_id
-    GROUP BY s.sport_name
-    ORDER BY Event_Count DESC;
-    """
-    
-    df = execute_query(get_mysql_engine(), query)
-    print("\nSports Distribution:")
-    print(df)
-    
+def plot_sports_distribution(df):
+    """Plot the distribution of sports and events"""
     # Create a horizontal bar plot
-    plt.figure(figsize=(12, 8))
     sns.barplot(data=df.head(15), y='sport_name', x='Event_Count')
     plt.title('Top 15 Sports by Number of Events')
     plt.xlabel('Number of Events')
     plt.ylabel('Sport')
     plt.tight_layout()
-    plt.savefig(ANALYSIS_DIR / 'sports_distribution.png')
-    plt.close()
 
-def analyze_gender_distribution():
-    """Analyze gender participation over time"""
-    query = """
-    SELECT 
-        g.year,
-        g.season,
-        a.sex,
-        COUNT(DISTINCT r.athlete_id) as Athlete_Count
-    FROM results r
-    JOIN games g ON r.game_id = g.game_id
-    JOIN athletes a ON r.athlete_id = a.athlete_id
-    GROUP BY g.year, g.season, a.sex
-    ORDER BY g.year;
-    """
-    
-    df = execute_query(get_mysql_engine(), query)
-    print("\nGender Distribution Over Time:")
-    print(df)
-    
+def plot_gender_distribution(df):
+    """Plot gender participation over time"""
     # Create a line plot
-    plt.figure(figsize=(12, 6))
     for sex in df['sex'].unique():
         sex_data = df[df['sex'] == sex]
         plt.plot(sex_data['year'], sex_data['Athlete_Count'], label=sex)
@@ -189,25 +243,127 @@ def analyze_gender_distribution():
     plt.legend()
     plt.grid(True)
     plt.tight_layout()
-    plt.savefig(ANALYSIS_DIR / 'gender_distribution.png')
-    plt.close()
 
-def main():
+# Independent analyses run by main: name -> (heading printed with the
+# results, plot function, output file name without extension, figure size).
+# The query runs in a thread and the plot function in a worker process, so it
+# must be a module-level function of the DataFrame drawing onto the current
+# figure; render.py creates and saves the figure.
+ANALYSES = {
+    'medals_by_country': ('Top 10 Countries by Total Medals', plot_medals_by_country,
+                          'medals_by_country', (12, 6)),
+    'athlete_performance': ('Athlete Statistics Over Time', plot_athlete_performance,
+                            'athlete_trends', (15, 10)),
+    'sports_distribution': ('Sports Distribution', plot_sports_distribution,
+                            'sports_distribution', (12, 8)),
+    'gender_distribution': ('Gender Distribution Over Time', plot_gender_distribution,
+                            'gender_distribution', (12, 6))
+}
+
+def stale_render(name, df, formats=RENDER_FORMATS, force=False):
+    """Arguments of render_figure for an analysis whose figure must be
+    redrawn, or None if its data and plot spec are unchanged since its last
+    render"""
+    _, plot, output, figsize = ANALYSES[name]
+    digest = figure_digest(plot, df, figsize, formats)
+    if not force and up_to_date(output, digest, ANALYSIS_DIR, formats):
+        print(f"{output}: unchanged, not re-rendered")
+        return None
+    return plot, df, output, figsize, digest, ANALYSIS_DIR, formats
+
+def run_analysis(name, snapshot_dir=None, formats=RENDER_FORMATS, force_render=False):
+    """Query, print and plot one analysis in the calling thread"""
+    df = fetch_analysis(name, snapshot_dir)
+    print_analysis(name, df)
+    with stage(f"render {name}"):
+        render = stale_render(name, df, formats, force_render)
+        if render is not None:
+            render_figure(*render)
+
+def analyze_medals_by_country():
+    """Analyze medal counts by country"""
+    run_analysis('medals_by_country')
+
+def analyze_athlete_performance():
+    """Analyze athlete performance over time"""
+    run_analysis('athlete_performance')
+
+def analyze_sports_distribution():
+    """Analyze the distribution of sports and events"""
+    run_analysis('sports_distribution')
+
+def analyze_gender_distribution():
+    """Analyze gender participation over time"""
+    run_analysis('gender_distribution')
+
+def _init_renderer():
+    # Worker processes only write files, so they never need a display
+    plt.switch_backend('Agg')
+
+def run_analyses_concurrently(names=None, query_workers=ANALYSIS_QUERY_WORKERS,
+                              render_workers=ANALYSIS_RENDER_WORKERS, snapshot_dir=None,
+                              formats=RENDER_FORMATS, force_render=False):
+    """Run analyses with their queries on a thread pool and their plots on a
+    process pool.
+
+    Each figure is handed to a renderer as soon as its query returns, so the
+    wall time is close to that of the slowest single analysis. Figures whose
+    data and plot spec are unchanged are not sent to a renderer at all.
+    Renderers are spawned rather than forked because the parent holds open
+    pooled connections and running query threads.
+    """
+    names = list(names or ANALYSES)
+    render_workers = render_workers or min(len(names), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=query_workers) as queries, \
+         ProcessPoolExecutor(max_workers=render_workers,
+                             mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_renderer) as renderers:
+        fetches = {queries.submit(fetch_analysis, name, snapshot_dir): name for name in names}
+        renders = {}
+        for future in as_completed(fetches):
+            name = fetches[future]
+            df = future.result()
+            print_analysis(name, df)
+            render = stale_render(name, df, formats, force_render)
+            if render is not None:
+                renders[renderers.submit(render_figure, *render)] = name
+        # Renders run in other processes; this stage times the wait for the
+        # ones still running after the last query returned
+        with stage('render'):
+            for future in as_completed(renders):
+                future.result()
+
+def main(sequential=False, snapshot_dir=None, formats=RENDER_FORMATS, force_render=False):
     print("Starting data analysis...")
     
     try:
-        # Run all analyses
-        analyze_medals_by_country()
-        analyze_athlete_performance()
-        analyze_sports_distribution()
-        analyze_gender_distribution()
+        if sequential:
+            # Run all analyses one after another
+            for name in ANALYSES:
+                run_analysis(name, snapshot_dir, formats, force_render)
+        else:
+            run_analyses_concurrently(snapshot_dir=snapshot_dir, formats=formats, force_render=force_render)
         
         print("\nData analysis completed successfully!")
         print(f"Analysis results have been saved to: {ANALYSIS_DIR}")
+        if snapshot_dir is None:
+            print_pool_metrics()
         
     except Exception as e:
         print(f"Error during data analysis: {e}")
         raise
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run the Olympics analyses and save their plots")
+    parser.add_argument('--sequential', action='store_true',
+                        help="run the analyses one after another in this process")
+    parser.add_argument('--snapshot', nargs='?', const=SNAPSHOT_DIR, default=None, metavar='DIR',
+                        help="compute the analyses from a Parquet snapshot instead of MySQL")
+    parser.add_argument('--formats', nargs='+', default=RENDER_FORMATS, metavar='FORMAT',
+                        help="file formats to save each figure in, e.g. png svg pdf")
+    parser.add_argument('--force-render', action='store_true',
+                        help="redraw every figure even if its data and plot spec are unchanged")
+    args = parser.parse_args()
+    with run_report('analyze', sequential=args.sequential, snapshot=args.snapshot, formats=args.formats):
+        main(sequential=args.sequential, snapshot_dir=args.snapshot, formats=args.formats,
+             force_render=args.force_render)
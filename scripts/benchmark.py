@@ -0,0 +1,180 @@
+import argparse
+import datetime
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+import pandas as pd
+from config import DB_BACKEND, BENCHMARK_SCALES, BENCHMARK_DIR, SYNTHETIC_BASE_ROWS
+from dialects import DIALECTS
+from generate_data import default_output
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def pipeline_steps(csv_path, load_mode='full', clean_method='sql'):
+    """(step, script arguments) of one pipeline run, in order"""
+    load = ['load_data.py', '--csv', csv_path] + (['--stream'] if load_mode == 'stream' else [])
+    return [
+        ('create_schema', ['create_schema.py']),
+        ('load', load),
+        ('clean', ['clean_data.py', '--method', clean_method]),
+        # Sequential, so each analysis gets its own query and render stages
+        ('analyze', ['analyze.py', '--sequential'])
+    ]
+
+def run_script(args, env, log_path, timeout=None):
+    """Run a pipeline script in a child process.
+
+    Returns its exit code, wall seconds and peak RSS in MB. The RSS comes
+    from the child's own resource usage (``os.wait4``), so it is not mixed
+    up with that of other steps. Linux carries the peak RSS over an exec,
+    so this process stays small: even the CSVs are generated in a child.
+    """
+    start = time.perf_counter()
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen([sys.executable, os.path.join(SCRIPTS_DIR, args[0])] + args[1:],
+                                   env=env, stdout=log, stderr=subprocess.STDOUT)
+        if hasattr(os, 'wait4') and timeout is None:
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+            peak_rss = usage.ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+        else:
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            peak_rss = None
+    return process.returncode, time.perf_counter() - start, peak_rss
+
+def latest_run_report(report_dir, script):
+    reports = sorted(glob.glob(os.path.join(report_dir, f"{script}-*.json")))
+    if not reports:
+        return None
+    with open(reports[-1]) as f:
+        return json.load(f)
+
+def step_results(scale, rows, step, script, code, seconds, peak_rss, report):
+    """Benchmark records of one step: the step itself and, for analyze.py,
+    each analysis from the stages of its run report"""
+    children_rss = report.get('children_peak_rss_mb') if report else None
+    records = [{
+        'scale': scale,
+        'rows': rows,
+        'step': step,
+        'status': 'ok' if code == 0 else f"failed ({code})",
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(rows / seconds, 1) if step in ('generate', 'load', 'clean') and seconds > 0 else None,
+        'peak_rss_mb': round(max(filter(None, [peak_rss, children_rss])), 1) if peak_rss or children_rss else None,
+        'sql_seconds': report['sql']['seconds'] if report else None
+    }]
+    if report and script == 'analyze':
+        for s in report['stages']:
+            name = s['name'].split('/')[-1]
+            if name.startswith(('query ', 'render ')):
+                records.append({
+                    'scale': scale,
+                    'rows': s['rows'],
+                    'step': f"analyze/{name}",
+                    'status': s['status'],
+                    'seconds': round(s['seconds'], 3),
+                    'rows_per_sec': None,
+                    'peak_rss_mb': s['peak_rss_mb'],
+                    'sql_seconds': s['sql_seconds']
+                })
+    return records
+
+def benchmark_scale(scale, backend, run_dir, load_mode='full', clean_method='sql', seed=42,
+                    keep_database=False, timeout=None):
+    """Generate (or reuse) the CSV of one scale and run the pipeline on it
+    against a fresh database. Stops at the first failing step."""
+    csv_path = default_output(scale)
+    rows = int(round(SYNTHETIC_BASE_ROWS * scale))
+    scale_dir = os.path.join(run_dir, f"{scale:g}x")
+    report_dir = os.path.join(scale_dir, 'run_reports')
+    os.makedirs(report_dir, exist_ok=True)
+
+    steps = pipeline_steps(csv_path, load_mode, clean_method)
+    if not os.path.exists(csv_path):
+        steps.insert(0, ('generate', ['generate_data.py', '--scale', f"{scale:g}", '--seed', str(seed)]))
+    env = dict(os.environ,
+               OLYMPICS_DB_BACKEND=backend,
+               OLYMPICS_RUN_REPORT_DIR=report_dir,
+               OLYMPICS_ANALYSIS_DIR=os.path.join(scale_dir, 'analysis_results'))
+    database = os.path.join(scale_dir, 'olympics.db')
+    if backend == 'sqlite':
+        env['OLYMPICS_SQLITE_PATH'] = database
+
+    records = []
+    for step, args in steps:
+        script = os.path.splitext(args[0])[0]
+        print(f"[{scale:g}x] {step}...", flush=True)
+        code, seconds, peak_rss = run_script(args, env, os.path.join(scale_dir, f"{step}.log"), timeout)
+        report = latest_run_report(report_dir, script)
+        records.extend(step_results(scale, rows, step, script, code, seconds, peak_rss, report))
+        print(f"[{scale:g}x] {step}: {seconds:.1f}s" + ("" if code == 0 else f", exit code {code}"), flush=True)
+        if code != 0:
+            print(f"[{scale:g}x] stopping; see {os.path.join(scale_dir, step + '.log')}")
+            break
+
+    if backend == 'sqlite' and not keep_database:
+        for path in glob.glob(database + '*'):
+            os.remove(path)
+    return records
+
+def print_results(results):
+    print("\nBenchmark results:")
+    print(f"{'Scale':>6} {'Step':<36} {'Rows':>12} {'Seconds':>10} {'Rows/sec':>12} {'Peak RSS MB':>12}  Status")
+    for r in results:
+        rows_per_sec = f"{r['rows_per_sec']:,.0f}" if r.get('rows_per_sec') else '-'
+        peak_rss = f"{r['peak_rss_mb']:,.1f}" if r.get('peak_rss_mb') else '-'
+        rows = f"{r['rows']:,}" if r.get('rows') is not None else '-'
+        print(f"{r['scale']:>5g}x {r['step']:<36} {rows:>12} {r['seconds']:>10.2f} {rows_per_sec:>12} "
+              f"{peak_rss:>12}  {r['status']}")
+
+def run_benchmark(scales=BENCHMARK_SCALES, backend=DB_BACKEND, load_mode='full', clean_method='sql',
+                  seed=42, keep_database=False, timeout=None):
+    """Run the pipeline at each scale and write the results to BENCHMARK_DIR
+    as JSON and CSV"""
+    stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    run_dir = os.path.join(BENCHMARK_DIR, f"{backend}-{stamp}")
+    os.makedirs(run_dir)
+    print(f"Benchmarking {backend} at {', '.join(f'{s:g}x' for s in scales)} into {run_dir}")
+    if backend == 'mysql':
+        print("Warning: the benchmark drops and recreates the tables of the configured MySQL database")
+
+    results = []
+    for scale in scales:
+        results.extend(benchmark_scale(scale, backend, run_dir, load_mode, clean_method, seed,
+                                       keep_database, timeout))
+
+    print_results(results)
+    with open(os.path.join(run_dir, 'benchmark.json'), 'w') as f:
+        json.dump({'backend': backend, 'load_mode': load_mode, 'clean_method': clean_method,
+                   'seed': seed, 'results': results}, f, indent=2)
+    pd.DataFrame(results).to_csv(os.path.join(run_dir, 'benchmark.csv'), index=False)
+    print(f"\nBenchmark results written to {run_dir}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic data at several scales")
+    parser.add_argument('--scales', type=float, nargs='+', default=BENCHMARK_SCALES,
+                        help="dataset sizes as multiples of the Kaggle dataset")
+    parser.add_argument('--backend', choices=sorted(DIALECTS), default=DB_BACKEND,
+                        help="database to run against; sqlite gets a fresh file per scale")
+    parser.add_argument('--load-mode', choices=['full', 'stream'], default='full',
+                        help="load_data.py mode")
+    parser.add_argument('--clean-method', choices=['sql', 'pandas'], default='sql',
+                        help="clean_data.py method")
+    parser.add_argument('--seed', type=int, default=42,
+                        help="seed for CSVs that still have to be generated")
+    parser.add_argument('--keep-database', action='store_true',
+                        help="keep each scale's SQLite database")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="seconds after which a step is killed")
+    args = parser.parse_args()
+    run_benchmark(args.scales, args.backend, args.load_mode, args.clean_method, args.seed,
+                  args.keep_database, args.timeout)
@@ -0,0 +1,186 @@
+import csv
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+import pandas as pd
+from dialects import get_dialect
+from instrumentation import add_rows_written
+from config import (BULK_WRITE_STRATEGIES, BULK_WRITE_DEFAULT_STRATEGY, BULK_WRITE_SMALL_TABLE_ROWS,
+                    BULK_WRITE_BATCH_SIZES)
+
+@dataclass
+class WriteStats:
+    """Timing of one table write"""
+    table: str
+    strategy: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds > 0 else float('inf')
+
+# Every write made in this process, in order
+write_log = []
+
+def _quoted_columns(engine, df):
+    preparer = engine.dialect.identifier_preparer
+    return ", ".join(preparer.quote(str(col)) for col in df.columns)
+
+def _placeholder(engine):
+    return "?" if engine.dialect.paramstyle == 'qmark' else "%s"
+
+def _python_rows(df):
+    """Yield rows as tuples of native Python values with NaN replaced by None"""
+    values = df.astype(object).where(df.notna(), None)
+    return values.itertuples(index=False, name=None)
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def write_to_sql(engine, df, table, batch_size):
+    """pandas' own row inserts; kept as a baseline and a last resort"""
+    df.to_sql(table, con=engine, if_exists='append', index=False, chunksize=batch_size)
+
+def write_multi_values(engine, df, table, batch_size):
+    """One INSERT ... VALUES (...), (...), ... statement per batch"""
+    columns = _quoted_columns(engine, df)
+    row_sql = "(" + ", ".join([_placeholder(engine)] * len(df.columns)) + ")"
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        for batch in _batches(_python_rows(df), batch_size):
+            sql = f"INSERT INTO {table} ({columns}) VALUES " + ", ".join([row_sql] * len(batch))
+            cursor.execute(sql, [value for row in batch for value in row])
+        conn.commit()
+    finally:
+        conn.close()
+
+def write_executemany(engine, df, table, batch_size):
+    """DBAPI executemany in batches; pymysql rewrites each batch into
+    multi-row INSERTs bounded by its max statement length"""
+    columns = _quoted_columns(engine, df)
+    placeholders = ", ".join([_placeholder(engine)] * len(df.columns))
+    sql = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        for batch in _batches(_python_rows(df), batch_size):
+            cursor.executemany(sql, batch)
+        conn.commit()
+    finally:
+        conn.close()
+
+def write_load_data_infile(engine, df, table, batch_size):
+    """Dump the frame to a temporary CSV and LOAD DATA LOCAL INFILE it.
+
+    Needs ``local_infile`` enabled on both the client connection and the
+    MySQL server.
+    """
+    out = df.copy()
+    for col in out.columns:
+        if not pd.api.types.is_numeric_dtype(out[col]):
+            # Backslash is MySQL's escape character in LOAD DATA
+            values = out[col].astype(object)
+            out[col] = values.where(values.isna(), values.astype(str).str.replace('\\', '\\\\', regex=False))
+
+    fd, path = tempfile.mkstemp(suffix='.csv', prefix=f"{table}_")
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+            out.to_csv(f, index=False, header=False, na_rep='\\N',
+                       quoting=csv.QUOTE_MINIMAL, lineterminator='\n')
+
+        sql = (
+            f"LOAD DATA LOCAL INFILE '{path.replace(os.sep, '/')}' INTO TABLE {table} "
+            "CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '\\\\' "
+            "LINES TERMINATED BY '\\n' "
+            f"({_quoted_columns(engine, df)})"
+        )
+        conn = engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+            conn.commit()
+        finally:
+            conn.close()
+    finally:
+        os.remove(path)
+
+STRATEGIES = {
+    'to_sql': write_to_sql,
+    'multi_values': write_multi_values,
+    'executemany': write_executemany,
+    'load_data_infile': write_load_data_infile
+}
+
+def choose_strategy(table, n_rows):
+    """Pick the write strategy for a table.
+
+    An explicit entry in ``BULK_WRITE_STRATEGIES`` wins; otherwise small
+    frames go through a single multi-row INSERT and everything else uses
+    the default strategy.
+    """
+    if table in BULK_WRITE_STRATEGIES:
+        return BULK_WRITE_STRATEGIES[table]
+    if n_rows <= BULK_WRITE_SMALL_TABLE_ROWS:
+        return 'multi_values'
+    return BULK_WRITE_DEFAULT_STRATEGY
+
+def bulk_write(engine, df, table, strategy=None):
+    """Append a DataFrame to a table through the bulk write layer.
+
+    Returns the ``WriteStats`` for the write. If LOAD DATA is refused by the
+    client or server, or the backend has no LOAD DATA, the write falls back
+    to executemany.
+    """
+    strategy = strategy or choose_strategy(table, len(df))
+    if strategy == 'load_data_infile' and not get_dialect(engine).supports_load_data:
+        strategy = 'executemany'
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown bulk write strategy: {strategy}")
+
+    if len(df) == 0:
+        stats = WriteStats(table, strategy, 0, 0.0)
+        write_log.append(stats)
+        return stats
+
+    start = time.perf_counter()
+    try:
+        STRATEGIES[strategy](engine, df, table, BULK_WRITE_BATCH_SIZES[strategy])
+    except Exception as e:
+        if strategy != 'load_data_infile':
+            raise
+        print(f"Warning: LOAD DATA LOCAL INFILE failed for {table} ({e}); falling back to executemany")
+        strategy = 'executemany'
+        start = time.perf_counter()
+        STRATEGIES[strategy](engine, df, table, BULK_WRITE_BATCH_SIZES[strategy])
+    stats = WriteStats(table, strategy, len(df), time.perf_counter() - start)
+    write_log.append(stats)
+    add_rows_written(stats.rows)
+
+    print(f"Wrote {stats.rows} rows to {table} via {stats.strategy} "
+          f"in {stats.seconds:.2f}s ({stats.rows_per_sec:,.0f} rows/sec)")
+    return stats
+
+def print_write_report():
+    """Print rows/sec per table and strategy for all writes so far"""
+    if not write_log:
+        return
+    totals = {}
+    for stats in write_log:
+        rows, seconds = totals.get((stats.table, stats.strategy), (0, 0.0))
+        totals[(stats.table, stats.strategy)] = (rows + stats.rows, seconds + stats.seconds)
+
+    print("\nBulk write summary:")
+    for (table, strategy), (rows, seconds) in totals.items():
+        rate = rows / seconds if seconds > 0 else float('inf')
+        print(f"  {table:<12} {strategy:<18} {rows:>10} rows {seconds:>8.2f}s {rate:>12,.0f} rows/sec")
@@ -1,21 +1,25 @@
 import pandas as pd
-import numpy as np
-from sqlalchemy import create_engine, text
-import pymysql
-from config import MYSQL_CONFIG, TABLE_DEPENDENCIES, TABLE_SCHEMAS
+import argparse
+from sqlalchemy import text, inspect
+from config import (CLEAN_WORKERS, OUTLIER_COLUMNS, OUTLIER_METHOD, OUTLIER_THRESHOLD, OUTLIER_GROUP_BY,
+                    OUTLIER_CHUNK_SIZE, CLEAN_CHUNK_SIZE)
+from db import get_engine, print_pool_metrics, reset_engine_after_fork
+from scheduler import run_dag
+from dtypes import read_table, read_table_chunks, fill_missing, memory_report
+from outliers import outlier_bounds, remove_outliers, sigma_bounds, RunningStats
+from bulk_writer import bulk_write, choose_strategy, print_write_report
+from dialects import execute_ddl
+from shadow_tables import TableSwap, shadow_ddl
+from sql_cleaning import clean_in_database
+from partitions import games_partition_filter
+from summaries import build_summaries, refresh_summaries
+from query_cache import bump_data_version
+from instrumentation import run_report, staged
 
-def get_mysql_engine():
-    try:
-        connection_str = f"mysql+pymysql://{MYSQL_CONFIG['user']}:{MYSQL_CONFIG['password']}@" \
-                        f"{MYSQL_CONFIG['host']}:{MYSQL_CONFIG['port']}/{MYSQL_CONFIG['database']}"
-        engine = create_engine(connection_str, echo=False)
-        return engine
-    except Exception as e:
-        print(f"Error connecting to database: {e}")
-        raise
-
-def load_data_from_db(engine):
-    """Load all relevant data from the database"""
+@staged('load tables', rows=lambda data: sum(len(df) for df in data.values()))
+def load_data_from_db(engine, skip=()):
+    """Load all relevant data from the database, except the tables in
+    ``skip``, over one connection"""
     print("Loading data from database...")
     
     queries = {
@@ -30,14 +34,16 @@ def load_data_from_db(engine):
     }
     
     data = {}
-    for table, query in queries.items():
-        try:
-            with engine.connect() as conn:
-                data[table] = pd.read_sql(query, conn)
-            print(f"Loaded {table} table")
-        except Exception as e:
-            print(f"Error loading {table} table: {e}")
-            raise
+    with engine.connect() as conn:
+        for table, query in queries.items():
+            if table in skip:
+                continue
+            try:
+                data[table] = read_table(query, conn, table)
+                print(f"Loaded {table} table")
+            except Exception as e:
+                print(f"Error loading {table} table: {e}")
+                raise
     
     return data
 
@@ -46,7 +52,7 @@ def clean_athletes_data(df):
     print("\nCleaning athletes data...")
     
     # Handle missing values
-    df['sex'] = df['sex'].fillna('Unknown')
+    df['sex'] = fill_missing(df['sex'], 'Unknown')
     
     # Remove any duplicate athlete IDs
     df = df.drop_duplicates(subset=['athlete_id'])
@@ -56,46 +62,106 @@ def clean_athletes_data(df):
     
     return df
 
-def clean_results_data(df, athletes_df):
-    """Clean results data"""
+def _add_group_columns(df, athletes_df, events_df, group_by):
+    """Add the athlete and event attributes named in ``group_by`` to results
+    rows; returns the names of the added columns"""
+    added = []
+    for key in group_by or []:
+        if key in df.columns:
+            continue
+        if athletes_df is not None and key in athletes_df.columns:
+            lookup = athletes_df.drop_duplicates(subset=['athlete_id']).set_index('athlete_id')[key]
+            df[key] = df['athlete_id'].map(lookup)
+        elif events_df is not None and key in events_df.columns:
+            df[key] = df['event_id'].map(events_df.set_index('event_id')[key])
+        else:
+            raise ValueError(f"Cannot group outliers by {key!r}")
+        added.append(key)
+    return added
+
+def _valid_results(df, athletes_df, events_df):
+    """Drop results of unknown athletes and add the outlier group columns;
+    returns the rows and the names of the added columns"""
+    # Remove results with invalid athlete IDs
+    valid_athlete_ids = athletes_df['athlete_id'].unique()
+    df = df[df['athlete_id'].isin(valid_athlete_ids)].copy()
+    return df, _add_group_columns(df, athletes_df, events_df, OUTLIER_GROUP_BY)
+
+def clean_results_data(df, athletes_df, events_df=None, bounds=None):
+    """Clean results data
+
+    ``bounds`` are (low, high) outlier bounds to use instead of those of
+    ``df``, e.g. when cleaning only the rows of newly loaded Games. Outliers
+    are judged per OUTLIER_GROUP_BY group, whose keys may come from
+    ``athletes_df`` and ``events_df``.
+    """
     print("\nCleaning results data...")
     
     # Handle missing values
-    df['medal'] = df['medal'].fillna('No Medal')
+    df['medal'] = fill_missing(df['medal'], 'No Medal')
     
-    # Remove results with invalid athlete IDs
-    valid_athlete_ids = athletes_df['athlete_id'].unique()
-    df = df[df['athlete_id'].isin(valid_athlete_ids)]
-    
-    # Handle outliers in age
-    df['age'] = pd.to_numeric(df['age'], errors='coerce')
-    age_mean = df['age'].mean()
-    age_std = df['age'].std()
-    df.loc[df['age'] > age_mean + 3*age_std, 'age'] = np.nan
-    df.loc[df['age'] < age_mean - 3*age_std, 'age'] = np.nan
-    
-    # Handle outliers in height
-    df['height_cm'] = pd.to_numeric(df['height_cm'], errors='coerce')
-    height_mean = df['height_cm'].mean()
-    height_std = df['height_cm'].std()
-    df.loc[df['height_cm'] > height_mean + 3*height_std, 'height_cm'] = np.nan
-    df.loc[df['height_cm'] < height_mean - 3*height_std, 'height_cm'] = np.nan
-    
-    # Handle outliers in weight
-    df['weight_kg'] = pd.to_numeric(df['weight_kg'], errors='coerce')
-    weight_mean = df['weight_kg'].mean()
-    weight_std = df['weight_kg'].std()
-    df.loc[df['weight_kg'] > weight_mean + 3*weight_std, 'weight_kg'] = np.nan
-    df.loc[df['weight_kg'] < weight_mean - 3*weight_std, 'weight_kg'] = np.nan
+    df, added = _valid_results(df, athletes_df, events_df)
     
-    return df
+    # Handle outliers in age, height and weight
+    if bounds is None:
+        bounds = outlier_bounds(df, OUTLIER_COLUMNS, OUTLIER_METHOD, OUTLIER_THRESHOLD, OUTLIER_GROUP_BY)
+    df, removed = remove_outliers(df, bounds, OUTLIER_GROUP_BY)
+    for col, count in removed.items():
+        print(f"  null {col} outliers: {count} rows")
+    
+    return df.drop(columns=added)
+
+def streamed_outlier_bounds(engine, athletes_df, events_df=None, chunksize=CLEAN_CHUNK_SIZE):
+    """Outlier bounds of the results rows clean_results_data keeps, read in
+    chunks.
+
+    Sigma bounds are accumulated with RunningStats; MAD and IQR bounds need
+    the measurement and group columns of every row in memory, though not
+    the rest of the table.
+    """
+    columns = {column['name'] for column in inspect(engine).get_columns('results')}
+    select = ['athlete_id', 'event_id'] + OUTLIER_COLUMNS + [key for key in OUTLIER_GROUP_BY if key in columns]
+    stats = RunningStats(OUTLIER_COLUMNS, OUTLIER_GROUP_BY) if OUTLIER_METHOD == 'sigma' else None
+    measurements = []
+    for chunk in read_table_chunks(f"SELECT {', '.join(select)} FROM results", engine, 'results', chunksize):
+        chunk, _ = _valid_results(chunk, athletes_df, events_df)
+        if stats is not None:
+            stats.update(chunk)
+        else:
+            measurements.append(chunk[OUTLIER_COLUMNS + list(OUTLIER_GROUP_BY)])
+    if stats is not None:
+        return stats.bounds(OUTLIER_THRESHOLD)
+    return outlier_bounds(pd.concat(measurements, ignore_index=True), OUTLIER_COLUMNS, OUTLIER_METHOD,
+                          OUTLIER_THRESHOLD, OUTLIER_GROUP_BY)
+
+def clean_results_chunks(engine, athletes_df, events_df=None, chunksize=CLEAN_CHUNK_SIZE):
+    """Clean results in two passes over a server-side cursor, yielding the
+    cleaned rows chunk by chunk.
+
+    The first pass computes the outlier bounds of the whole table and the
+    second cleans each chunk against them as clean_results_data would, so
+    memory stays at one chunk however large results grows. The reads start
+    when the first chunk is requested.
+    """
+    print("\nCleaning results data in chunks...")
+    bounds = streamed_outlier_bounds(engine, athletes_df, events_df, chunksize)
+    removed = dict.fromkeys(OUTLIER_COLUMNS, 0)
+    for chunk in read_table_chunks("SELECT * FROM results", engine, 'results', chunksize):
+        chunk['medal'] = fill_missing(chunk['medal'], 'No Medal')
+        chunk, added = _valid_results(chunk, athletes_df, events_df)
+        chunk, chunk_removed = remove_outliers(chunk, bounds, OUTLIER_GROUP_BY)
+        for col, count in chunk_removed.items():
+            removed[col] += count
+        yield chunk.drop(columns=added)
+    for col, count in removed.items():
+        print(f"  null {col} outliers: {count} rows")
 
 def clean_countries_data(df):
     """Clean countries data"""
     print("\nCleaning countries data...")
     
     # Handle missing values
-    df['Region'] = df['Region'].fillna('Unknown')
+    df['Region'] = fill_missing(df['Region'], 'Unknown')
     df['Notes'] = df['Notes'].fillna('')
     
     # Clean NOC codes
@@ -174,71 +240,211 @@ def clean_teams_data(df):
     
     return df
 
+# Cleaning step of each table and the tables whose cleaned data it needs;
+# steps without a dependency between them run concurrently (see scheduler.py)
+CLEANING_STEPS = {
+    'athletes': (clean_athletes_data, []),
+    'results': (clean_results_data, ['athletes', 'events']),
+    'countries': (clean_countries_data, []),
+    'sports': (clean_sports_data, []),
+    'events': (clean_events_data, ['sports']),
+    'games': (clean_games_data, ['cities']),
+    'cities': (clean_cities_data, []),
+    'teams': (clean_teams_data, [])
+}
+
+@staged('clean tables', rows=lambda cleaned: sum(len(df) for df in cleaned.values()))
+def clean_tables(data, max_workers=CLEAN_WORKERS):
+    """Clean every table in ``data`` on worker processes, giving each
+    dependent table the cleaned data of its parents"""
+    steps = {table: step for table, step in CLEANING_STEPS.items() if table in data}
+    return run_dag(steps, data, max_workers, initializer=reset_engine_after_fork)
+
+@staged('save cleaned data')
 def save_cleaned_data(engine, cleaned_data):
-    """Save cleaned data back to the database"""
+    """Save cleaned data back to the database.
+
+    The tables are loaded into shadow copies and swapped in together (see
+    shadow_tables.py): the analyses keep reading the previous tables until
+    the swap, and a failure leaves them as they were. A table's data may be
+    an iterable of chunks instead of one DataFrame.
+    """
     print("\nSaving cleaned data to database...")
-    
+    swap = TableSwap(engine, cleaned_data)
     try:
-        with engine.connect() as conn:
-            # Disable foreign key checks
-            conn.execute(text("SET FOREIGN_KEY_CHECKS = 0"))
-            
-            # Drop all tables first
-            for table in TABLE_DEPENDENCIES:
-                try:
-                    conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
-                    print(f"Dropped table {table}")
-                except Exception as e:
-                    print(f"Warning: Could not drop table {table}: {e}")
-            
-            # Create and populate tables in reverse order
-            for table in reversed(TABLE_DEPENDENCIES):
-                if table in cleaned_data:
-                    print(f"Saving {table}...")
-                    # Create table with proper schema
-                    conn.execute(text(TABLE_SCHEMAS[table]))
-                    
-                    # Insert data
-                    cleaned_data[table].to_sql(table, con=engine, if_exists='append', index=False)
-            
-            # Re-enable foreign key checks
-            conn.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
-            
+        for table in swap.tables:
+            print(f"Saving {table}...")
+            chunks = cleaned_data[table]
+            for df in [chunks] if isinstance(chunks, pd.DataFrame) else chunks:
+                swap.write(table, df)
+        swap.commit()
+
+        print_write_report()
         print("All cleaned data saved successfully!")
     except Exception as e:
         print(f"Error saving cleaned data: {e}")
-        # Make sure to re-enable foreign key checks even if there's an error
-        try:
-            with engine.connect() as conn:
-                conn.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
-        except:
-            pass
+        swap.discard()
         raise
 
-def main():
+def mark_games_cleaned(engine, game_ids=None):
+    """Flag Games in load_manifest as cleaned (all of them by default)"""
+    if 'load_manifest' not in inspect(engine).get_table_names():
+        return
+    query = "UPDATE load_manifest SET cleaned = 1"
+    if game_ids is not None:
+        query += f" WHERE game_id IN ({', '.join(str(int(game_id)) for game_id in game_ids)})"
+    with engine.begin() as conn:
+        conn.execute(text(query))
+
+def uncleaned_game_ids(engine):
+    """IDs of the Games loaded since the last clean"""
+    if 'load_manifest' not in inspect(engine).get_table_names():
+        raise RuntimeError("load_manifest not found; run a full load and clean first")
+    return list(pd.read_sql("SELECT game_id FROM load_manifest WHERE cleaned = 0", con=engine)['game_id'])
+
+@staged('outlier bounds')
+def results_outlier_bounds(engine):
+    """Outlier bounds over the whole results table.
+
+    Global sigma bounds come straight from SQL aggregates. Grouped sigma
+    bounds are accumulated chunk by chunk with RunningStats; MAD and IQR
+    bounds need the measurement columns of every row in memory.
+    """
+    if OUTLIER_METHOD == 'sigma' and not OUTLIER_GROUP_BY:
+        with engine.connect() as conn:
+            stats = pd.read_sql(
+                "SELECT " + ", ".join(f"AVG({col}) AS {col}_mean, STDDEV_SAMP({col}) AS {col}_std"
+                                      for col in OUTLIER_COLUMNS) + " FROM results", conn).iloc[0]
+        return sigma_bounds({col: stats[f"{col}_mean"] for col in OUTLIER_COLUMNS},
+                            {col: stats[f"{col}_std"] for col in OUTLIER_COLUMNS},
+                            OUTLIER_THRESHOLD)
+
+    # Group keys may be columns of results or of the athlete or event of a row
+    sources = {'results': 'r', 'athletes': 'a', 'events': 'e'}
+    joins = {'athletes': "LEFT JOIN athletes a ON r.athlete_id = a.athlete_id",
+             'events': "LEFT JOIN events e ON r.event_id = e.event_id"}
+    columns = {table: {column['name'] for column in inspect(engine).get_columns(table)} for table in sources}
+    select, needed = [f"r.{col}" for col in OUTLIER_COLUMNS], []
+    for key in OUTLIER_GROUP_BY:
+        table = next((table for table in sources if key in columns[table]), None)
+        if table is None:
+            raise ValueError(f"Cannot group outliers by {key!r}")
+        select.append(f"{sources[table]}.{key}")
+        if table in joins and table not in needed:
+            needed.append(table)
+    query = f"SELECT {', '.join(select)} FROM results r {' '.join(joins[table] for table in needed)}"
+
+    with engine.connect().execution_options(stream_results=True) as conn:
+        chunks = pd.read_sql(query, conn, chunksize=OUTLIER_CHUNK_SIZE)
+        if OUTLIER_METHOD == 'sigma':
+            stats = RunningStats(OUTLIER_COLUMNS, OUTLIER_GROUP_BY)
+            for chunk in chunks:
+                stats.update(chunk)
+            return stats.bounds(OUTLIER_THRESHOLD)
+        measurements = pd.concat(list(chunks), ignore_index=True)
+    return outlier_bounds(measurements, OUTLIER_COLUMNS, OUTLIER_METHOD, OUTLIER_THRESHOLD, OUTLIER_GROUP_BY)
+
+@staged('clean new games')
+def clean_new_games(engine, game_ids):
+    """Clean only the results of the given newly loaded Games with pandas.
+
+    Outliers are judged against bounds from the whole results table, and
+    the cleaned rows replace the originals in place, so the rest of the
+    history is never rewritten. They are bulk loaded into a staging table
+    first and swapped in with one DELETE and INSERT ... SELECT transaction,
+    so a failed write leaves the original rows in place. Dimension tables
+    are left as they are; a full clean covers those.
+    """
+    id_list = ", ".join(str(int(game_id)) for game_id in game_ids)
+    games_filter = f"game_id IN ({id_list})" + games_partition_filter(engine, game_ids)
+
+    with engine.connect() as conn:
+        results = read_table(f"SELECT * FROM results WHERE {games_filter}", conn, 'results')
+        athletes = read_table(
+            f"SELECT athlete_id, sex FROM athletes WHERE athlete_id IN "
+            f"(SELECT athlete_id FROM results WHERE game_id IN ({id_list}))", conn, 'athletes')
+        events = read_table("SELECT event_id, sport_id FROM events", conn, 'events')
+
+    cleaned = clean_results_data(results, athletes, events, results_outlier_bounds(engine))
+
+    staging = 'results__staging'
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+        execute_ddl(conn, shadow_ddl('results', {'results': staging}))
+        conn.commit()
+    try:
+        bulk_write(engine, cleaned, staging, choose_strategy('results', len(cleaned)))
+        columns = ", ".join(cleaned.columns)
+        with engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM results WHERE {games_filter}"))
+            conn.execute(text(f"INSERT INTO results ({columns}) SELECT {columns} FROM {staging}"))
+    finally:
+        with engine.connect() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+            conn.commit()
+    mark_games_cleaned(engine, game_ids)
+    print_write_report()
+
+def main(incremental=False, method='sql', stream=False, chunk_size=CLEAN_CHUNK_SIZE):
+    """Clean the database.
+
+    ``method='sql'`` cleans in place with set-based SQL (see sql_cleaning.py)
+    and falls back to pandas if that fails; ``method='pandas'`` round-trips
+    the tables through pandas. With ``stream`` the pandas path reads and
+    cleans results ``chunk_size`` rows at a time.
+    """
     print("Starting data cleaning process...")
     
     try:
         # Get database connection
-        engine = get_mysql_engine()
+        engine = get_engine()
+
+        game_ids = None
+        if incremental:
+            game_ids = uncleaned_game_ids(engine)
+            if not game_ids:
+                print("No newly loaded Games to clean.")
+                return
+            print(f"Cleaning results of {len(game_ids)} newly loaded Games...")
+
+        if method == 'sql':
+            try:
+                clean_in_database(engine, game_ids)
+                mark_games_cleaned(engine, game_ids)
+                if incremental:
+                    refresh_summaries(engine, game_ids)
+                else:
+                    build_summaries(engine)
+                bump_data_version(engine)
+                print("\nData cleaning process completed successfully!")
+                return
+            except Exception as e:
+                print(f"In-database cleaning failed ({e}); falling back to pandas")
+
+        if incremental:
+            clean_new_games(engine, game_ids)
+            refresh_summaries(engine, game_ids)
+            bump_data_version(engine)
+            print("\nIncremental data cleaning process completed successfully!")
+            return
         
         # Load data
-        data = load_data_from_db(engine)
+        data = load_data_from_db(engine, skip=['results'] if stream else [])
+        memory_report("loading the tables", data)
         
         # Clean each table
-        cleaned_data = {
-            'athletes': clean_athletes_data(data['athletes']),
-            'results': clean_results_data(data['results'], data['athletes']),
-            'countries': clean_countries_data(data['countries']),
-            'sports': clean_sports_data(data['sports']),
-            'events': clean_events_data(data['events'], data['sports']),
-            'games': clean_games_data(data['games'], data['cities']),
-            'cities': clean_cities_data(data['cities']),
-            'teams': clean_teams_data(data['teams'])
-        }
+        cleaned_data = clean_tables(data)
+        memory_report("cleaning", cleaned_data)
+        if stream:
+            # Cleaned while it is saved, after the athletes and events it needs
+            cleaned_data['results'] = clean_results_chunks(engine, cleaned_data['athletes'],
+                                                           cleaned_data['events'], chunk_size)
         
         # Save cleaned data
         save_cleaned_data(engine, cleaned_data)
+        mark_games_cleaned(engine)
+        build_summaries(engine)
+        bump_data_version(engine)
         
         print("\nData cleaning process completed successfully!")
         
@@ -247,4 +453,16 @@ def main():
         raise
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Clean the Olympics tables in the database")
+    parser.add_argument('--incremental', action='store_true',
+                        help="clean only the results of Games loaded since the last clean")
+    parser.add_argument('--method', choices=['sql', 'pandas'], default='sql',
+                        help="clean in the database with SQL, or round-trip through pandas")
+    parser.add_argument('--stream', action='store_true',
+                        help="read and clean results in chunks with bounded memory in the pandas path")
+    parser.add_argument('--chunk-size', type=int, default=CLEAN_CHUNK_SIZE,
+                        help="rows per chunk with --stream")
+    args = parser.parse_args()
+    with run_report('clean_data', incremental=args.incremental, method=args.method, stream=args.stream):
+        main(incremental=args.incremental, method=args.method, stream=args.stream, chunk_size=args.chunk_size)
+    print_pool_metrics()
@@ -2,6 +2,10 @@ import os
 from pathlib import Path
 
 # Database Configuration
+# Backend used by every script: 'mysql', or 'sqlite' for an in-process file
+# database that needs no server (see dialects.py)
+DB_BACKEND = os.environ.get('OLYMPICS_DB_BACKEND', 'mysql')
+
 MYSQL_CONFIG = {
     'host': 'localhost',
     'port': 3306,
@@ -10,11 +14,125 @@ MYSQL_CONFIG = {
     'database': 'olympics_db'
 }
 
+# Connection Pool
+# One pooled engine is shared by every script in a process (see db.py)
+DB_POOL_CONFIG = {
+    'pool_size': 8,
+    'max_overflow': 4,
+    'pool_timeout': 30,       # seconds to wait for a free connection
+    'pool_recycle': 1800,     # reconnect connections older than this (seconds)
+    'pool_pre_ping': True,    # test connections on checkout
+    'warm_up': 2              # connections opened when the engine is created
+}
+
 # File Paths
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = os.path.join(BASE_DIR, "data")
 ATHLETE_EVENTS_CSV = os.path.join(DATA_DIR, "athlete_events.csv")
 NOC_REGIONS_CSV = os.path.join(DATA_DIR, "noc_regions.csv")
+ANALYSIS_DIR = Path(os.environ.get('OLYMPICS_ANALYSIS_DIR', BASE_DIR / "analysis_results"))
+
+# SQLite backend: database file and the pragmas set on every connection.
+# WAL lets the analysis threads read while a write is in progress; the
+# others trade durability on power loss for bulk write speed.
+SQLITE_CONFIG = {
+    'path': os.environ.get('OLYMPICS_SQLITE_PATH', os.path.join(BASE_DIR, "olympics.db")),
+    'pragmas': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'foreign_keys': 'ON',
+        'busy_timeout': 30000,       # ms to wait for a lock held by another connection
+        'cache_size': -262144,       # KiB (256 MB)
+        'temp_store': 'MEMORY',
+        'mmap_size': 268435456       # bytes
+    }
+}
+
+# Streaming Ingest
+# Rows per chunk when reading athlete_events.csv in streaming mode; peak
+# memory of the loader is proportional to this, not to the file size.
+LOAD_CHUNK_SIZE = 100000
+
+# Columns and dtypes read from athlete_events.csv
+ATHLETE_EVENTS_COLUMNS = [
+    'ID', 'Name', 'Sex', 'Age', 'Height', 'Weight', 'Team', 'NOC',
+    'Games', 'Year', 'Season', 'City', 'Sport', 'Event', 'Medal'
+]
+ATHLETE_EVENTS_DTYPES = {
+    'ID': 'int32',
+    'Name': 'object',
+    'Sex': 'category',
+    'Age': 'float32',
+    'Height': 'float32',
+    'Weight': 'float32',
+    'Team': 'category',
+    'NOC': 'category',
+    'Games': 'category',
+    'Year': 'int16',
+    'Season': 'category',
+    'City': 'category',
+    'Sport': 'category',
+    'Event': 'category',
+    'Medal': 'category'
+}
+
+# Compact In-Memory Dtypes
+# Canonical pandas dtypes of the Olympics tables, applied when they are read
+# from the database (see dtypes.py): categoricals for low-cardinality
+# strings, 32-bit IDs (nullable, as foreign keys may be NULL), 16-bit years
+# and float32 measurements. Columns not listed keep the type pandas infers.
+TABLE_DTYPES = {
+    'countries': {'country_id': 'Int32', 'Region': 'category'},
+    'athletes': {'athlete_id': 'Int32', 'sex': 'category'},
+    'sports': {'sport_id': 'Int32'},
+    'events': {'event_id': 'Int32', 'sport_id': 'Int32'},
+    'cities': {'city_id': 'Int32'},
+    'games': {'game_id': 'Int32', 'year': 'Int16', 'season': 'category', 'city_id': 'Int32'},
+    'teams': {'team_id': 'Int32'},
+    'results': {
+        'result_id': 'Int32',
+        'athlete_id': 'Int32',
+        'game_id': 'Int32',
+        'event_id': 'Int32',
+        'team_id': 'Int32',
+        'NOC': 'category',
+        'age': 'float32',
+        'height_cm': 'float32',
+        'weight_kg': 'float32',
+        'medal': 'category',
+        'year': 'Int16',
+        'season': 'category'
+    }
+}
+
+# Bulk Writes
+# Strategy per table; tables not listed use multi_values when they have at
+# most BULK_WRITE_SMALL_TABLE_ROWS rows and the default strategy otherwise.
+# Available strategies: to_sql, multi_values, executemany, load_data_infile
+BULK_WRITE_STRATEGIES = {
+    'athletes': 'load_data_infile',
+    'results': 'load_data_infile'
+}
+BULK_WRITE_DEFAULT_STRATEGY = 'executemany'
+BULK_WRITE_SMALL_TABLE_ROWS = 5000
+
+# Rows per statement (multi_values) or per executemany call
+BULK_WRITE_BATCH_SIZES = {
+    'to_sql': 10000,
+    'multi_values': 1000,
+    'executemany': 20000,
+    'load_data_infile': None
+}
+
+# Referential Integrity
+# The loaders anti-join every foreign key in FOREIGN_KEYS against the keys
+# of its parent table before writing (see validation.py), and then write
+# with foreign key checks off. Orphan keys whose parent is listed in
+# VALIDATION_CREATE_PARENTS get a new parent member; other orphan rows are
+# appended to a CSV per table under VALIDATION_QUARANTINE_DIR instead of
+# being loaded.
+VALIDATION_CREATE_PARENTS = ['countries']
+VALIDATION_QUARANTINE_DIR = os.path.join(BASE_DIR, "quarantine")
 
 # Table Dependencies
 TABLE_DEPENDENCIES = [
@@ -28,6 +146,29 @@ TABLE_DEPENDENCIES = [
     'countries'   # Least dependent table
 ]
 
+# Foreign Keys
+# Logical foreign keys of the star schema: table -> (column, parent table,
+# parent column). TABLE_SCHEMAS declares them as constraints, and the
+# loaders validate rows against them before writing (see validation.py),
+# also in the partitioned results layout, which cannot declare them.
+FOREIGN_KEYS = {
+    'events': [('sport_id', 'sports', 'sport_id')],
+    'games': [('city_id', 'cities', 'city_id')],
+    'results': [
+        ('athlete_id', 'athletes', 'athlete_id'),
+        ('game_id', 'games', 'game_id'),
+        ('event_id', 'events', 'event_id'),
+        ('team_id', 'teams', 'team_id'),
+        ('NOC', 'countries', 'NOC')
+    ]
+}
+
+FOREIGN_KEY_CLAUSES = {
+    table: "".join(f",\n            FOREIGN KEY ({column}) REFERENCES {parent}({parent_column})"
+                   for column, parent, parent_column in keys)
+    for table, keys in FOREIGN_KEYS.items()
+}
+
 # Table Schemas
 TABLE_SCHEMAS = {
     'countries': """
@@ -51,12 +192,11 @@ TABLE_SCHEMAS = {
             sport_name VARCHAR(100) NOT NULL UNIQUE
         )
     """,
-    'events': """
+    'events': f"""
         CREATE TABLE events (
             event_id INT AUTO_INCREMENT PRIMARY KEY,
             event_name VARCHAR(255) NOT NULL,
-            sport_id INT,
-            FOREIGN KEY (sport_id) REFERENCES sports(sport_id)
+            sport_id INT{FOREIGN_KEY_CLAUSES['events']}
         )
     """,
     'cities': """
@@ -65,14 +205,13 @@ TABLE_SCHEMAS = {
             city_name VARCHAR(100) NOT NULL UNIQUE
         )
     """,
-    'games': """
+    'games': f"""
         CREATE TABLE games (
             game_id INT AUTO_INCREMENT PRIMARY KEY,
             game_name VARCHAR(100) NOT NULL,
             year INT,
             season VARCHAR(20),
-            city_id INT,
-            FOREIGN KEY (city_id) REFERENCES cities(city_id)
+            city_id INT{FOREIGN_KEY_CLAUSES['games']}
         )
     """,
     'teams': """
@@ -81,7 +220,7 @@ TABLE_SCHEMAS = {
             team_name VARCHAR(255) NOT NULL UNIQUE
         )
     """,
-    'results': """
+    'results': f"""
         CREATE TABLE results (
             result_id INT AUTO_INCREMENT PRIMARY KEY,
             athlete_id INT,
@@ -92,12 +231,246 @@ TABLE_SCHEMAS = {
             age FLOAT,
             height_cm FLOAT,
             weight_kg FLOAT,
+            medal VARCHAR(20){FOREIGN_KEY_CLAUSES['results']}
+        )
+    """
+}
+
+# Results Partitioning
+# With PARTITION_RESULTS on, results also stores the year and season of its
+# Games and is range-partitioned on them: each year gets a Summer partition
+# (seasons sorting before 'T') and a Winter partition, so one Games maps to
+# exactly one partition. MySQL does not support foreign keys on partitioned
+# tables, so this layout declares none; the loaders still validate results
+# rows against FOREIGN_KEYS.
+PARTITION_RESULTS = False
+PARTITION_FIRST_YEAR = 1896
+PARTITION_LAST_YEAR = 2032
+
+RESULTS_PARTITIONS = ",\n".join(
+    f"            PARTITION p{year}_summer VALUES LESS THAN ({year}, 'T'),\n"
+    f"            PARTITION p{year}_winter VALUES LESS THAN ({year + 1}, '')"
+    for year in range(PARTITION_FIRST_YEAR, PARTITION_LAST_YEAR + 1)
+)
+
+PARTITIONED_RESULTS_SCHEMA = """
+        CREATE TABLE results (
+            result_id INT AUTO_INCREMENT,
+            athlete_id INT,
+            game_id INT,
+            event_id INT,
+            team_id INT,
+            NOC VARCHAR(3),
+            age FLOAT,
+            height_cm FLOAT,
+            weight_kg FLOAT,
             medal VARCHAR(20),
-            FOREIGN KEY (athlete_id) REFERENCES athletes(athlete_id),
-            FOREIGN KEY (game_id) REFERENCES games(game_id),
-            FOREIGN KEY (event_id) REFERENCES events(event_id),
-            FOREIGN KEY (team_id) REFERENCES teams(team_id),
-            FOREIGN KEY (NOC) REFERENCES countries(NOC)
+            year SMALLINT NOT NULL,
+            season VARCHAR(20) NOT NULL,
+            PRIMARY KEY (result_id, year, season)
+        )
+        PARTITION BY RANGE COLUMNS (year, season) (
+""" + RESULTS_PARTITIONS + """,
+            PARTITION p_future VALUES LESS THAN (MAXVALUE, MAXVALUE)
         )
     """
-} 
\ No newline at end of file
+
+if PARTITION_RESULTS:
+    TABLE_SCHEMAS['results'] = PARTITIONED_RESULTS_SCHEMA
+
+# Secondary Indexes
+# Kept out of TABLE_SCHEMAS so the loaders can bulk load into tables without
+# them and build them afterwards (see indexes.py)
+TABLE_INDEXES = {
+    'events': {
+        'idx_events_sport': ['sport_id']
+    },
+    'games': {
+        'idx_games_year_season': ['year', 'season']
+    },
+    'results': {
+        'idx_results_game_athlete': ['game_id', 'athlete_id'],
+        'idx_results_noc_medal': ['NOC', 'medal'],
+        'idx_results_event_athlete': ['event_id', 'athlete_id']
+    }
+}
+
+# Index each analysis query is expected to use on its results scan
+ANALYSIS_QUERY_INDEXES = {
+    'medals_by_country': ('results', 'idx_results_noc_medal'),
+    'athlete_performance': ('results', 'idx_results_game_athlete'),
+    'sports_distribution': ('results', 'idx_results_event_athlete'),
+    'gender_distribution': ('results', 'idx_results_game_athlete')
+}
+
+# Pipeline metadata tables; kept out of TABLE_DEPENDENCIES so that
+# rebuilding the data tables does not drop them
+METADATA_SCHEMAS = {
+    'load_manifest': """
+        CREATE TABLE IF NOT EXISTS load_manifest (
+            game_id INT PRIMARY KEY,
+            game_name VARCHAR(100) NOT NULL,
+            season VARCHAR(20) NOT NULL,
+            fingerprint CHAR(16) NOT NULL,
+            row_count INT NOT NULL,
+            cleaned SMALLINT NOT NULL DEFAULT 0,
+            loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    'data_version': """
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INT PRIMARY KEY,
+            version CHAR(32) NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    'pipeline_state': """
+        CREATE TABLE IF NOT EXISTS pipeline_state (
+            stage VARCHAR(50) PRIMARY KEY,
+            fingerprint CHAR(64) NOT NULL,
+            data_version CHAR(32),
+            completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+}
+
+# Query Result Cache
+# analyze.execute_query results are stored as Parquet files keyed by the
+# normalized SQL and the data version that load and clean bump
+QUERY_CACHE_ENABLED = True
+QUERY_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "query_results")
+QUERY_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Materialized aggregates read by analyze.py; rebuilt at the end of a full
+# load or clean and refreshed per Games after incremental runs (see
+# summaries.py)
+USE_SUMMARY_TABLES = True
+
+SUMMARY_SCHEMAS = {
+    'summary_medals': """
+        CREATE TABLE summary_medals (
+            game_id INT NOT NULL,
+            Region VARCHAR(100),
+            medal VARCHAR(20) NOT NULL,
+            medal_count INT NOT NULL,
+            INDEX idx_summary_medals_game (game_id)
+        )
+    """,
+    'summary_participation': """
+        CREATE TABLE summary_participation (
+            game_id INT NOT NULL,
+            year INT,
+            season VARCHAR(20),
+            sex VARCHAR(10),
+            has_athlete SMALLINT NOT NULL,
+            athlete_count INT NOT NULL,
+            age_sum DOUBLE,
+            age_count INT NOT NULL,
+            height_sum DOUBLE,
+            height_count INT NOT NULL,
+            weight_sum DOUBLE,
+            weight_count INT NOT NULL,
+            INDEX idx_summary_participation_game (game_id)
+        )
+    """,
+    'summary_sports': """
+        CREATE TABLE summary_sports (
+            sport_id INT PRIMARY KEY,
+            sport_name VARCHAR(100),
+            event_count INT NOT NULL,
+            athlete_count INT NOT NULL
+        )
+    """
+}
+
+# Outlier Detection
+# Measurement columns of results whose outliers are set to NULL when
+# cleaning. Methods (see outliers.py): 'sigma' (mean +/- threshold standard
+# deviations), 'mad' (median +/- threshold scaled MADs) and 'iqr' (quartiles
+# -/+ threshold IQRs); None uses the method's default threshold. With
+# OUTLIER_GROUP_BY set, e.g. ['sport_id', 'sex'], bounds are computed per
+# group; keys may be results columns, athletes columns or events columns.
+# The in-database clean only supports global sigma bounds and falls back to
+# pandas for other settings.
+OUTLIER_COLUMNS = ['age', 'height_cm', 'weight_kg']
+OUTLIER_METHOD = 'sigma'
+OUTLIER_THRESHOLD = None
+OUTLIER_GROUP_BY = []
+# Rows per chunk when an incremental clean reads the statistics of the
+# whole results table
+OUTLIER_CHUNK_SIZE = 200000
+
+# Worker processes cleaning independent tables in clean_data.py's pandas
+# path (None = one per CPU, 1 = clean in the main process)
+CLEAN_WORKERS = None
+
+# Rows per chunk when clean_data.py --stream reads results through a
+# server-side cursor; the pandas clean then holds the dimension tables and
+# one chunk of results instead of the whole table
+CLEAN_CHUNK_SIZE = 200000
+
+# Results Cube
+# cube.py counts results entries over every combination of Games, region,
+# sport, sex and medal in one dense NumPy array, saved to CUBE_PATH with
+# np.savez and rebuilt when the data version changes
+CUBE_PATH = os.path.join(BASE_DIR, ".cache", "cube.npz")
+
+# Analytics Service
+# service.py serves the analyses as JSON over HTTP from one asyncio event
+# loop, with an async connection pool (aiomysql or aiosqlite) sized like
+# DB_POOL_CONFIG. Responses are cached for cache_ttl seconds by analysis,
+# filters and data version; the data version is re-read at most every
+# version_ttl seconds, so a reload or clean shows up within that time.
+SERVICE_CONFIG = {
+    'host': '127.0.0.1',
+    'port': 8050,
+    'cache_ttl': 300,            # seconds a response is served from the cache
+    'cache_max_entries': 1024,
+    'version_ttl': 5,            # seconds between data version checks
+    'max_limit': 1000,           # largest row limit a request may ask for
+    'keep_alive_timeout': 15     # seconds an idle client connection stays open
+}
+
+# Run Reports
+# Each script run writes a JSON report of its stages (wall time, rows,
+# rows/sec, peak RSS), bulk writes and SQL statements (see
+# instrumentation.py). At most RUN_REPORT_MAX_STATEMENTS statements are
+# logged one by one; per-statement totals always cover all of them.
+RUN_REPORT_ENABLED = True
+RUN_REPORT_DIR = os.environ.get('OLYMPICS_RUN_REPORT_DIR', os.path.join(BASE_DIR, "run_reports"))
+RUN_REPORT_MAX_STATEMENTS = 5000
+
+# Concurrent analysis run (analyze.py): threads issuing the queries, kept
+# within DB_POOL_CONFIG's pool_size, and processes rendering the plots
+# (None = one per analysis, at most one per CPU)
+ANALYSIS_QUERY_WORKERS = 4
+ANALYSIS_RENDER_WORKERS = None
+
+# Incremental Rendering
+# Each figure is drawn once and saved in every one of RENDER_FORMATS (any
+# format matplotlib's savefig writes). It is only redrawn when the hash of
+# its data and plot spec differs from the one recorded at its last render
+# (see render.py).
+RENDER_FORMATS = ['png']
+
+# Offline columnar snapshot of the star schema (snapshot.py), written as one
+# Parquet file per table so analyses can run without a database connection
+SNAPSHOT_DIR = os.path.join(BASE_DIR, "snapshot")
+SNAPSHOT_TABLES = ['countries', 'athletes', 'sports', 'events', 'cities', 'games', 'teams', 'results']
+SNAPSHOT_COMPRESSION = 'zstd'
+SNAPSHOT_CHUNK_SIZE = 100000
+
+# Pipeline Orchestrator
+# pipeline.py skips stages whose input fingerprint is unchanged. File
+# hashes are cached by path, size and modification time so unchanged CSVs
+# are not re-read.
+PIPELINE_HASH_CACHE = os.path.join(BASE_DIR, ".cache", "file_hashes.json")
+
+# Synthetic Data and Benchmarks
+# generate_data.py writes athlete_events CSVs at multiples of the size of
+# the Kaggle dataset (SYNTHETIC_BASE_ROWS rows); benchmark.py runs the
+# pipeline on them at each of BENCHMARK_SCALES
+SYNTHETIC_DATA_DIR = os.path.join(DATA_DIR, "synthetic")
+SYNTHETIC_BASE_ROWS = 271116
+BENCHMARK_SCALES = [1, 10, 100]
+BENCHMARK_DIR = os.path.join(BASE_DIR, "benchmarks")
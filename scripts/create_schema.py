@@ -1,29 +1,20 @@
-from sqlalchemy import create_engine, text
-import pymysql
-from config import MYSQL_CONFIG, TABLE_DEPENDENCIES, TABLE_SCHEMAS
-
-def get_mysql_engine():
-    try:
-        connection_str = f"mysql+pymysql://{MYSQL_CONFIG['user']}:{MYSQL_CONFIG['password']}@" \
-                        f"{MYSQL_CONFIG['host']}:{MYSQL_CONFIG['port']}/{MYSQL_CONFIG['database']}"
-        engine = create_engine(connection_str, echo=False)
-        # Test the connection
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        return engine
-    except Exception as e:
-        print(f"Error connecting to database: {e}")
-        raise
+from sqlalchemy import text
+from config import TABLE_DEPENDENCIES, TABLE_SCHEMAS
+from db import get_engine
+from dialects import execute_ddl, set_foreign_key_checks
+from indexes import create_indexes
+from query_cache import bump_data_version
+from instrumentation import run_report, stage
 
 def create_schema():
     """Create the database schema for the Olympics database"""
     print("Creating database schema...")
     
     try:
-        engine = get_mysql_engine()
-        with engine.connect() as conn:
+        engine = get_engine()
+        with stage('create tables'), engine.connect() as conn:
             # Disable foreign key checks
-            conn.execute(text("SET FOREIGN_KEY_CHECKS = 0"))
+            set_foreign_key_checks(conn, False)
             
             # Drop existing tables in dependency order
             for table in TABLE_DEPENDENCIES:
@@ -32,11 +23,15 @@ def create_schema():
             
             # Create tables in reverse dependency order
             for table in reversed(TABLE_DEPENDENCIES):
-                conn.execute(text(TABLE_SCHEMAS[table]))
+                execute_ddl(conn, TABLE_SCHEMAS[table])
                 print(f"Created table {table}")
             
             # Re-enable foreign key checks
-            conn.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
+            set_foreign_key_checks(conn, True)
+
+        # Build the secondary indexes from the index catalog
+        create_indexes(engine)
+        bump_data_version(engine)
             
         print("Database schema created successfully!")
     except Exception as e:
@@ -44,10 +39,11 @@ def create_schema():
         # Make sure to re-enable foreign key checks even if there's an error
         try:
             with engine.connect() as conn:
-                conn.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
+                set_foreign_key_checks(conn, True)
         except:
             pass
         raise
 
 if __name__ == "__main__":
-    create_schema()
+    with run_report('create_schema'):
+        create_schema()
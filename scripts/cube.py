@@ -0,0 +1,282 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from config import CUBE_PATH
+from db import get_engine, print_pool_metrics
+from query_cache import data_version
+from instrumentation import run_report, staged
+
+# Axes of the dense count array, in order
+AXES = ['games', 'region', 'sport', 'sex', 'medal']
+
+# Attributes of each Games that queries group and filter by like axes; they
+# roll up the games axis
+GAMES_ATTRIBUTES = ['year', 'season', 'decade']
+
+MEDALS = ['Gold', 'Silver', 'Bronze', 'No Medal']
+
+# Label of results rows whose region, sport or sex is missing
+UNKNOWN = 'Unknown'
+
+CUBE_QUERY = """
+SELECT
+    r.game_id,
+    c.Region AS region,
+    s.sport_name AS sport,
+    a.sex,
+    r.medal,
+    COUNT(*) AS entries
+FROM results r
+LEFT JOIN countries c ON r.NOC = c.NOC
+LEFT JOIN events e ON r.event_id = e.event_id
+LEFT JOIN sports s ON e.sport_id = s.sport_id
+LEFT JOIN athletes a ON r.athlete_id = a.athlete_id
+GROUP BY r.game_id, c.Region, s.sport_name, a.sex, r.medal
+"""
+
+def _labels(values):
+    """Sorted distinct labels of a column, missing values as UNKNOWN"""
+    return np.array(sorted(pd.Series(values).fillna(UNKNOWN).astype(str).unique()))
+
+def _as_list(values):
+    if isinstance(values, (str, bytes)) or not np.iterable(values):
+        return [values]
+    return list(values)
+
+class Cube:
+    """Results entries counted over every combination of Games, region,
+    sport, sex and medal, as one dense int32 array.
+
+    ``labels`` holds the label of each position of every axis (Games are
+    labelled by name, in date order) and ``attributes`` the year, season and
+    decade of each Games. A query starts from the roll-up of the cube to the
+    axes it groups or filters by (see ``cuboid``), keeps the filtered
+    positions and sums away the rest, so its cost depends on the size of
+    that roll-up, not of results. Entries are additive; distinct athlete
+    counts are not, and are left to SQL.
+    """
+
+    def __init__(self, counts, labels, attributes, data_version=None):
+        self.counts = counts
+        self.labels = labels
+        self.attributes = attributes
+        self.data_version = data_version
+        self._cuboids = {tuple(AXES): counts}
+
+    @property
+    def dimensions(self):
+        return AXES + GAMES_ATTRIBUTES
+
+    @classmethod
+    def from_frames(cls, games, entries, data_version=None):
+        """Build a cube from the games table (game_id, game_name, year,
+        season) and entry counts by game_id, region, sport, sex and medal"""
+        games = games.sort_values(['year', 'season', 'game_id']).reset_index(drop=True)
+        entries = entries[entries['game_id'].isin(games['game_id'])]
+        medals = entries['medal'].fillna('No Medal').astype(str)
+        labels = {
+            'games': games['game_name'].to_numpy(dtype=str),
+            'region': _labels(entries['region']),
+            'sport': _labels(entries['sport']),
+            'sex': _labels(entries['sex']),
+            'medal': np.array(MEDALS + sorted(set(medals) - set(MEDALS)))
+        }
+        codes = (
+            pd.Index(games['game_id']).get_indexer(entries['game_id']),
+            *(pd.Index(labels[axis]).get_indexer(entries[axis].fillna(UNKNOWN).astype(str))
+              for axis in ['region', 'sport', 'sex']),
+            pd.Index(labels['medal']).get_indexer(medals)
+        )
+        counts = np.zeros([len(labels[axis]) for axis in AXES], dtype=np.int32)
+        # NULL and 'No Medal' fall in the same cell, so counts are added
+        np.add.at(counts, codes, entries['entries'].to_numpy(dtype=np.int32))
+
+        year = games['year'].to_numpy(dtype=np.int64)
+        attributes = {
+            'year': year,
+            'season': games['season'].to_numpy(dtype=str),
+            'decade': year // 10 * 10
+        }
+        return cls(counts, labels, attributes, data_version)
+
+    @classmethod
+    def build(cls, engine):
+        """Build the cube with one aggregate scan of results"""
+        with engine.connect() as conn:
+            games = pd.read_sql("SELECT game_id, game_name, year, season FROM games", conn)
+            entries = pd.read_sql(CUBE_QUERY, conn)
+        return cls.from_frames(games, entries, data_version(engine))
+
+    def save(self, path=CUBE_PATH):
+        """Write the cube to one uncompressed .npz file; labels are stored as
+        fixed-width string arrays, so loading needs no pickle"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrays = {'counts': self.counts, 'data_version': np.array(self.data_version or '')}
+        arrays.update({f"labels_{axis}": labels for axis, labels in self.labels.items()})
+        arrays.update({f"attribute_{name}": values for name, values in self.attributes.items()})
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=CUBE_PATH):
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(arrays['counts'],
+                       {axis: arrays[f"labels_{axis}"] for axis in AXES},
+                       {name: arrays[f"attribute_{name}"] for name in GAMES_ATTRIBUTES},
+                       str(arrays['data_version']) or None)
+
+    def _values(self, dimension):
+        """Label of every position of the axis holding ``dimension``"""
+        if dimension in self.attributes:
+            return self.attributes[dimension]
+        return self.labels[dimension]
+
+    def cuboid(self, axes):
+        """Counts summed over every axis not in ``axes``, in AXES order.
+
+        Each cuboid is summed once, from the smallest one already computed
+        that has all of ``axes``, and kept, so repeated queries over the
+        same axes only filter and sum a small array.
+        """
+        axes = tuple(axis for axis in AXES if axis in axes)
+        cuboid = self._cuboids.get(axes)
+        if cuboid is None:
+            source = min((c for c in self._cuboids if set(axes) <= set(c)), key=lambda c: self._cuboids[c].size)
+            cuboid = self._cuboids[source].sum(axis=tuple(i for i, axis in enumerate(source) if axis not in axes),
+                                               dtype=np.int64)
+            self._cuboids[axes] = cuboid
+        return axes, cuboid
+
+    def aggregate(self, by=(), where=None):
+        """Counts filtered by ``where`` and summed over the dimensions not in
+        ``by``.
+
+        Returns the array, with its axes in the order of ``by``, and the
+        labels along each of its axes by dimension: Games attributes share
+        one axis, holding a position per distinct combination.
+        """
+        by, where = list(by), where or {}
+        unknown = [dim for dim in by + list(where) if dim not in self.dimensions]
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions: {', '.join(unknown)}")
+
+        def axis_of(dim):
+            return 'games' if dim in GAMES_ATTRIBUTES else dim
+
+        axes, counts = self.cuboid({axis_of(dim) for dim in by + list(where)})
+
+        # Positions kept on each axis
+        positions = {axis: np.arange(len(self.labels[axis])) for axis in axes}
+        for dim, values in where.items():
+            mask = np.isin(self._values(dim)[positions[axis_of(dim)]], _as_list(values))
+            counts = np.compress(mask, counts, axis=axes.index(axis_of(dim)))
+            positions[axis_of(dim)] = positions[axis_of(dim)][mask]
+
+        games_dims = [dim for dim in by if axis_of(dim) == 'games']
+        kept_axes = [axis for axis in axes if axis in by or (axis == 'games' and games_dims)]
+        counts = counts.sum(axis=tuple(i for i, axis in enumerate(axes) if axis not in kept_axes))
+
+        labels = []
+        for i, axis in enumerate(kept_axes):
+            if axis != 'games':
+                labels.append({axis: self.labels[axis][positions[axis]]})
+                continue
+            # Roll the Games up to the combinations of the requested
+            # attributes, in order of their values (Games chronologically)
+            games = positions['games']
+            key = np.zeros(len(games), dtype=np.int64)
+            for dim in games_dims:
+                uniques, codes = np.unique(games if dim == 'games' else self.attributes[dim][games],
+                                           return_inverse=True)
+                key = key * len(uniques) + codes
+            _, first, group = np.unique(key, return_index=True, return_inverse=True)
+            order = np.argsort(group, kind='stable')
+            counts = np.take(counts, order, axis=i)
+            if len(order):
+                counts = np.add.reduceat(counts, np.flatnonzero(np.r_[True, np.diff(group[order]) != 0]), axis=i)
+            labels.append({dim: self._values(dim)[games[first]] for dim in games_dims})
+
+        # Axes in the order of their first dimension in ``by``
+        permutation = np.argsort([min(by.index(dim) for dim in axis_labels) for axis_labels in labels])
+        return np.transpose(counts, permutation), [labels[i] for i in permutation]
+
+    def total(self, **where):
+        """Entries matching ``where``, e.g. ``total(medal='Gold', decade=1990)``"""
+        return int(self.aggregate([], where)[0])
+
+    def query(self, by=(), where=None, include_empty=False):
+        """Entries grouped by the dimensions in ``by``, after keeping only
+        the labels in ``where`` (dimension -> label or list of labels).
+
+        Returns a DataFrame with a column per dimension of ``by`` and an
+        ``entries`` column, rows in label order (Games chronologically).
+        Groups without entries are dropped unless ``include_empty``.
+        """
+        by = list(by)
+        counts, axes = self.aggregate(by, where)
+        if not by:
+            return pd.DataFrame({'entries': [int(counts)]})
+        index = np.indices(counts.shape).reshape(counts.ndim, -1)
+        values = counts.reshape(-1)
+        if not include_empty:
+            nonzero = values != 0
+            index, values = index[:, nonzero], values[nonzero]
+        columns = {}
+        for labels, positions in zip(axes, index):
+            for dim, dim_labels in labels.items():
+                columns[dim] = dim_labels[positions]
+        return pd.DataFrame({**{dim: columns[dim] for dim in by}, 'entries': values})
+
+@staged('build cube')
+def build_cube(engine, path=CUBE_PATH):
+    cube = Cube.build(engine)
+    cube.save(path)
+    print(f"Built a {' x '.join(map(str, cube.counts.shape))} cube "
+          f"({cube.counts.nbytes / 1024 ** 2:,.1f} MB) at {path}")
+    return cube
+
+def load_cube(engine=None, path=CUBE_PATH):
+    """The cube saved at ``path``, rebuilt first when it is missing or was
+    built from an older data version than the database's"""
+    engine = engine or get_engine()
+    if os.path.exists(path):
+        cube = Cube.load(path)
+        if cube.data_version is not None and cube.data_version == data_version(engine):
+            return cube
+    return build_cube(engine, path)
+
+def _parse_where(filters):
+    """``dim=label[,label...]`` arguments as a where dict; years and decades
+    are numbers"""
+    where = {}
+    for item in filters:
+        dim, _, values = item.partition('=')
+        values = values.split(',')
+        where[dim] = [int(v) for v in values] if dim in ('year', 'decade') else values
+    return where
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the results cube or query it")
+    parser.add_argument('command', choices=['build', 'query'])
+    parser.add_argument('--by', nargs='*', default=[], metavar='DIM',
+                        help=f"dimensions to group by: {', '.join(AXES + GAMES_ATTRIBUTES)}")
+    parser.add_argument('--where', nargs='*', default=[], metavar='DIM=LABEL[,LABEL]',
+                        help="keep only these labels, e.g. season=Summer medal=Gold,Silver,Bronze")
+    parser.add_argument('--path', default=CUBE_PATH,
+                        help="cube file")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        with run_report('cube'):
+            build_cube(get_engine(), args.path)
+        print_pool_metrics()
+    else:
+        cube = load_cube(path=args.path)
+        start = time.perf_counter()
+        result = cube.query(args.by, _parse_where(args.where))
+        elapsed = time.perf_counter() - start
+        print(result.to_string(index=False))
+        print(f"\n{len(result)} rows in {elapsed * 1e3:.2f} ms")
@@ -0,0 +1,176 @@
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import QueuePool
+from config import DB_POOL_CONFIG
+from dialects import get_dialect
+from instrumentation import instrument_engine
+
+class PoolMetrics:
+    """Counters for the process-wide connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.peak_overflow = 0
+
+    def increment(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_wait(self, seconds, overflow):
+        with self._lock:
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'wait_seconds': round(self.wait_seconds, 6),
+                'max_wait_seconds': round(self.max_wait_seconds, 6),
+                'peak_overflow': self.peak_overflow
+            }
+
+pool_metrics = PoolMetrics()
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - start, max(self.overflow(), 0))
+
+_engine = None
+_engine_lock = threading.Lock()
+
+# Number of foreign_key_checks_disabled blocks currently open
+_unchecked_blocks = 0
+_unchecked_lock = threading.Lock()
+
+@contextmanager
+def foreign_key_checks_disabled():
+    """Turn foreign key checks off on every connection checked out inside
+    the block, and back on when it is returned to the pool.
+
+    Only for bulk loads whose rows were checked beforehand (see
+    validation.py): the database then skips a constraint lookup per row.
+    """
+    global _unchecked_blocks
+    with _unchecked_lock:
+        _unchecked_blocks += 1
+    try:
+        yield
+    finally:
+        with _unchecked_lock:
+            _unchecked_blocks -= 1
+
+def _execute_raw(dbapi_connection, sql):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(sql)
+    finally:
+        cursor.close()
+
+def _instrument(engine, dialect):
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        pool_metrics.increment('connects')
+        dialect.on_connect(dbapi_connection)
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_metrics.increment('checkouts')
+        if _unchecked_blocks:
+            _execute_raw(dbapi_connection, dialect.foreign_key_checks(False))
+            connection_record.info['foreign_key_checks_off'] = True
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        pool_metrics.increment('checkins')
+        if connection_record.info.pop('foreign_key_checks_off', False) and dbapi_connection is not None:
+            _execute_raw(dbapi_connection, dialect.foreign_key_checks(True))
+        dialect.on_checkin(dbapi_connection)
+
+def warm_up(engine, connections):
+    """Open ``connections`` pooled connections up front so the first queries
+    do not pay for the TCP and authentication handshake"""
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    finally:
+        for conn in opened:
+            conn.close()
+
+def create_pooled_engine():
+    """Build a new pooled engine for the configured backend from DB_POOL_CONFIG"""
+    dialect = get_dialect()
+    engine = create_engine(
+        dialect.connection_url(),
+        echo=False,
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_CONFIG['pool_size'],
+        max_overflow=DB_POOL_CONFIG['max_overflow'],
+        pool_timeout=DB_POOL_CONFIG['pool_timeout'],
+        pool_recycle=DB_POOL_CONFIG['pool_recycle'],
+        pool_pre_ping=DB_POOL_CONFIG['pool_pre_ping'],
+        connect_args=dialect.connect_args()
+    )
+    _instrument(engine, dialect)
+    instrument_engine(engine)
+    return engine
+
+def get_engine():
+    """The process-wide engine, created, tested and warmed up on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                try:
+                    engine = create_pooled_engine()
+                    # Test the connection
+                    with engine.connect() as conn:
+                        conn.execute(text("SELECT 1"))
+                    warm_up(engine, DB_POOL_CONFIG['warm_up'])
+                except Exception as e:
+                    print(f"Error connecting to database: {e}")
+                    raise
+                _engine = engine
+    return _engine
+
+def reset_engine_after_fork():
+    """Drop pooled connections inherited from a parent process without
+    closing them, so a worker process opens its own"""
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+def pool_status():
+    """Pool metrics plus the current pool occupancy"""
+    status = pool_metrics.as_dict()
+    if _engine is not None:
+        pool = _engine.pool
+        status.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0)
+        })
+    return status
+
+def print_pool_metrics():
+    status = pool_status()
+    print("\nConnection pool: " + ", ".join(f"{name}={value}" for name, value in status.items()))
@@ -0,0 +1,204 @@
+import math
+import re
+import pandas as pd
+from sqlalchemy import text
+from config import DB_BACKEND, MYSQL_CONFIG, SQLITE_CONFIG
+
+class MySQLDialect:
+    """SQL that differs between the supported backends, MySQL flavour.
+
+    The schemas in config.py and the statements elsewhere are written for
+    MySQL; other dialects translate or replace them.
+    """
+    name = 'mysql'
+    supports_partitions = True
+    supports_load_data = True
+    # DDL commits implicitly, so table swaps rely on RENAME TABLE instead
+    transactional_ddl = False
+
+    def connection_url(self):
+        return f"mysql+pymysql://{MYSQL_CONFIG['user']}:{MYSQL_CONFIG['password']}@" \
+               f"{MYSQL_CONFIG['host']}:{MYSQL_CONFIG['port']}/{MYSQL_CONFIG['database']}"
+
+    def async_connection_url(self):
+        """URL of the asyncio driver, used by service.py"""
+        return f"mysql+aiomysql://{MYSQL_CONFIG['user']}:{MYSQL_CONFIG['password']}@" \
+               f"{MYSQL_CONFIG['host']}:{MYSQL_CONFIG['port']}/{MYSQL_CONFIG['database']}"
+
+    def connect_args(self):
+        # local_infile lets bulk_writer use LOAD DATA LOCAL INFILE
+        return {'local_infile': True}
+
+    def on_connect(self, dbapi_connection):
+        pass
+
+    def on_async_connect(self, dbapi_connection):
+        pass
+
+    def on_checkin(self, dbapi_connection):
+        pass
+
+    def table_ddl(self, ddl):
+        """Statements creating a table from a config.py schema"""
+        return [ddl]
+
+    def foreign_key_checks(self, enabled):
+        return f"SET FOREIGN_KEY_CHECKS = {1 if enabled else 0}"
+
+    def add_indexes(self, table, indexes):
+        """Statements adding secondary indexes, given as {name: columns}"""
+        clauses = ", ".join(f"ADD INDEX {name} ({', '.join(cols)})" for name, cols in indexes.items())
+        return [f"ALTER TABLE {table} {clauses}"]
+
+    def drop_index(self, table, name):
+        return f"DROP INDEX {name} ON {table}"
+
+    def rename_tables(self, renames):
+        """Statements renaming tables, given as (old, new) pairs; on MySQL a
+        single RENAME TABLE that swaps them all atomically"""
+        return ["RENAME TABLE " + ", ".join(f"{old} TO {new}" for old, new in renames)]
+
+    def begin_ddl(self):
+        """Statement opening a transaction that also covers DDL, if any"""
+        return None
+
+    def case_sensitive(self, expr):
+        """Expression compared byte for byte rather than by collation"""
+        return f"BINARY {expr}"
+
+    def char_length(self, expr):
+        return f"CHAR_LENGTH({expr})"
+
+    def concat(self, *exprs):
+        return f"CONCAT({', '.join(exprs)})"
+
+    def delete_joined(self, table, alias, id_column, join, where):
+        """DELETE the rows of ``table`` (as ``alias``) matched by a join"""
+        return f"DELETE {alias} FROM {table} {alias} {join} WHERE {where}"
+
+    def used_indexes(self, conn, query):
+        """Names of the indexes in the query plan of ``query``"""
+        plan = pd.read_sql(text("EXPLAIN " + query.strip().rstrip(';')), conn)
+        return list(plan['key'].dropna())
+
+class _StddevSamp:
+    """STDDEV_SAMP aggregate for SQLite (Welford's algorithm)"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def step(self, value):
+        if value is None:
+            return
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def finalize(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else None
+
+class SQLiteDialect(MySQLDialect):
+    """In-process SQLite file, for runs without a MySQL server.
+
+    Partitioning and LOAD DATA have no SQLite equivalent: the results table
+    cannot be partitioned, and bulk_writer falls back to executemany.
+    """
+    name = 'sqlite'
+    supports_partitions = False
+    supports_load_data = False
+    transactional_ddl = True
+
+    def connection_url(self):
+        return f"sqlite:///{SQLITE_CONFIG['path']}"
+
+    def async_connection_url(self):
+        return f"sqlite+aiosqlite:///{SQLITE_CONFIG['path']}"
+
+    def connect_args(self):
+        # The pooled engine is shared across threads (see analyze.py)
+        return {'check_same_thread': False}
+
+    def on_connect(self, dbapi_connection):
+        dbapi_connection.create_aggregate('STDDEV_SAMP', 1, _StddevSamp)
+        self.on_async_connect(dbapi_connection)
+
+    def on_async_connect(self, dbapi_connection):
+        # aiosqlite connections cannot register aggregates, only the pragmas
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_CONFIG['pragmas'].items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        cursor.close()
+
+    def on_checkin(self, dbapi_connection):
+        # PRAGMA foreign_keys is ignored inside a transaction, so a
+        # connection may come back with checks still off
+        if dbapi_connection is not None and 'foreign_keys' in SQLITE_CONFIG['pragmas']:
+            dbapi_connection.execute(f"PRAGMA foreign_keys = {SQLITE_CONFIG['pragmas']['foreign_keys']}")
+
+    def table_ddl(self, ddl):
+        if re.search(r"\bPARTITION\s+BY\b", ddl, re.IGNORECASE):
+            raise ValueError("Partitioned tables need MySQL; set PARTITION_RESULTS = False for SQLite")
+        ddl = re.sub(r"\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", "INTEGER PRIMARY KEY", ddl, flags=re.IGNORECASE)
+        table = re.search(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", ddl, re.IGNORECASE).group(1)
+        # SQLite has no inline INDEX clause; create those indexes separately
+        indexes = re.findall(r",\s*INDEX\s+(\w+)\s*\(([^)]*)\)", ddl, re.IGNORECASE)
+        ddl = re.sub(r",\s*INDEX\s+\w+\s*\([^)]*\)", "", ddl, flags=re.IGNORECASE)
+        return [ddl] + [f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})" for name, cols in indexes]
+
+    def foreign_key_checks(self, enabled):
+        return f"PRAGMA foreign_keys = {'ON' if enabled else 'OFF'}"
+
+    def add_indexes(self, table, indexes):
+        return [f"CREATE INDEX {name} ON {table} ({', '.join(cols)})" for name, cols in indexes.items()]
+
+    def drop_index(self, table, name):
+        return f"DROP INDEX {name}"
+
+    def rename_tables(self, renames):
+        # Atomic only inside a transaction (see begin_ddl)
+        return [f"ALTER TABLE {old} RENAME TO {new}" for old, new in renames]
+
+    def begin_ddl(self):
+        # The sqlite3 module only opens transactions before DML on its own
+        return "BEGIN IMMEDIATE"
+
+    def case_sensitive(self, expr):
+        # SQLite compares text byte for byte by default
+        return expr
+
+    def char_length(self, expr):
+        return f"LENGTH({expr})"
+
+    def concat(self, *exprs):
+        return " || ".join(exprs)
+
+    def delete_joined(self, table, alias, id_column, join, where):
+        return (f"DELETE FROM {table} WHERE {id_column} IN "
+                f"(SELECT {alias}.{id_column} FROM {table} {alias} {join} WHERE {where})")
+
+    def used_indexes(self, conn, query):
+        plan = pd.read_sql(text("EXPLAIN QUERY PLAN " + query.strip().rstrip(';')), conn)
+        return re.findall(r"USING (?:COVERING )?INDEX (\w+)", " ".join(plan['detail']))
+
+DIALECTS = {
+    'mysql': MySQLDialect(),
+    'sqlite': SQLiteDialect()
+}
+
+def get_dialect(engine=None):
+    """Dialect of an engine, or of the configured backend (DB_BACKEND)"""
+    name = engine.dialect.name if engine is not None else DB_BACKEND
+    if name not in DIALECTS:
+        raise ValueError(f"Unsupported database backend: {name}")
+    return DIALECTS[name]
+
+def execute_ddl(conn, ddl):
+    """Create a table from a config.py schema on the connection's backend"""
+    for statement in get_dialect(conn.engine).table_ddl(ddl):
+        conn.execute(text(statement))
+
+def set_foreign_key_checks(conn, enabled):
+    conn.execute(text(get_dialect(conn.engine).foreign_key_checks(enabled)))
@@ -0,0 +1,49 @@
+import pandas as pd
+from config import TABLE_DTYPES
+
+def table_dtypes(table, columns=None):
+    """Canonical dtypes of a table, limited to ``columns`` when given"""
+    dtypes = TABLE_DTYPES.get(table, {})
+    if columns is None:
+        return dict(dtypes)
+    return {col: dtype for col, dtype in dtypes.items() if col in columns}
+
+def compact(df, table):
+    """Convert the columns of a frame holding rows of ``table`` to their
+    canonical dtypes"""
+    dtypes = {col: dtype for col, dtype in table_dtypes(table, df.columns).items() if df[col].dtype != dtype}
+    return df.astype(dtypes) if dtypes else df
+
+def read_table(sql, con, table, **kwargs):
+    """``pd.read_sql`` with the canonical dtypes of ``table`` applied to the
+    columns it returns"""
+    df = pd.read_sql(sql, con, **kwargs)
+    return compact(df, table)
+
+def read_table_chunks(sql, engine, table, chunksize):
+    """Chunks of a query's rows with the canonical dtypes of ``table``.
+
+    The rows come from a server-side cursor (``stream_results``), so neither
+    the driver nor pandas buffers the whole result set; the connection is
+    held until the last chunk has been read.
+    """
+    with engine.connect().execution_options(stream_results=True) as conn:
+        for chunk in pd.read_sql(sql, conn, chunksize=chunksize):
+            yield compact(chunk, table)
+
+def fill_missing(series, value):
+    """``fillna`` that also works on categoricals lacking ``value``"""
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+def memory_usage_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+def memory_report(stage, frames):
+    """Print the deep memory use of each frame at a pipeline stage"""
+    sizes = {name: memory_usage_mb(df) for name, df in frames.items() if df is not None}
+    print(f"\nMemory after {stage}: {sum(sizes.values()):,.1f} MB")
+    for name, size in sizes.items():
+        print(f"  {name:<12} {size:>10,.1f} MB")
+    return sizes
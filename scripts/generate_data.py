@@ -0,0 +1,391 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from config import NOC_REGIONS_CSV, ATHLETE_EVENTS_COLUMNS, SYNTHETIC_DATA_DIR, SYNTHETIC_BASE_ROWS
+
+# Every Games of the Kaggle dataset with its host city and number of rows.
+# The row counts set the shape of the growth over time; they are scaled to
+# the requested size. The 1956 equestrian events were held in Stockholm.
+GAMES = [
+    (1896, 'Summer', 'Athina', 380), (1900, 'Summer', 'Paris', 1936), (1904, 'Summer', 'St. Louis', 1301),
+    (1906, 'Summer', 'Athina', 1733), (1908, 'Summer', 'London', 3101), (1912, 'Summer', 'Stockholm', 4040),
+    (1920, 'Summer', 'Antwerpen', 4292), (1924, 'Summer', 'Paris', 5233), (1924, 'Winter', 'Chamonix', 460),
+    (1928, 'Summer', 'Amsterdam', 4992), (1928, 'Winter', 'Sankt Moritz', 582),
+    (1932, 'Summer', 'Los Angeles', 2969), (1932, 'Winter', 'Lake Placid', 352),
+    (1936, 'Summer', 'Berlin', 6506), (1936, 'Winter', 'Garmisch-Partenkirchen', 895),
+    (1948, 'Summer', 'London', 6405), (1948, 'Winter', 'Sankt Moritz', 1075),
+    (1952, 'Summer', 'Helsinki', 8270), (1952, 'Winter', 'Oslo', 1088),
+    (1956, 'Summer', 'Melbourne', 5127), (1956, 'Winter', "Cortina d'Ampezzo", 1307),
+    (1960, 'Summer', 'Roma', 8119), (1960, 'Winter', 'Squaw Valley', 1116),
+    (1964, 'Summer', 'Tokyo', 7702), (1964, 'Winter', 'Innsbruck', 1778),
+    (1968, 'Summer', 'Mexico City', 8588), (1968, 'Winter', 'Grenoble', 1891),
+    (1972, 'Summer', 'Munich', 10304), (1972, 'Winter', 'Sapporo', 1655),
+    (1976, 'Summer', 'Montreal', 8641), (1976, 'Winter', 'Innsbruck', 1861),
+    (1980, 'Summer', 'Moskva', 7191), (1980, 'Winter', 'Lake Placid', 1746),
+    (1984, 'Summer', 'Los Angeles', 9454), (1984, 'Winter', 'Sarajevo', 2134),
+    (1988, 'Summer', 'Seoul', 12037), (1988, 'Winter', 'Calgary', 2639),
+    (1992, 'Summer', 'Barcelona', 12977), (1992, 'Winter', 'Albertville', 3436),
+    (1994, 'Winter', 'Lillehammer', 3160), (1996, 'Summer', 'Atlanta', 13780),
+    (1998, 'Winter', 'Nagano', 3605), (2000, 'Summer', 'Sydney', 13821),
+    (2002, 'Winter', 'Salt Lake City', 4109), (2004, 'Summer', 'Athina', 13443),
+    (2006, 'Winter', 'Torino', 4382), (2008, 'Summer', 'Beijing', 13602),
+    (2010, 'Winter', 'Vancouver', 4402), (2012, 'Summer', 'London', 12920),
+    (2014, 'Winter', 'Sochi', 4891), (2016, 'Summer', 'Rio de Janeiro', 13688)
+]
+
+# Sports with their season, first and last Games, relative number of rows in
+# the Kaggle dataset and a selection of their events
+SPORTS = {
+    'Athletics': ('Summer', 1896, 2016, 38624, [
+        '100 metres', '200 metres', '400 metres', '800 metres', '1,500 metres', '5,000 metres',
+        '10,000 metres', 'Marathon', '110 metres Hurdles', '400 metres Hurdles', '4 x 100 metres Relay',
+        '4 x 400 metres Relay', 'High Jump', 'Pole Vault', 'Long Jump', 'Triple Jump', 'Shot Put',
+        'Discus Throw', 'Hammer Throw', 'Javelin Throw', 'Decathlon', '20 kilometres Walk']),
+    'Gymnastics': ('Summer', 1896, 2016, 26707, [
+        'Individual All-Around', 'Team All-Around', 'Floor Exercise', 'Horse Vault', 'Parallel Bars',
+        'Horizontal Bar', 'Rings', 'Pommelled Horse']),
+    'Swimming': ('Summer', 1896, 2016, 23195, [
+        '100 metres Freestyle', '200 metres Freestyle', '400 metres Freestyle', '1,500 metres Freestyle',
+        '100 metres Backstroke', '200 metres Backstroke', '100 metres Breaststroke',
+        '200 metres Breaststroke', '100 metres Butterfly', '200 metres Butterfly',
+        '200 metres Individual Medley', '4 x 100 metres Medley Relay', '4 x 200 metres Freestyle Relay']),
+    'Shooting': ('Summer', 1896, 2016, 11448, [
+        'Trap', 'Skeet', 'Small-Bore Rifle, Prone, 50 metres', 'Air Rifle, 10 metres',
+        'Air Pistol, 10 metres', 'Rapid-Fire Pistol, 25 metres', 'Free Pistol, 50 metres']),
+    'Cycling': ('Summer', 1896, 2016, 10859, [
+        'Road Race, Individual', 'Road Race, Team', 'Sprint', 'Team Pursuit, 4,000 metres',
+        '1,000 metres Time Trial', 'Points Race', 'Keirin', 'Mountainbike, Cross-Country']),
+    'Fencing': ('Summer', 1896, 2016, 10735, [
+        'Foil, Individual', 'Foil, Team', 'epee, Individual', 'epee, Team', 'Sabre, Individual', 'Sabre, Team']),
+    'Rowing': ('Summer', 1900, 2016, 10595, [
+        'Single Sculls', 'Double Sculls', 'Quadruple Sculls', 'Coxless Pairs', 'Coxless Fours',
+        'Coxed Fours', 'Coxed Eights', 'Lightweight Double Sculls']),
+    'Wrestling': ('Summer', 1896, 2016, 7154, [
+        'Flyweight, Freestyle', 'Bantamweight, Freestyle', 'Featherweight, Freestyle',
+        'Lightweight, Freestyle', 'Welterweight, Greco-Roman', 'Middleweight, Greco-Roman',
+        'Light-Heavyweight, Greco-Roman', 'Heavyweight, Greco-Roman']),
+    'Football': ('Summer', 1900, 2016, 6745, ['Football']),
+    'Sailing': ('Summer', 1900, 2016, 6586, [
+        'One Person Dinghy', 'Two Person Dinghy', 'Windsurfer', 'Skiff', 'Multihull', 'Keelboat']),
+    'Equestrianism': ('Summer', 1900, 2016, 6344, [
+        'Dressage, Individual', 'Dressage, Team', 'Jumping, Individual', 'Jumping, Team',
+        'Three-Day Event, Individual', 'Three-Day Event, Team']),
+    'Canoeing': ('Summer', 1936, 2016, 6171, [
+        'Kayak Singles, 500 metres', 'Kayak Singles, 1,000 metres', 'Kayak Doubles, 500 metres',
+        'Kayak Fours, 1,000 metres', 'Canadian Singles, 1,000 metres', 'Canadian Doubles, 1,000 metres',
+        'Kayak Singles, Slalom']),
+    'Boxing': ('Summer', 1904, 2016, 6047, [
+        'Flyweight', 'Bantamweight', 'Featherweight', 'Lightweight', 'Light-Welterweight',
+        'Welterweight', 'Middleweight', 'Light-Heavyweight', 'Heavyweight']),
+    'Hockey': ('Summer', 1908, 2016, 5417, ['Hockey']),
+    'Basketball': ('Summer', 1936, 2016, 4536, ['Basketball']),
+    'Weightlifting': ('Summer', 1896, 2016, 3937, [
+        'Flyweight', 'Bantamweight', 'Featherweight', 'Lightweight', 'Middleweight',
+        'Light-Heavyweight', 'Heavyweight', 'Super-Heavyweight']),
+    'Water Polo': ('Summer', 1900, 2016, 3846, ['Water Polo']),
+    'Judo': ('Summer', 1964, 2016, 3801, [
+        'Extra-Lightweight', 'Half-Lightweight', 'Lightweight', 'Half-Middleweight', 'Middleweight',
+        'Half-Heavyweight', 'Heavyweight']),
+    'Handball': ('Summer', 1936, 2016, 3665, ['Handball']),
+    'Art Competitions': ('Summer', 1912, 1948, 3578, [
+        'Painting, Unknown Event', 'Sculpturing, Unknown Event', 'Literature, Unknown Event',
+        'Architecture, Unknown Event', 'Music, Unknown Event']),
+    'Volleyball': ('Summer', 1964, 2016, 3404, ['Volleyball']),
+    'Tennis': ('Summer', 1896, 2016, 2862, ['Singles', 'Doubles']),
+    'Diving': ('Summer', 1904, 2016, 2842, ['Springboard', 'Platform', 'Synchronized Springboard']),
+    'Archery': ('Summer', 1900, 2016, 2334, ['Individual', 'Team']),
+    'Table Tennis': ('Summer', 1988, 2016, 1955, ['Singles', 'Doubles', 'Team']),
+    'Modern Pentathlon': ('Summer', 1912, 2016, 1677, ['Individual']),
+    'Badminton': ('Summer', 1992, 2016, 1457, ['Singles', 'Doubles']),
+    'Synchronized Swimming': ('Summer', 1984, 2016, 909, ['Duet', 'Team']),
+    'Baseball': ('Summer', 1992, 2008, 894, ['Baseball']),
+    'Rhythmic Gymnastics': ('Summer', 1984, 2016, 658, ['Individual', 'Group']),
+    'Taekwondo': ('Summer', 2000, 2016, 600, ['Flyweight', 'Featherweight', 'Welterweight', 'Heavyweight']),
+    'Beach Volleyball': ('Summer', 1996, 2016, 564, ['Beach Volleyball']),
+    'Triathlon': ('Summer', 2000, 2016, 529, ['Olympic Distance']),
+    'Rugby Sevens': ('Summer', 2016, 2016, 299, ['Rugby Sevens']),
+    'Golf': ('Summer', 2016, 2016, 247, ['Individual']),
+    'Trampolining': ('Summer', 2000, 2016, 152, ['Individual']),
+    'Cross Country Skiing': ('Winter', 1924, 2014, 9133, [
+        '10 kilometres', '15 kilometres', '30 kilometres', '50 kilometres', '4 x 10 kilometres Relay',
+        'Sprint']),
+    'Alpine Skiing': ('Winter', 1936, 2014, 8829, [
+        'Downhill', 'Super G', 'Giant Slalom', 'Slalom', 'Combined']),
+    'Speed Skating': ('Winter', 1924, 2014, 5613, [
+        '500 metres', '1,000 metres', '1,500 metres', '5,000 metres', '10,000 metres', 'Team Pursuit']),
+    'Ice Hockey': ('Winter', 1924, 2014, 5516, ['Ice Hockey']),
+    'Biathlon': ('Winter', 1960, 2014, 4893, ['10 kilometres Sprint', '20 kilometres', '4 x 7.5 kilometres Relay']),
+    'Bobsleigh': ('Winter', 1924, 2014, 3058, ['Two', 'Four']),
+    'Ski Jumping': ('Winter', 1924, 2014, 2401, ['Normal Hill, Individual', 'Large Hill, Individual', 'Large Hill, Team']),
+    'Figure Skating': ('Winter', 1924, 2014, 2298, ['Singles', 'Pairs', 'Ice Dancing']),
+    'Short Track Speed Skating': ('Winter', 1992, 2014, 1534, ['500 metres', '1,000 metres', '1,500 metres', '5,000 metres Relay']),
+    'Luge': ('Winter', 1964, 2014, 1479, ['Singles', 'Doubles']),
+    'Nordic Combined': ('Winter', 1924, 2014, 1344, ['Individual', 'Team']),
+    'Freestyle Skiing': ('Winter', 1992, 2014, 937, ['Moguls', 'Aerials', 'Ski Cross', 'Halfpipe']),
+    'Snowboarding': ('Winter', 1998, 2014, 936, ['Halfpipe', 'Giant Slalom', 'Boardercross']),
+    'Curling': ('Winter', 1924, 2014, 463, ['Curling']),
+    'Skeleton': ('Winter', 1928, 2014, 199, ['Skeleton'])
+}
+
+# Events contested by men and women together
+MIXED_SPORTS = {'Art Competitions', 'Equestrianism'}
+
+# Rows per NOC in the Kaggle dataset for the largest delegations; the others
+# share OTHER_NOC_ROWS
+NOC_ROWS = {
+    'USA': 18853, 'FRA': 12758, 'GBR': 12256, 'ITA': 10715, 'GER': 9830, 'CAN': 9733, 'JPN': 8444,
+    'SWE': 8339, 'AUS': 7638, 'HUN': 6607, 'POL': 6207, 'SUI': 5891, 'NED': 5838, 'URS': 5685,
+    'FIN': 5474, 'ESP': 5144, 'CHN': 5110, 'RUS': 5087, 'AUT': 5015, 'NOR': 4904, 'ROU': 4654,
+    'TCH': 4382, 'KOR': 4365, 'BEL': 4308, 'DEN': 4176, 'BRA': 3848, 'BUL': 3777, 'FRG': 3469,
+    'GDR': 3320, 'ARG': 3297, 'NZL': 3155, 'YUG': 2901, 'CUB': 2627, 'UKR': 2410, 'MEX': 2345
+}
+OTHER_NOC_ROWS = 500
+
+# NOCs that only competed for part of the period (first, last Games year)
+NOC_YEARS = {
+    'URS': (1952, 1988), 'EUN': (1992, 1992), 'RUS': (1994, 2016), 'GDR': (1968, 1988),
+    'FRG': (1968, 1988), 'SAA': (1952, 1952), 'TCH': (1920, 1992), 'CZE': (1994, 2016),
+    'SVK': (1994, 2016), 'BOH': (1900, 1912), 'YUG': (1920, 2000), 'SCG': (2004, 2006),
+    'SRB': (2008, 2016), 'MNE': (2008, 2016), 'CRO': (1992, 2016), 'SLO': (1992, 2016),
+    'BIH': (1992, 2016), 'UKR': (1994, 2016), 'BLR': (1994, 2016), 'KAZ': (1994, 2016),
+    'ANZ': (1908, 1912), 'RHO': (1928, 1964), 'UAR': (1960, 1960), 'WIF': (1960, 1960),
+    'NBO': (1956, 1956), 'NFL': (1908, 1908), 'CRT': (1906, 1906), 'YAR': (1984, 1988),
+    'YMD': (1988, 1988), 'ROT': (2016, 2016), 'KOS': (2016, 2016), 'SSD': (2016, 2016),
+    'TLS': (2000, 2016), 'IOA': (1992, 2016)
+}
+
+# Team names that differ from the region in noc_regions.csv
+TEAM_NAMES = {'USA': 'United States', 'GBR': 'Great Britain', 'SGP': 'Singapore'}
+
+FIRST_NAMES = {
+    'M': ['John', 'Michael', 'David', 'James', 'Robert', 'Peter', 'Thomas', 'Paul', 'Jan', 'Hans',
+          'Karl', 'Pierre', 'Jean', 'Giovanni', 'Carlos', 'Jose', 'Juan', 'Luis', 'Andrei', 'Sergei',
+          'Vladimir', 'Dmitri', 'Alexander', 'Nikolai', 'Erik', 'Lars', 'Anders', 'Johan', 'Matti',
+          'Mikko', 'Ivan', 'Marek', 'Tomasz', 'Laszlo', 'Istvan', 'Kenji', 'Hiroshi', 'Takashi',
+          'Wei', 'Jun', 'Min-Ho', 'Ahmed', 'Mohamed', 'Ali', 'Kwame', 'Samuel', 'George', 'William',
+          'Richard', 'Charles', 'Frank', 'Henri', 'Louis', 'Marco', 'Luca', 'Stefan', 'Martin',
+          'Daniel', 'Rafael', 'Miguel'],
+    'F': ['Mary', 'Anna', 'Maria', 'Elena', 'Olga', 'Natalia', 'Irina', 'Svetlana', 'Tatiana',
+          'Ekaterina', 'Sarah', 'Jennifer', 'Jessica', 'Elizabeth', 'Margaret', 'Susan', 'Karen',
+          'Laura', 'Julia', 'Sophie', 'Marie', 'Claire', 'Isabelle', 'Chiara', 'Giulia', 'Francesca',
+          'Carmen', 'Ana', 'Lucia', 'Ingrid', 'Kristin', 'Anja', 'Eva', 'Katarina', 'Agnieszka',
+          'Monika', 'Zsuzsanna', 'Yuko', 'Keiko', 'Naoko', 'Li', 'Mei', 'Ji-Yeon', 'Fatima', 'Amina',
+          'Grace', 'Ruth', 'Helen', 'Emma', 'Linda', 'Barbara', 'Nicole', 'Petra', 'Sabine',
+          'Marta', 'Daniela', 'Andrea', 'Veronika', 'Simone', 'Alice']
+}
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Miller', 'Davis', 'Wilson', 'Taylor', 'Clark',
+    'Martin', 'Bernard', 'Dubois', 'Durand', 'Lefebvre', 'Moreau', 'Rossi', 'Russo', 'Ferrari',
+    'Esposito', 'Bianchi', 'Romano', 'Garcia', 'Fernandez', 'Gonzalez', 'Rodriguez', 'Lopez',
+    'Martinez', 'Sanchez', 'Perez', 'Muller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer',
+    'Wagner', 'Becker', 'Hoffmann', 'Schulz', 'Ivanov', 'Smirnov', 'Kuznetsov', 'Popov', 'Sokolov',
+    'Lebedev', 'Kozlov', 'Novikov', 'Morozov', 'Petrov', 'Andersson', 'Johansson', 'Karlsson',
+    'Nilsson', 'Eriksson', 'Larsson', 'Olsen', 'Hansen', 'Nielsen', 'Jensen', 'Virtanen',
+    'Korhonen', 'Nieminen', 'Makinen', 'Nowak', 'Kowalski', 'Wisniewski', 'Nagy', 'Kovacs', 'Toth',
+    'Szabo', 'Horvath', 'Novak', 'Dvorak', 'Svoboda', 'Popescu', 'Ionescu', 'Dimitrov', 'Georgiev',
+    'Papadopoulos', 'Yilmaz', 'Kaya', 'Cohen', 'Levi', 'Sato', 'Suzuki', 'Takahashi', 'Tanaka',
+    'Watanabe', 'Ito', 'Wang', 'Li', 'Zhang', 'Liu', 'Chen', 'Yang', 'Huang', 'Zhao', 'Kim', 'Lee',
+    'Park', 'Choi', 'Jung', 'Singh', 'Kumar', 'Sharma', 'Khan', 'Hassan', 'Mohamed', 'Ibrahim',
+    'Mensah', 'Okafor', 'Kamau', 'Otieno', 'Silva', 'Santos', 'Oliveira', 'Souza', 'Costa',
+    'Pereira', 'Almeida', 'Van Dijk', 'De Vries', 'Jansen', 'Peeters', 'Janssens', 'Maes',
+    "O'Brien", 'Murphy', 'Kelly', 'Walsh', 'Campbell', 'Stewart', 'Thompson', 'White', 'Harris',
+    'Lewis', 'Robinson', 'Walker', 'Young', 'Allen', 'King', 'Wright', 'Scott', 'Green', 'Baker',
+    'Adams', 'Nelson', 'Hill', 'Moore', 'Anderson', 'Jackson'
+]
+
+# Share of results rows with a medal in the Kaggle dataset
+MEDAL_SHARES = {'Gold': 0.0493, 'Silver': 0.0486, 'Bronze': 0.0497}
+
+# Share of athletes returning at the next Games of the same season, and
+# mean results rows per athlete per Games
+RETURN_SHARE = 0.3
+ROWS_PER_ATHLETE = 1.45
+
+def default_output(scale):
+    return os.path.join(SYNTHETIC_DATA_DIR, f"athlete_events_{scale:g}x.csv")
+
+def female_share(year):
+    """Share of women among the athletes of a Games, rising from none in
+    1896 to about 45% in 2016"""
+    return 0.0 if year == 1896 else 0.5 / (1 + np.exp(-(year - 1980) / 20))
+
+def missing_share(year):
+    """Share of athletes without a recorded height and weight; nearly all
+    before the First World War, a few percent in recent Games"""
+    return float(np.clip(0.95 - 0.0089 * (year - 1896), 0.02, 0.95))
+
+def load_nocs():
+    """NOC codes with their team names and selection weights.
+
+    The Kaggle athlete_events.csv uses SGP for Singapore where
+    noc_regions.csv has SIN; the generated file does the same.
+    """
+    noc_df = pd.read_csv(NOC_REGIONS_CSV)
+    noc_df = noc_df[noc_df['NOC'] != 'SIN']
+    noc_df = pd.concat([noc_df, pd.DataFrame([{'NOC': 'SGP', 'region': 'Singapore'}])], ignore_index=True)
+    team = noc_df['notes'].where(noc_df['notes'].notna(), noc_df['region'])
+    team = team.fillna(noc_df['NOC'])
+    team = noc_df['NOC'].map(TEAM_NAMES).fillna(team)
+    weights = noc_df['NOC'].map(NOC_ROWS).fillna(OTHER_NOC_ROWS)
+    return noc_df['NOC'].to_numpy(), team.to_numpy(), weights.to_numpy(dtype=float)
+
+class AthleteEventsGenerator:
+    """Generates athlete_events rows one Games at a time.
+
+    Each Games gets its share of ``total_rows``. Its athletes are partly
+    carried over (a year or four older) from the previous Games of the same
+    season and partly new; every athlete has one to a few results rows in
+    events of a single sport. Only the athletes of the previous Games are
+    kept between Games, so memory is bounded by the largest Games.
+    """
+
+    def __init__(self, total_rows, seed=42):
+        self.rng = np.random.default_rng(seed)
+        self.total_rows = total_rows
+        self.nocs, self.teams, self.noc_weights = load_nocs()
+        self.sports = list(SPORTS)
+        self.events = {sport: np.array(SPORTS[sport][4], dtype=object) for sport in self.sports}
+        self.first_names = {sex: np.array(names, dtype=object) for sex, names in FIRST_NAMES.items()}
+        self.last_names = np.array(LAST_NAMES, dtype=object)
+        self.next_id = 1
+        self.previous = {}
+
+    def games_rows(self):
+        """Rows per Games, proportional to the Kaggle dataset"""
+        weights = np.array([rows for *_, rows in GAMES], dtype=float)
+        rows = np.floor(weights / weights.sum() * self.total_rows).astype(int)
+        rows[np.argsort(-weights)[:self.total_rows - rows.sum()]] += 1
+        return rows
+
+    def _active(self, year, season):
+        sports = [s for s in self.sports if SPORTS[s][0] == season and SPORTS[s][1] <= year <= SPORTS[s][2]]
+        nocs = np.array([NOC_YEARS.get(noc, (0, 9999))[0] <= year <= NOC_YEARS.get(noc, (0, 9999))[1]
+                         for noc in self.nocs])
+        return sports, nocs
+
+    def _names(self, sex):
+        n = len(sex)
+        names = np.empty(n, dtype=object)
+        for code, pool in self.first_names.items():
+            mask = sex == code
+            names[mask] = pool[self.rng.integers(0, len(pool), mask.sum())]
+        middle = self.rng.random(n) < 0.25
+        names[middle] = names[middle] + ' ' + self.first_names['M'][self.rng.integers(0, len(self.first_names['M']), middle.sum())]
+        return names + ' ' + self.last_names[self.rng.integers(0, len(self.last_names), n)]
+
+    def _new_athletes(self, n, year, sports, nocs):
+        rng = self.rng
+        sex = np.where(rng.random(n) < female_share(year), 'F', 'M')
+        sport_weights = np.array([SPORTS[s][3] for s in sports], dtype=float)
+        noc_weights = self.noc_weights * nocs
+        noc_index = rng.choice(len(self.nocs), n, p=noc_weights / noc_weights.sum())
+        sport = np.array(sports, dtype=object)[rng.choice(len(sports), n, p=sport_weights / sport_weights.sum())]
+        age = 14 + rng.gamma(3.5, 3.1, n)
+        age[sport == 'Art Competitions'] += 15
+        male = sex == 'M'
+        height = np.where(male, rng.normal(178.9, 9.4, n), rng.normal(167.8, 8.8, n))
+        bmi = np.where(male, rng.normal(23.2, 2.6, n), rng.normal(21.3, 2.3, n))
+        team = self.teams[noc_index].copy()
+        # A few NOCs enter several teams in one event, e.g. "Denmark-1"
+        extra = rng.random(n) < 0.02
+        team[extra] = team[extra] + '-' + rng.integers(1, 3, extra.sum()).astype(str).astype(object)
+        athletes = pd.DataFrame({
+            'ID': np.arange(self.next_id, self.next_id + n),
+            'Name': self._names(sex),
+            'Sex': sex,
+            'Age': np.clip(np.round(age), 10, 97),
+            'Height': np.round(height),
+            'Weight': np.round(bmi * (height / 100) ** 2 * 2) / 2,
+            'Team': team,
+            'NOC': self.nocs[noc_index],
+            'Sport': sport
+        })
+        self.next_id += n
+        return athletes
+
+    def games(self, year, season, city, n):
+        """The rows of one Games"""
+        rng = self.rng
+        sports, nocs = self._active(year, season)
+        entries = rng.geometric(1 / ROWS_PER_ATHLETE, int(n / ROWS_PER_ATHLETE * 1.2) + 10)
+        entries = entries[:np.searchsorted(np.cumsum(entries), n) + 1]
+        entries[-1] -= entries.sum() - n
+
+        previous_year, previous = self.previous.get(season, (None, None))
+        returning = None
+        if previous is not None:
+            previous = previous[previous['Sport'].isin(sports)]
+            count = min(int(len(entries) * RETURN_SHARE), len(previous))
+            returning = previous.sample(count, random_state=rng).copy()
+            returning['Age'] += year - previous_year
+        new = self._new_athletes(len(entries) - (0 if returning is None else len(returning)), year, sports, nocs)
+        athletes = pd.concat([returning, new], ignore_index=True) if returning is not None else new
+        self.previous[season] = (year, athletes)
+
+        rows = athletes.loc[athletes.index.repeat(entries)].reset_index(drop=True)
+        # An athlete's rows are in different events of their sport where it
+        # has enough of them
+        first_event = np.repeat(rng.integers(0, 1 << 30, len(entries)), entries)
+        entry = np.arange(len(rows)) - np.repeat(np.cumsum(entries) - entries, entries)
+        rows['Height'] = rows['Height'].mask(rng.random(len(rows)) < missing_share(year))
+        rows['Weight'] = rows['Weight'].mask(rng.random(len(rows)) < missing_share(year) * 1.02)
+        rows['Age'] = rows['Age'].mask(rng.random(len(rows)) < (0.25 if year < 1920 else 0.01))
+
+        event = np.empty(len(rows), dtype=object)
+        for sport, index in rows.groupby('Sport').indices.items():
+            names = self.events[sport][(first_event[index] + entry[index]) % len(self.events[sport])]
+            if sport in MIXED_SPORTS:
+                prefix = f"{sport} Mixed "
+            else:
+                prefix = np.where(rows['Sex'].to_numpy()[index] == 'F', f"{sport} Women's ", f"{sport} Men's ")
+            event[index] = prefix + names
+        rows['Event'] = event
+
+        medals = list(MEDAL_SHARES)
+        shares = list(MEDAL_SHARES.values())
+        rows['Medal'] = rng.choice(np.array(medals + [None], dtype=object), len(rows), p=shares + [1 - sum(shares)])
+        rows['Games'] = f"{year} {season}"
+        rows['Year'] = year
+        rows['Season'] = season
+        rows['City'] = city
+        # The 1956 equestrian events were held in Stockholm
+        if (year, season) == (1956, 'Summer'):
+            rows.loc[rows['Sport'] == 'Equestrianism', 'City'] = 'Stockholm'
+        return rows[ATHLETE_EVENTS_COLUMNS].astype({'Age': 'Int64', 'Height': 'Int64'})
+
+def generate(scale=1, output=None, seed=42):
+    """Write a synthetic athlete_events.csv with ``scale`` times the rows of
+    the Kaggle dataset.
+
+    The file is written next to ``output`` and renamed once complete.
+    Returns its path.
+    """
+    output = output or default_output(scale)
+    total_rows = int(round(SYNTHETIC_BASE_ROWS * scale))
+    print(f"Generating {total_rows:,} rows ({scale:g}x) into {output}...")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    staging = f"{output}.tmp"
+    start = time.perf_counter()
+    generator = AthleteEventsGenerator(total_rows, seed)
+    written = 0
+    for (year, season, city, _), n in zip(GAMES, generator.games_rows()):
+        rows = generator.games(year, season, city, n)
+        rows.to_csv(staging, mode='w' if written == 0 else 'a', header=written == 0, index=False, na_rep='NA')
+        written += len(rows)
+    os.replace(staging, output)
+    seconds = time.perf_counter() - start
+    print(f"Wrote {written:,} rows of {generator.next_id - 1:,} athletes in {seconds:.1f}s")
+    return output
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic athlete_events.csv")
+    parser.add_argument('--scale', type=float, default=1,
+                        help="size as a multiple of the Kaggle dataset (e.g. 1, 10, 100)")
+    parser.add_argument('--output', default=None,
+                        help="CSV to write (default data/synthetic/athlete_events_<scale>x.csv)")
+    parser.add_argument('--seed', type=int, default=42,
+                        help="random seed; the same scale and seed give the same file")
+    args = parser.parse_args()
+    generate(args.scale, args.output, args.seed)
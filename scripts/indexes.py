@@ -0,0 +1,103 @@
+import argparse
+from contextlib import contextmanager
+from sqlalchemy import inspect, text
+from config import TABLE_INDEXES, ANALYSIS_QUERY_INDEXES
+from dialects import get_dialect
+from instrumentation import staged
+
+def existing_indexes(engine, table):
+    """Names of the secondary indexes currently defined on a table"""
+    return {index['name'] for index in inspect(engine).get_indexes(table)}
+
+@staged('create indexes')
+def create_indexes(engine, tables=None, targets=None):
+    """Build the catalogued indexes that are missing, one ALTER per table on
+    MySQL. ``targets`` maps a catalogued table to the table its indexes are
+    built on instead, e.g. a shadow copy about to replace it."""
+    tables = tables or list(TABLE_INDEXES)
+    targets = targets or {}
+    dialect = get_dialect(engine)
+    present_tables = set(inspect(engine).get_table_names())
+    with engine.connect() as conn:
+        for table in tables:
+            target = targets.get(table, table)
+            if table not in TABLE_INDEXES or target not in present_tables:
+                continue
+            present = existing_indexes(engine, target)
+            missing = {name: cols for name, cols in TABLE_INDEXES[table].items() if name not in present}
+            if not missing:
+                continue
+            for statement in dialect.add_indexes(target, missing):
+                conn.execute(text(statement))
+            print(f"Built indexes on {target}: {', '.join(missing)}")
+
+@staged('drop indexes')
+def drop_indexes(engine, tables=None):
+    """Drop the catalogued indexes before a bulk load.
+
+    MySQL refuses to drop an index that is the only one backing a foreign
+    key; such indexes are kept and reported.
+    """
+    tables = tables or list(TABLE_INDEXES)
+    dialect = get_dialect(engine)
+    present_tables = set(inspect(engine).get_table_names())
+    with engine.connect() as conn:
+        for table in tables:
+            if table not in TABLE_INDEXES or table not in present_tables:
+                continue
+            present = existing_indexes(engine, table)
+            for name in TABLE_INDEXES[table]:
+                if name not in present:
+                    continue
+                try:
+                    conn.execute(text(dialect.drop_index(table, name)))
+                    print(f"Dropped index {name} on {table}")
+                except Exception as e:
+                    print(f"Warning: kept index {name} on {table}: {e}")
+
+@contextmanager
+def deferred_indexes(engine, tables=None):
+    """Drop secondary indexes for the duration of a bulk load and rebuild
+    them afterwards, even if the load fails"""
+    drop_indexes(engine, tables)
+    try:
+        yield
+    finally:
+        create_indexes(engine, tables)
+
+def check_index_usage(engine):
+    """EXPLAIN every analysis query and report whether it uses its intended
+    index. Returns the names of the queries that do not."""
+    # Imported here so loading this module does not pull in matplotlib
+    from analyze import QUERIES
+
+    dialect = get_dialect(engine)
+    misses = []
+    with engine.connect() as conn:
+        for name, query in QUERIES.items():
+            if name not in ANALYSIS_QUERY_INDEXES:
+                continue
+            table, index = ANALYSIS_QUERY_INDEXES[name]
+            used = dialect.used_indexes(conn, query)
+            if index in used:
+                print(f"OK    {name}: uses {index} on {table}")
+            else:
+                print(f"MISS  {name}: expected {index} on {table}, plan uses {used or 'no index'}")
+                misses.append(name)
+    return misses
+
+if __name__ == "__main__":
+    from db import get_engine
+
+    parser = argparse.ArgumentParser(description="Manage the secondary indexes of the Olympics schema")
+    parser.add_argument('action', choices=['create', 'drop', 'check'],
+                        help="build missing indexes, drop them, or EXPLAIN the analysis queries")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if args.action == 'create':
+        create_indexes(engine)
+    elif args.action == 'drop':
+        drop_indexes(engine)
+    elif check_index_usage(engine):
+        raise SystemExit(1)
@@ -0,0 +1,233 @@
+import datetime
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+from config import RUN_REPORT_ENABLED, RUN_REPORT_DIR, RUN_REPORT_MAX_STATEMENTS
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+def peak_rss_mb(children=False):
+    """Peak resident set size of this process (or of its finished child
+    processes) so far, or None where it cannot be measured"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 ** 2 if sys.platform == 'darwin' else 1024
+    return round(usage.ru_maxrss / scale, 1)
+
+class Stage:
+    """Timing, row counts and SQL activity of one named pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.rows_written = 0
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.seconds = None
+        self.status = 'running'
+        self.peak_rss_mb = None
+
+    def finish(self, status):
+        self.seconds = time.perf_counter() - self._start
+        self.status = status
+        self.peak_rss_mb = peak_rss_mb()
+
+    def as_dict(self):
+        rows = self.rows if self.rows is not None else self.rows_written
+        return {
+            'name': self.name,
+            'status': self.status,
+            'started_at': datetime.datetime.fromtimestamp(self.started).isoformat(timespec='milliseconds'),
+            'seconds': round(self.seconds, 6) if self.seconds is not None else None,
+            'rows': rows,
+            'rows_written': self.rows_written,
+            'rows_per_sec': round(rows / self.seconds, 1) if rows and self.seconds else None,
+            'peak_rss_mb': self.peak_rss_mb,
+            'sql_statements': self.sql_statements,
+            'sql_seconds': round(self.sql_seconds, 6)
+        }
+
+class Recorder:
+    """Stages and SQL statements recorded during one run.
+
+    Stages nest per thread, so concurrent work (e.g. the analysis queries)
+    records its own stages. SQL executed through SQLAlchemy is attributed to
+    the innermost stage of the executing thread; bulk writes over raw DBAPI
+    connections are counted through ``add_rows_written`` instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stages = []
+        self.statements = []
+        self.statement_totals = {}
+        self.dropped_statements = 0
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def current(self):
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def stage(self, name):
+        stack = self._stack()
+        full_name = "/".join([s.name for s in stack[-1:]] + [name])
+        current = Stage(full_name)
+        with self._lock:
+            self.stages.append(current)
+        stack.append(current)
+        try:
+            yield current
+        except BaseException:
+            current.finish('failed')
+            raise
+        else:
+            current.finish('ok')
+        finally:
+            stack.pop()
+
+    def add_rows_written(self, rows):
+        for current in self._stack():
+            current.rows_written += rows
+
+    def record_sql(self, statement, seconds, rows, executemany):
+        sql = " ".join(statement.split())
+        stack = list(self._stack())
+        with self._lock:
+            for current in stack:
+                current.sql_statements += 1
+                current.sql_seconds += seconds
+            totals = self.statement_totals.setdefault(sql[:200], {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0})
+            totals['count'] += 1
+            totals['seconds'] += seconds
+            totals['max_seconds'] = max(totals['max_seconds'], seconds)
+            totals['rows'] += max(rows, 0)
+            if len(self.statements) < RUN_REPORT_MAX_STATEMENTS:
+                self.statements.append({
+                    'stage': stack[-1].name if stack else None,
+                    'sql': sql[:1000],
+                    'seconds': round(seconds, 6),
+                    'rows': rows,
+                    'executemany': executemany
+                })
+            else:
+                self.dropped_statements += 1
+
+recorder = Recorder()
+
+def stage(name):
+    """Context manager recording a stage of the current run; yields the
+    ``Stage`` so the caller can set ``rows``"""
+    return recorder.stage(name)
+
+def staged(name, rows=None):
+    """Decorator recording every call of a function as a stage; ``rows``
+    computes the stage's row count from the return value"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name) as current:
+                result = func(*args, **kwargs)
+                if rows is not None and result is not None:
+                    current.rows = rows(result)
+                return result
+        return wrapper
+    return decorate
+
+def add_rows_written(rows):
+    recorder.add_rows_written(rows)
+
+def instrument_engine(engine):
+    """Time every statement executed through ``engine``"""
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info['query_start'].pop()
+        recorder.record_sql(statement, seconds, cursor.rowcount, executemany)
+
+    @event.listens_for(engine, 'handle_error')
+    def on_error(context):
+        starts = context.connection.info.get('query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+def build_report(script, started, status, error=None, extra=None):
+    """The JSON-serializable report of the run so far"""
+    # Imported here to keep this module free of a dependency on the engine
+    from bulk_writer import write_log
+    from db import pool_status
+
+    slowest = sorted(recorder.statement_totals.items(), key=lambda item: item[1]['seconds'], reverse=True)
+    report = {
+        'script': script,
+        'status': status,
+        'error': error,
+        'started_at': datetime.datetime.fromtimestamp(started).isoformat(timespec='seconds'),
+        'wall_seconds': round(time.time() - started, 6),
+        'peak_rss_mb': peak_rss_mb(),
+        'children_peak_rss_mb': peak_rss_mb(children=True),
+        'stages': [s.as_dict() for s in recorder.stages],
+        'bulk_writes': [
+            {'table': w.table, 'strategy': w.strategy, 'rows': w.rows, 'seconds': round(w.seconds, 6),
+             'rows_per_sec': round(w.rows_per_sec, 1) if w.seconds > 0 else None}
+            for w in write_log
+        ],
+        'sql': {
+            'statements': sum(t['count'] for t in recorder.statement_totals.values()),
+            'seconds': round(sum(t['seconds'] for t in recorder.statement_totals.values()), 6),
+            'by_statement': [dict(sql=sql, **{k: round(v, 6) if isinstance(v, float) else v for k, v in totals.items()})
+                             for sql, totals in slowest],
+            'log': recorder.statements,
+            'log_dropped': recorder.dropped_statements
+        },
+        'pool': pool_status()
+    }
+    report.update(extra or {})
+    return report
+
+@contextmanager
+def run_report(script, **extra):
+    """Record a whole script run and write its JSON report to RUN_REPORT_DIR
+    when it ends, whether it succeeds or fails"""
+    global recorder
+    recorder = Recorder()
+    started = time.time()
+    status, error = 'ok', None
+    try:
+        with recorder.stage(script):
+            yield recorder
+    except BaseException as e:
+        status, error = 'failed', f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if RUN_REPORT_ENABLED:
+            write_report(build_report(script, started, status, error, extra))
+
+def write_report(report):
+    os.makedirs(RUN_REPORT_DIR, exist_ok=True)
+    stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    path = os.path.join(RUN_REPORT_DIR, f"{report['script']}-{stamp}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\nRun report written to {path}")
+    return path
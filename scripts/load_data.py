@@ -1,32 +1,32 @@
 import pandas as pd
-from sqlalchemy import create_engine, text
-import pymysql
+from sqlalchemy import text, inspect
 import os
+import argparse
 from pathlib import Path
-from config import MYSQL_CONFIG, TABLE_DEPENDENCIES, TABLE_SCHEMAS, ATHLETE_EVENTS_CSV, NOC_REGIONS_CSV
+from config import (TABLE_DEPENDENCIES, TABLE_SCHEMAS, ATHLETE_EVENTS_CSV, NOC_REGIONS_CSV,
+                    ATHLETE_EVENTS_COLUMNS, ATHLETE_EVENTS_DTYPES, LOAD_CHUNK_SIZE, METADATA_SCHEMAS,
+                    PARTITION_RESULTS)
+from db import get_engine, print_pool_metrics, foreign_key_checks_disabled
+from dialects import execute_ddl, set_foreign_key_checks
+from bulk_writer import bulk_write, print_write_report
+from dtypes import compact, memory_report
+from surrogate_keys import DimensionKeys
+from indexes import deferred_indexes
+from partitions import ensure_partitions, PartitionSwap
+from summaries import build_summaries, refresh_summaries
+from query_cache import bump_data_version
+from validation import ReferentialValidator
+from instrumentation import run_report, stage, staged
 
 # Get the absolute path to the data directory
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-def get_mysql_engine():
-    try:
-        connection_str = f"mysql+pymysql://{MYSQL_CONFIG['user']}:{MYSQL_CONFIG['password']}@" \
-                        f"{MYSQL_CONFIG['host']}:{MYSQL_CONFIG['port']}/{MYSQL_CONFIG['database']}"
-        engine = create_engine(connection_str, echo=False)
-        # Test the connection
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        return engine
-    except Exception as e:
-        print(f"Error connecting to database: {e}")
-        raise
-
 def drop_all_tables(conn):
     """Drop all tables in the correct order to handle foreign key constraints"""
     print("Dropping existing tables...")
     try:
         # Disable foreign key checks
-        conn.execute(text("SET FOREIGN_KEY_CHECKS = 0"))
+        set_foreign_key_checks(conn, False)
         
         # Drop tables in reverse order of dependencies
         for table in TABLE_DEPENDENCIES:
@@ -34,12 +34,12 @@ def drop_all_tables(conn):
             print(f"Dropped table {table}")
             
         # Re-enable foreign key checks
-        conn.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
+        set_foreign_key_checks(conn, True)
         print("All tables dropped successfully")
     except Exception as e:
         print(f"Error dropping tables: {e}")
         # Make sure to re-enable foreign key checks even if there's an error
-        conn.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
+        set_foreign_key_checks(conn, True)
         raise
 
 def create_tables(engine):
@@ -48,15 +48,15 @@ def create_tables(engine):
     try:
         with engine.connect() as conn:
             # Disable foreign key checks
-            conn.execute(text("SET FOREIGN_KEY_CHECKS = 0"))
+            set_foreign_key_checks(conn, False)
             
             # Create tables in reverse dependency order
             for table in reversed(TABLE_DEPENDENCIES):
-                conn.execute(text(TABLE_SCHEMAS[table]))
+                execute_ddl(conn, TABLE_SCHEMAS[table])
                 print(f"Created table {table}")
             
             # Re-enable foreign key checks
-            conn.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
+            set_foreign_key_checks(conn, True)
             
         print("Tables created successfully")
     except Exception as e:
@@ -64,34 +64,226 @@ def create_tables(engine):
         # Make sure to re-enable foreign key checks even if there's an error
         try:
             with engine.connect() as conn:
-                conn.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
+                set_foreign_key_checks(conn, True)
         except:
             pass
         raise
 
-def load_data_to_db():
+def create_missing_tables(engine):
+    """Create any table that does not exist yet, leaving existing data alone"""
+    existing = set(inspect(engine).get_table_names())
+    with engine.connect() as conn:
+        for table in reversed(TABLE_DEPENDENCIES):
+            if table not in existing:
+                execute_ddl(conn, TABLE_SCHEMAS[table])
+                print(f"Created table {table}")
+        execute_ddl(conn, METADATA_SCHEMAS['load_manifest'])
+
+def reset_manifest(engine):
+    """Recreate an empty load manifest for a full reload"""
+    with engine.connect() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS load_manifest"))
+        execute_ddl(conn, METADATA_SCHEMAS['load_manifest'])
+
+def read_athlete_events(csv_path=ATHLETE_EVENTS_CSV, chunksize=None):
+    """Read athlete_events.csv with explicit columns and dtypes.
+
+    With ``chunksize`` set, returns an iterator of DataFrames instead of a
+    single frame.
+    """
+    return pd.read_csv(
+        csv_path,
+        usecols=ATHLETE_EVENTS_COLUMNS,
+        dtype=ATHLETE_EVENTS_DTYPES,
+        chunksize=chunksize
+    )
+
+def load_noc_regions():
+    """Read noc_regions.csv; NOCs missing from it are added while validating
+    the results (see missing_countries)"""
+    return pd.read_csv(NOC_REGIONS_CSV)
+
+def missing_countries(nocs, athlete_events_df):
+    """countries rows for NOCs of athlete_events missing from
+    noc_regions.csv, with the region named after the team most of their
+    entries competed as (e.g. 'Singapore' for SGP's 'Singapore-2')"""
+    nocs = pd.Index(nocs).astype(str)
+    rows = athlete_events_df[athlete_events_df['NOC'].isin(nocs)]
+    teams = pd.DataFrame({
+        'NOC': rows['NOC'].astype(str),
+        'Team': rows['Team'].astype(str).str.replace(r"-\d+$", "", regex=True)
+    })
+    regions = teams.value_counts().reset_index().drop_duplicates('NOC').set_index('NOC')['Team']
+    return pd.DataFrame({'NOC': nocs, 'Region': regions.reindex(nocs).to_numpy(),
+                         'Notes': 'Not in noc_regions.csv'})
+
+@staged('populate countries')
+def populate_countries(engine, noc_df):
+    print("Populating NOCs table...")
+    noc_to_insert = noc_df[['NOC', 'region', 'notes']].copy()
+    noc_to_insert.rename(columns={'region': 'Region', 'notes': 'Notes'}, inplace=True)
+    bulk_write(engine, noc_to_insert, 'countries')
+
+def games_fingerprints(athlete_events_df):
+    """Content fingerprint and row count of each Games in a frame.
+
+    The fingerprint is the wrapping uint64 sum of the row hashes, so it does
+    not depend on row order and fingerprints of chunks can be merged with
+    ``merge_fingerprints``.
+    """
+    row_hashes = pd.util.hash_pandas_object(athlete_events_df[ATHLETE_EVENTS_COLUMNS], index=False)
+    frame = athlete_events_df[['Games', 'Season']].assign(fingerprint=row_hashes.to_numpy(), row_count=1)
+    return frame.groupby(['Games', 'Season'], as_index=False, sort=False, observed=True)[['fingerprint', 'row_count']].sum()
+
+def merge_fingerprints(parts):
+    if not parts:
+        return pd.DataFrame(columns=['Games', 'Season', 'fingerprint', 'row_count'])
+    return pd.concat(parts).groupby(['Games', 'Season'], as_index=False, sort=False, observed=True)[['fingerprint', 'row_count']].sum()
+
+@staged('write manifest')
+def write_manifest(engine, keys, fingerprints):
+    """Record the fingerprint of each loaded Games in load_manifest"""
+    manifest = fingerprints.rename(columns={'Games': 'game_name', 'Season': 'season'})
+    manifest['game_id'] = keys['games'].lookup(fingerprints[['Games', 'Season']])
+    manifest['fingerprint'] = manifest['fingerprint'].map(lambda h: f"{int(h) & 0xFFFFFFFFFFFFFFFF:016x}")
+    manifest['cleaned'] = 0
+    game_ids = ", ".join(str(int(game_id)) for game_id in manifest['game_id'])
+    if game_ids:
+        with engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM load_manifest WHERE game_id IN ({game_ids})"))
+    bulk_write(engine, manifest[['game_id', 'game_name', 'season', 'fingerprint', 'row_count', 'cleaned']], 'load_manifest')
+
+def new_dimension_keys():
+    """Surrogate key registries for the dimensions derived from athlete_events.
+
+    Events are keyed on (event, sport) and games on (games, season), so
+    members sharing a name are kept apart.
+    """
+    return {
+        'sports': DimensionKeys('sports', 'sport_id', ['Sport']),
+        'events': DimensionKeys('events', 'event_id', ['Event', 'Sport']),
+        'cities': DimensionKeys('cities', 'city_id', ['City']),
+        'games': DimensionKeys('games', 'game_id', ['Games', 'Season']),
+        'teams': DimensionKeys('teams', 'team_id', ['Team'])
+    }
+
+@staged('assign surrogate keys', rows=lambda result: len(result[1]))
+def encode_athlete_events(keys, athlete_events_df):
+    """Assign surrogate keys to athlete_events rows.
+
+    Returns the dimension members first seen in this frame, by table in
+    insertion order and with explicit IDs, and the results rows with their
+    foreign keys filled in.
+    """
+    df = athlete_events_df
+    _, new_sports = keys['sports'].encode(df[['Sport']])
+    event_ids, new_events = keys['events'].encode(df[['Event', 'Sport']])
+    _, new_cities = keys['cities'].encode(df[['City']])
+    game_ids, new_games = keys['games'].encode(df[['Games', 'Season', 'Year', 'City']])
+    team_ids, new_teams = keys['teams'].encode(df[['Team']])
+
+    new_events['sport_id'] = keys['sports'].lookup(new_events[['Sport']])
+    new_games['city_id'] = keys['cities'].lookup(new_games[['City']])
+
+    dimensions = {
+        'sports': new_sports.rename(columns={'Sport': 'sport_name'})[['sport_id', 'sport_name']],
+        'events': new_events.rename(columns={'Event': 'event_name'})[['event_id', 'event_name', 'sport_id']],
+        'cities': new_cities.rename(columns={'City': 'city_name'})[['city_id', 'city_name']],
+        'games': new_games.rename(columns={'Games': 'game_name', 'Year': 'year', 'Season': 'season'})[
+            ['game_id', 'game_name', 'year', 'season', 'city_id']],
+        'teams': new_teams.rename(columns={'Team': 'team_name'})[['team_id', 'team_name']]
+    }
+
+    results_df = pd.DataFrame({
+        'athlete_id': df['ID'].to_numpy(),
+        'game_id': game_ids,
+        'event_id': event_ids,
+        'team_id': team_ids,
+        'NOC': df['NOC'].array,
+        'age': pd.to_numeric(df['Age'], errors='coerce').to_numpy(),
+        'height_cm': pd.to_numeric(df['Height'], errors='coerce').to_numpy(),
+        'weight_kg': pd.to_numeric(df['Weight'], errors='coerce').to_numpy(),
+        'medal': df['Medal'].array
+    })
+    if PARTITION_RESULTS:
+        # Partition key of the results table
+        results_df['year'] = df['Year'].to_numpy()
+        results_df['season'] = df['Season'].array
+    return dimensions, compact(results_df, 'results')
+
+@staged('seed surrogate keys')
+def seed_dimension_keys(engine, keys):
+    """Seed the key registries with the members already in the database"""
+    keys['sports'].seed(pd.read_sql("SELECT sport_id, sport_name AS Sport FROM sports", con=engine))
+    keys['events'].seed(pd.read_sql(
+        "SELECT e.event_id, e.event_name AS Event, s.sport_name AS Sport "
+        "FROM events e JOIN sports s ON e.sport_id = s.sport_id", con=engine))
+    keys['cities'].seed(pd.read_sql("SELECT city_id, city_name AS City FROM cities", con=engine))
+    keys['games'].seed(pd.read_sql("SELECT game_id, game_name AS Games, season AS Season FROM games", con=engine))
+    keys['teams'].seed(pd.read_sql("SELECT team_id, team_name AS Team FROM teams", con=engine))
+
+def new_validator(engine):
+    """Validator for athlete_events loads: missing NOCs are added to
+    countries, other orphan rows quarantined"""
+    return ReferentialValidator(engine, create={'countries': missing_countries})
+
+@staged('validate foreign keys', rows=lambda result: len(result[2]))
+def validate_foreign_keys(validator, keys, dimensions, athletes_df, results_df, athlete_ids, nocs, source):
+    """Anti-join the frames about to be written against their parents'
+    keys: the surrogate key registries, ``athlete_ids`` and ``nocs``.
+
+    Returns the dimension members, athletes and results left to write.
+    """
+    parents = {table: dimension_keys.ids() for table, dimension_keys in keys.items()}
+    parents.update(athletes=athlete_ids, countries=nocs)
+    # Parents before children, so rows referencing quarantined members are
+    # quarantined with them
+    dimensions = {table: validator.check(table, members, parents, source) for table, members in dimensions.items()}
+    athletes_df = validator.check('athletes', athletes_df, parents, source)
+    results_df = validator.check('results', results_df, parents, source)
+    return dimensions, athletes_df, results_df
+
+@staged('write dimensions')
+def write_dimensions(engine, dimensions):
+    for table, members in dimensions.items():
+        if len(members):
+            bulk_write(engine, members, table)
+
+def new_athletes(chunk, seen_athletes):
+    """athletes rows of a chunk not written by an earlier chunk, and the IDs
+    of every athlete in the chunk, which its results rows may reference"""
+    athletes_df = chunk[['ID', 'Name', 'Sex']].drop_duplicates(subset=['ID'])
+    athlete_ids = athletes_df['ID']
+    athletes_df = athletes_df[~athletes_df['ID'].isin(seen_athletes)]
+    seen_athletes.update(athletes_df['ID'])
+    return athletes_df.rename(columns={'ID': 'athlete_id', 'Name': 'athlete_name', 'Sex': 'sex'}), athlete_ids
+
+def load_data_to_db(csv_path=ATHLETE_EVENTS_CSV):
     print("Starting data loading process...")
 
     # Load CSVs
     print("Loading CSV files...")
     try:
-        if not os.path.exists(ATHLETE_EVENTS_CSV):
-            raise FileNotFoundError(f"Athlete events CSV not found at: {ATHLETE_EVENTS_CSV}")
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(f"Athlete events CSV not found at: {csv_path}")
         if not os.path.exists(NOC_REGIONS_CSV):
             raise FileNotFoundError(f"NOC regions CSV not found at: {NOC_REGIONS_CSV}")
             
-        athlete_events_df = pd.read_csv(ATHLETE_EVENTS_CSV)
-        noc_df = pd.read_csv(NOC_REGIONS_CSV)
+        with stage('read csv') as current:
+            athlete_events_df = read_athlete_events(csv_path)
+            noc_df = load_noc_regions()
+            current.rows = len(athlete_events_df)
         print("CSV files loaded successfully.")
+        memory_report("reading the CSV files", {'athlete_events': athlete_events_df})
     except FileNotFoundError as e:
         print(f"Error loading CSV files: {e}")
         return
     except Exception as e:
         print(f"Unexpected error loading CSV files: {e}")
-        return
+        raise
 
     try:
-        engine = get_mysql_engine()
+        engine = get_engine()
         conn = engine.connect()
 
         # Drop all existing tables
@@ -100,92 +292,250 @@ def load_data_to_db():
         # Create tables with proper schemas
         create_tables(engine)
 
-        # --- 1. Populate NOCs Table --- 
-        print("Populating NOCs table...")
-        if 'SGP' not in noc_df['NOC'].values:
-            sgp_row = pd.DataFrame([{'NOC': 'SGP', 'region': 'Singapore', 'notes': 'Added manually'}])
-            noc_df = pd.concat([noc_df, sgp_row], ignore_index=True)
-        
-        noc_to_insert = noc_df[['NOC', 'region', 'notes']].copy()
-        noc_to_insert.rename(columns={'region': 'Region', 'notes': 'Notes'}, inplace=True)
-        noc_to_insert.to_sql('countries', con=engine, if_exists='append', index=False)
-
-        # --- 2. Populate Athletes Table --- 
-        print("Populating Athletes table...")
-        athletes_df = athlete_events_df[['ID', 'Name', 'Sex']].copy()
-        athletes_df.drop_duplicates(subset=['ID'], inplace=True)
-        athletes_df.rename(columns={'ID': 'athlete_id', 'Name': 'athlete_name', 'Sex': 'sex'}, inplace=True)
-        athletes_df.to_sql('athletes', con=engine, if_exists='append', index=False)
-
-        # --- 3. Populate Sports Table --- 
-        print("Populating Sports table...")
-        sports_df = athlete_events_df[['Sport']].drop_duplicates()
-        sports_df.rename(columns={'Sport': 'sport_name'}, inplace=True)
-        sports_df.to_sql('sports', con=engine, if_exists='append', index=False)
-
-        # Retrieve SportID mapping
-        sports_map = pd.read_sql("SELECT sport_id, sport_name FROM sports", con=engine)
-        sports_map_dict = dict(zip(sports_map['sport_name'], sports_map['sport_id']))
-
-        # --- 4. Populate Events Table --- 
-        print("Populating Events table...")
-        events_df = athlete_events_df[['Event', 'Sport']].drop_duplicates()
-        events_df['sport_id'] = events_df['Sport'].map(sports_map_dict)
-        events_df.rename(columns={'Event': 'event_name'}, inplace=True)
-        events_df[['event_name', 'sport_id']].to_sql('events', con=engine, if_exists='append', index=False)
-
-        # --- 5. Populate Cities Table ---
-        print("Populating Cities table...")
-        cities_df = athlete_events_df[['City']].drop_duplicates()
-        cities_df.rename(columns={'City': 'city_name'}, inplace=True)
-        cities_df.to_sql('cities', con=engine, if_exists='append', index=False)
-
-        # --- 6. Populate Games Table --- 
-        print("Populating Games table...")
-        games_df = athlete_events_df[['Games', 'Year', 'Season', 'City']].drop_duplicates()
-        games_df.rename(columns={'Games': 'game_name', 'Year': 'year', 'Season': 'season', 'City': 'city_name'}, inplace=True)
-        cities_map = pd.read_sql("SELECT city_id, city_name FROM cities", con=engine)
-        games_df['city_id'] = games_df['city_name'].map(dict(zip(cities_map['city_name'], cities_map['city_id'])))
-        games_df[['game_name', 'year', 'season', 'city_id']].to_sql('games', con=engine, if_exists='append', index=False)
-
-        # --- 7. Populate Teams Table ---
-        print("Populating Teams table...")
-        teams_df = athlete_events_df[['Team']].drop_duplicates()
-        teams_df.rename(columns={'Team': 'team_name'}, inplace=True)
-        teams_df.to_sql('teams', con=engine, if_exists='append', index=False)
-
-        # --- 8. Populate Results Table ---
-        print("Populating Results table...")
-        # إعداد الخرائط
-        events_map = pd.read_sql("SELECT event_id, event_name FROM events", con=engine)
-        games_map = pd.read_sql("SELECT game_id, game_name FROM games", con=engine)
-        teams_map = pd.read_sql("SELECT team_id, team_name FROM teams", con=engine)
-
-        results_df = athlete_events_df[['ID', 'Games', 'Event', 'Team', 'NOC', 'Age', 'Height', 'Weight', 'Medal']].copy()
-        results_df.rename(columns={'ID': 'athlete_id'}, inplace=True)
-        results_df['game_id'] = results_df['Games'].map(dict(zip(games_map['game_name'], games_map['game_id'])))
-        results_df['event_id'] = results_df['Event'].map(dict(zip(events_map['event_name'], events_map['event_id'])))
-        results_df['team_id'] = results_df['Team'].map(dict(zip(teams_map['team_name'], teams_map['team_id'])))
-        results_df['age'] = pd.to_numeric(results_df['Age'], errors='coerce')
-        results_df['height_cm'] = pd.to_numeric(results_df['Height'], errors='coerce')
-        results_df['weight_kg'] = pd.to_numeric(results_df['Weight'], errors='coerce')
-        results_df['medal'] = results_df['Medal'].where(pd.notnull(results_df['Medal']), None)
-
-        results_df[['athlete_id', 'game_id', 'event_id', 'team_id', 'NOC', 'age', 'height_cm', 'weight_kg', 'medal']].to_sql(
-            'results', 
-            con=engine, 
-            if_exists='append', 
-            index=False, 
-            chunksize=10000
-        )
+        # Secondary indexes are built once, after the bulk load. Every row
+        # is validated before it is written, so the database need not check
+        # foreign keys row by row.
+        with deferred_indexes(engine), foreign_key_checks_disabled():
+            # --- 1. Populate NOCs Table --- 
+            populate_countries(engine, noc_df)
+
+            # --- 2. Assign surrogate keys ---
+            keys = new_dimension_keys()
+            dimensions, results_df = encode_athlete_events(keys, athlete_events_df)
+            memory_report("assigning surrogate keys", {'athlete_events': athlete_events_df, 'results': results_df})
+
+            # --- 3. Validate foreign keys ---
+            athletes_df, athlete_ids = new_athletes(athlete_events_df, set())
+            validator = new_validator(engine)
+            dimensions, athletes_df, results_df = validate_foreign_keys(
+                validator, keys, dimensions, athletes_df, results_df, athlete_ids, noc_df['NOC'], athlete_events_df)
+
+            # --- 4-8. Populate Sports, Events, Cities, Games and Teams Tables ---
+            print("Populating dimension tables...")
+            write_dimensions(engine, dimensions)
+
+            # --- 9. Populate Athletes Table --- 
+            print("Populating Athletes table...")
+            with stage('write athletes'):
+                bulk_write(engine, athletes_df, 'athletes')
+
+            # --- 10. Populate Results Table ---
+            print("Populating Results table...")
+            with stage('write results'):
+                ensure_partitions(engine, athlete_events_df['Year'].unique())
+                bulk_write(engine, results_df, 'results')
+        validator.report()
+
+        # --- 11. Record Games fingerprints for incremental loads ---
+        reset_manifest(engine)
+        write_manifest(engine, keys, games_fingerprints(athlete_events_df))
+
+        # --- 12. Build summary tables for the analyses ---
+        build_summaries(engine)
+        bump_data_version(engine)
+
+        print_write_report()
+        print("Data loading process finished successfully.")
 
+    except Exception as e:
+        print(f"Error during data loading: {e}")
+        raise
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+def load_data_streaming(csv_path=ATHLETE_EVENTS_CSV, chunk_size=LOAD_CHUNK_SIZE):
+    """Load athlete_events.csv in one pass of fixed-size chunks with bounded memory.
+
+    Surrogate keys are assigned in-process, so each chunk's new dimension
+    members, new athletes and results rows are written before the next chunk
+    is read. Only the distinct dimension keys and the set of seen athlete IDs
+    are kept across chunks; peak memory depends on ``chunk_size`` rather than
+    on the number of rows.
+    """
+    print(f"Starting streaming data loading process (chunk size {chunk_size})...")
+
+    if not os.path.exists(csv_path):
+        print(f"Error loading CSV files: Athlete events CSV not found at: {csv_path}")
+        return
+    if not os.path.exists(NOC_REGIONS_CSV):
+        print(f"Error loading CSV files: NOC regions CSV not found at: {NOC_REGIONS_CSV}")
+        return
+
+    try:
+        engine = get_engine()
+        conn = engine.connect()
+
+        drop_all_tables(conn)
+        create_tables(engine)
+
+        # Secondary indexes are built once, after the bulk load; rows are
+        # validated before they are written, so foreign key checks stay off
+        with deferred_indexes(engine), foreign_key_checks_disabled():
+            # --- 1. Populate NOCs Table ---
+            noc_df = load_noc_regions()
+            populate_countries(engine, noc_df)
+
+            # --- 2. Populate the remaining tables chunk by chunk ---
+            print("Populating tables from athlete events...")
+            keys = new_dimension_keys()
+            validator = new_validator(engine)
+            seen_athletes = set()
+            fingerprints = []
+            total_rows = 0
+            for chunk in read_athlete_events(csv_path, chunksize=chunk_size):
+                with stage('load chunk') as current:
+                    dimensions, results_df = encode_athlete_events(keys, chunk)
+                    athletes_df, athlete_ids = new_athletes(chunk, seen_athletes)
+                    dimensions, athletes_df, results_df = validate_foreign_keys(
+                        validator, keys, dimensions, athletes_df, results_df, athlete_ids, noc_df['NOC'], chunk)
+                    write_dimensions(engine, dimensions)
+                    bulk_write(engine, athletes_df, 'athletes')
+
+                    ensure_partitions(engine, chunk['Year'].unique())
+                    bulk_write(engine, results_df, 'results')
+                    fingerprints.append(games_fingerprints(chunk))
+                    current.rows = len(chunk)
+                total_rows += len(chunk)
+                print(f"Loaded {total_rows} results rows")
+        validator.report()
+
+        reset_manifest(engine)
+        write_manifest(engine, keys, merge_fingerprints(fingerprints))
+        build_summaries(engine)
+        bump_data_version(engine)
+
+        print_write_report()
         print("Data loading process finished successfully.")
 
     except Exception as e:
         print(f"Error during data loading: {e}")
+        raise
     finally:
         if 'conn' in locals():
             conn.close()
 
+def load_data_incremental(csv_path=ATHLETE_EVENTS_CSV, chunk_size=LOAD_CHUNK_SIZE):
+    """Load only the Games that are new or changed since the last load.
+
+    Each Games in the CSV is fingerprinted and compared with load_manifest.
+    Rows of unchanged Games are skipped; changed Games have their results
+    replaced; new dimension members and athletes are inserted and existing
+    ones are left as they are. Games missing from the CSV are not touched, so
+    the CSV may hold just the new editions.
+
+    Secondary indexes stay in place: maintaining them for one Games is far
+    cheaper than rebuilding them over the whole history.
+    """
+    print("Starting incremental data loading process...")
+
+    if not os.path.exists(csv_path):
+        print(f"Error loading CSV files: Athlete events CSV not found at: {csv_path}")
+        return
+
+    try:
+        engine = get_engine()
+
+        existing = set(inspect(engine).get_table_names())
+        create_missing_tables(engine)
+        if 'countries' not in existing:
+            populate_countries(engine, load_noc_regions())
+        nocs = pd.read_sql("SELECT NOC FROM countries", con=engine)['NOC']
+
+        # --- 1. Find new and changed Games ---
+        print("Fingerprinting Games...")
+        with stage('fingerprint games'):
+            fingerprints = merge_fingerprints(
+                [games_fingerprints(chunk) for chunk in read_athlete_events(csv_path, chunksize=chunk_size)])
+        fingerprints['fingerprint_hex'] = fingerprints['fingerprint'].map(lambda h: f"{int(h) & 0xFFFFFFFFFFFFFFFF:016x}")
+        manifest = pd.read_sql("SELECT game_name AS Games, season AS Season, fingerprint AS loaded FROM load_manifest", con=engine)
+        fingerprints = fingerprints.merge(manifest, on=['Games', 'Season'], how='left')
+        delta = fingerprints[fingerprints['fingerprint_hex'] != fingerprints['loaded']]
+        if delta.empty:
+            print("No new or changed Games; nothing to load.")
+            return
+        changed = delta[delta['loaded'].notna()]
+        print(f"{len(delta) - len(changed)} new and {len(changed)} changed Games to load")
+
+        # --- 2. Seed surrogate keys from the database ---
+        keys = new_dimension_keys()
+        seed_dimension_keys(engine, keys)
+        seen_athletes = set(pd.read_sql("SELECT athlete_id FROM athletes", con=engine)['athlete_id'])
+
+        # --- 3. Remove results of new and changed Games ---
+        # New Games only have results here when an earlier load of them
+        # failed before the manifest was written; removing those keeps a
+        # retry from appending them twice. A partitioned results table
+        # instead gets each delta Games swapped in as a whole partition at
+        # the end.
+        swap = PartitionSwap(engine) if PARTITION_RESULTS else None
+        delta_ids = keys['games'].lookup(delta[['Games', 'Season']])
+        delta_ids = delta_ids[~delta_ids.isna()]
+        if len(delta_ids) and swap is None:
+            game_ids = ", ".join(str(int(game_id)) for game_id in delta_ids)
+            with engine.begin() as conn:
+                removed = conn.execute(text(f"DELETE FROM results WHERE game_id IN ({game_ids})")).rowcount
+            print(f"Removed {removed} results rows of {len(delta_ids)} new or changed Games")
+
+        # --- 4. Append the rows of new and changed Games ---
+        delta_games = pd.MultiIndex.from_frame(delta[['Games', 'Season']])
+        validator = new_validator(engine)
+        total_rows = 0
+        for chunk in read_athlete_events(csv_path, chunksize=chunk_size):
+            chunk = chunk[pd.MultiIndex.from_frame(chunk[['Games', 'Season']]).isin(delta_games)]
+            if chunk.empty:
+                continue
+            with stage('load chunk') as current, foreign_key_checks_disabled():
+                dimensions, results_df = encode_athlete_events(keys, chunk)
+                athletes_df, athlete_ids = new_athletes(chunk, seen_athletes)
+                dimensions, athletes_df, results_df = validate_foreign_keys(
+                    validator, keys, dimensions, athletes_df, results_df, athlete_ids, nocs, chunk)
+                write_dimensions(engine, dimensions)
+                bulk_write(engine, athletes_df, 'athletes')
+
+                if swap is not None:
+                    ensure_partitions(engine, chunk['Year'].unique())
+                    swap.write(results_df)
+                else:
+                    bulk_write(engine, results_df, 'results')
+                current.rows = len(chunk)
+            total_rows += len(chunk)
+            print(f"Loaded {total_rows} results rows")
+        validator.report()
+
+        if swap is not None:
+            swap.commit()
+        write_manifest(engine, keys, delta[['Games', 'Season', 'fingerprint', 'row_count']])
+        refresh_summaries(engine, keys['games'].lookup(delta[['Games', 'Season']]).dropna())
+        bump_data_version(engine)
+
+        print_write_report()
+        print("Incremental data loading process finished successfully.")
+
+    except Exception as e:
+        print(f"Error during incremental data loading: {e}")
+        if 'swap' in locals() and swap is not None:
+            swap.discard()
+        raise
+
 if __name__ == "__main__":
-    load_data_to_db()
+    parser = argparse.ArgumentParser(description="Load the Olympics CSV files into MySQL")
+    parser.add_argument('--csv', default=ATHLETE_EVENTS_CSV,
+                        help="athlete events CSV to load")
+    parser.add_argument('--stream', action='store_true',
+                        help="read athlete_events.csv in chunks with bounded memory")
+    parser.add_argument('--incremental', action='store_true',
+                        help="load only new or changed Games instead of rebuilding all tables")
+    parser.add_argument('--chunk-size', type=int, default=LOAD_CHUNK_SIZE,
+                        help="rows per chunk in streaming and incremental mode")
+    args = parser.parse_args()
+
+    mode = 'incremental' if args.incremental else 'stream' if args.stream else 'full'
+    with run_report('load_data', mode=mode, csv=args.csv):
+        if args.incremental:
+            load_data_incremental(args.csv, args.chunk_size)
+        elif args.stream:
+            load_data_streaming(args.csv, args.chunk_size)
+        else:
+            load_data_to_db(args.csv)
+    print_pool_metrics()
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+from config import OUTLIER_COLUMNS
+
+# Threshold of each method when none is given: standard deviations from the
+# mean, scaled MADs from the median, or IQRs beyond the quartiles
+DEFAULT_THRESHOLDS = {
+    'sigma': 3.0,
+    'mad': 3.5,
+    'iqr': 1.5
+}
+
+# Scales the median absolute deviation to the standard deviation of a
+# normal distribution
+MAD_SCALE = 1.4826
+
+def _group_keys(df, group_by):
+    """Grouping keys for ``groupby``; a single constant group without
+    ``group_by``"""
+    if not group_by:
+        return np.zeros(len(df), dtype=np.int64)
+    return [df[key] for key in group_by]
+
+def _row_groups(df, group_by):
+    """Group label of every row, matching the index of grouped statistics"""
+    if not group_by:
+        return pd.Index(np.zeros(len(df), dtype=np.int64))
+    if len(group_by) == 1:
+        return pd.Index(df[group_by[0]])
+    return pd.MultiIndex.from_frame(df[group_by])
+
+def _measurements(df, columns, dtype=None):
+    values = df[columns].apply(pd.to_numeric, errors='coerce')
+    return values.astype(dtype) if dtype else values
+
+def outlier_bounds(df, columns=OUTLIER_COLUMNS, method='sigma', threshold=None, group_by=None):
+    """Lower and upper bounds of the non-outlier values of each column.
+
+    Returns two frames indexed by group (one row without ``group_by``) with
+    a column per measurement. All columns are aggregated together, per group
+    when ``group_by`` names grouping columns of ``df``.
+    """
+    if method not in DEFAULT_THRESHOLDS:
+        raise ValueError(f"Unknown outlier method: {method}")
+    threshold = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+    # Statistics are accumulated in double precision even for float32 frames
+    values = _measurements(df, columns, 'float64')
+    keys = _group_keys(df, group_by)
+    grouped = values.groupby(keys, dropna=False, sort=False, observed=True)
+
+    if method == 'sigma':
+        center, spread = grouped.mean(), grouped.std()
+        return center - threshold * spread, center + threshold * spread
+    if method == 'mad':
+        center = grouped.median()
+        row_center = center.reindex(_row_groups(df, group_by)).to_numpy()
+        deviation = (values - row_center).abs()
+        spread = deviation.groupby(keys, dropna=False, sort=False, observed=True).median() * MAD_SCALE
+        return center - threshold * spread, center + threshold * spread
+    q1, q3 = grouped.quantile(0.25), grouped.quantile(0.75)
+    spread = q3 - q1
+    return q1 - threshold * spread, q3 + threshold * spread
+
+def sigma_bounds(means, stds, threshold=None):
+    """Global bounds from per-column means and standard deviations computed
+    elsewhere, e.g. by the database"""
+    threshold = DEFAULT_THRESHOLDS['sigma'] if threshold is None else threshold
+    center = pd.DataFrame([means], index=[0])
+    spread = pd.DataFrame([stds], index=[0])
+    return center - threshold * spread, center + threshold * spread
+
+def remove_outliers(df, bounds, group_by=None):
+    """Replace values outside ``bounds`` with NaN in one vectorized pass.
+
+    ``bounds`` is a (low, high) pair as returned by ``outlier_bounds`` or
+    ``RunningStats.bounds`` for the same ``group_by``. Values of groups
+    without bounds, or with NaN bounds, are kept. Returns the frame and the
+    number of values removed per column.
+    """
+    low, high = bounds
+    columns = list(low.columns)
+    values = _measurements(df, columns)
+    rows = _row_groups(df, group_by)
+    outside = ((values.to_numpy() < low.reindex(rows).to_numpy()) |
+               (values.to_numpy() > high.reindex(rows).to_numpy()))
+    df[columns] = values.mask(outside)
+    return df, dict(zip(columns, outside.sum(axis=0).tolist()))
+
+class RunningStats:
+    """Mergeable count, mean and sum of squared deviations per group and
+    column, for 3-sigma bounds over data read in chunks.
+
+    ``update`` folds in a chunk and ``merge`` another RunningStats, using the
+    pairwise update of Chan et al., so partial statistics of separate chunks
+    or workers combine exactly. Medians and quantiles do not merge, so MAD
+    and IQR bounds need the whole frame.
+    """
+
+    def __init__(self, columns=OUTLIER_COLUMNS, group_by=None):
+        self.columns = list(columns)
+        self.group_by = group_by
+        self.count = None
+        self.mean = None
+        self.m2 = None
+
+    def update(self, df):
+        grouped = _measurements(df, self.columns, 'float64').groupby(_group_keys(df, self.group_by),
+                                                                     dropna=False, sort=False, observed=True)
+        count = grouped.count()
+        self._combine(count, grouped.mean().fillna(0.0), (grouped.var(ddof=0) * count).fillna(0.0))
+        return self
+
+    def merge(self, other):
+        if other.count is not None:
+            self._combine(other.count, other.mean, other.m2)
+        return self
+
+    def _combine(self, count, mean, m2):
+        if self.count is None:
+            self.count, self.mean, self.m2 = count, mean, m2
+            return
+        index = self.count.index.union(count.index)
+        n_a, n_b = self.count.reindex(index, fill_value=0), count.reindex(index, fill_value=0)
+        mean_a, mean_b = self.mean.reindex(index, fill_value=0.0), mean.reindex(index, fill_value=0.0)
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        share = (n_b / n.where(n > 0)).fillna(0.0)
+        self.count = n
+        self.mean = mean_a + delta * share
+        self.m2 = (self.m2.reindex(index, fill_value=0.0) + m2.reindex(index, fill_value=0.0)
+                   + delta ** 2 * n_a * share)
+
+    def bounds(self, threshold=None):
+        """3-sigma (or ``threshold``-sigma) bounds, as from ``outlier_bounds``"""
+        threshold = DEFAULT_THRESHOLDS['sigma'] if threshold is None else threshold
+        mean = self.mean.where(self.count > 0)
+        std = np.sqrt(self.m2 / (self.count - 1).where(self.count > 1))
+        return mean - threshold * std, mean + threshold * std
@@ -0,0 +1,120 @@
+import re
+from sqlalchemy import text
+from config import PARTITION_RESULTS, PARTITION_FIRST_YEAR
+from bulk_writer import bulk_write, choose_strategy
+
+def partition_name(year, season):
+    """Partition of results holding the rows of one Games"""
+    if int(year) < PARTITION_FIRST_YEAR:
+        return f"p{PARTITION_FIRST_YEAR}_summer"
+    half = 'summer' if str(season).lower() < 't' else 'winter'
+    return f"p{int(year)}_{half}"
+
+def partition_predicate(year, season, alias=None):
+    """WHERE-clause fragment selecting one Games' results so that MySQL
+    prunes every other partition"""
+    prefix = f"{alias}." if alias else ""
+    season = str(season).replace("'", "''")
+    return f"{prefix}year = {int(year)} AND {prefix}season = '{season}'"
+
+def games_partition_filter(engine, game_ids, alias=None):
+    """WHERE-clause suffix that lets queries restricted to some game IDs
+    prune results partitions; empty when results is not partitioned"""
+    if not PARTITION_RESULTS or not game_ids:
+        return ""
+    id_list = ", ".join(str(int(game_id)) for game_id in game_ids)
+    with engine.connect() as conn:
+        games = conn.execute(text(f"SELECT DISTINCT year, season FROM games WHERE game_id IN ({id_list})")).fetchall()
+    if not games:
+        return ""
+    return " AND (" + " OR ".join(f"({partition_predicate(year, season, alias)})" for year, season in games) + ")"
+
+def partitioned_years(engine):
+    """Years that currently have their own results partitions"""
+    with engine.connect() as conn:
+        names = conn.execute(text(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'results'"
+        )).scalars().all()
+    return {int(m.group(1)) for m in (re.match(r"p(\d+)_", name or "") for name in names) if m}
+
+def ensure_partitions(engine, years):
+    """Split p_future so that every given year has its own partitions.
+
+    Rows are routed to partitions by MySQL from their year and season; this
+    only has to make sure a year later than the last partitioned one does
+    not fall into the catch-all partition.
+    """
+    if not PARTITION_RESULTS:
+        return
+    existing = partitioned_years(engine)
+    last = max(existing) if existing else PARTITION_FIRST_YEAR - 1
+    needed = max((int(year) for year in years), default=last)
+    if needed <= last:
+        return
+    new_parts = ", ".join(
+        f"PARTITION p{year}_summer VALUES LESS THAN ({year}, 'T'), "
+        f"PARTITION p{year}_winter VALUES LESS THAN ({year + 1}, '')"
+        for year in range(last + 1, needed + 1)
+    )
+    with engine.connect() as conn:
+        conn.execute(text(
+            f"ALTER TABLE results REORGANIZE PARTITION p_future INTO "
+            f"({new_parts}, PARTITION p_future VALUES LESS THAN (MAXVALUE, MAXVALUE))"
+        ))
+    print(f"Added results partitions for {last + 1}-{needed}")
+
+def next_result_id(engine):
+    with engine.connect() as conn:
+        return int(conn.execute(text("SELECT COALESCE(MAX(result_id), 0) + 1 FROM results")).scalar())
+
+class PartitionSwap:
+    """Replaces the results of whole Games by partition exchange.
+
+    Rows for each Games are written to an unpartitioned staging table with
+    the same structure as results; ``commit`` then swaps every staging table
+    with its Games' partition in one metadata operation, so the rest of the
+    table is never rewritten and readers never see a half-loaded Games.
+    Result IDs are assigned here because the staging tables do not share
+    results' auto-increment counter.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.staging = {}
+        self.next_id = next_result_id(engine)
+
+    def _staging_table(self, year, season):
+        partition = partition_name(year, season)
+        if partition not in self.staging:
+            table = f"results_swap_{partition}"
+            with self.engine.connect() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+                conn.execute(text(f"CREATE TABLE {table} LIKE results"))
+                conn.execute(text(f"ALTER TABLE {table} REMOVE PARTITIONING"))
+            self.staging[partition] = table
+        return self.staging[partition]
+
+    def write(self, results_df):
+        """Stage results rows; they must carry year and season"""
+        results_df = results_df.copy()
+        results_df.insert(0, 'result_id', range(self.next_id, self.next_id + len(results_df)))
+        self.next_id += len(results_df)
+        for (year, season), rows in results_df.groupby(['year', 'season'], sort=False, observed=True):
+            bulk_write(self.engine, rows, self._staging_table(year, season), choose_strategy('results', len(rows)))
+
+    def commit(self):
+        with self.engine.connect() as conn:
+            for partition, table in self.staging.items():
+                conn.execute(text(f"ALTER TABLE results EXCHANGE PARTITION {partition} WITH TABLE {table}"))
+                conn.execute(text(f"DROP TABLE {table}"))
+                print(f"Swapped in partition {partition}")
+            # Exchanged rows do not advance results' own counter
+            conn.execute(text(f"ALTER TABLE results AUTO_INCREMENT = {self.next_id}"))
+        self.staging = {}
+
+    def discard(self):
+        with self.engine.connect() as conn:
+            for table in self.staging.values():
+                conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        self.staging = {}
@@ -0,0 +1,278 @@
+import argparse
+import ast
+import hashlib
+import json
+import os
+from sqlalchemy import text, inspect
+from config import (ATHLETE_EVENTS_CSV, NOC_REGIONS_CSV, TABLE_DEPENDENCIES, TABLE_SCHEMAS, TABLE_INDEXES,
+                    METADATA_SCHEMAS, PARTITION_RESULTS, OUTLIER_COLUMNS, OUTLIER_METHOD, OUTLIER_THRESHOLD,
+                    OUTLIER_GROUP_BY, USE_SUMMARY_TABLES, LOAD_CHUNK_SIZE, CLEAN_CHUNK_SIZE, ANALYSIS_DIR,
+                    RENDER_FORMATS, PIPELINE_HASH_CACHE, ATHLETE_EVENTS_DTYPES, TABLE_DTYPES)
+from db import get_engine, print_pool_metrics
+from dialects import execute_ddl, get_dialect
+from query_cache import data_version
+from instrumentation import run_report, stage
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Plots written by the analyze stage, in each of RENDER_FORMATS; a missing
+# one makes the stage rerun
+ANALYSIS_OUTPUTS = ['medals_by_country', 'athlete_trends', 'sports_distribution', 'gender_distribution']
+
+def file_hash(path, cache_path=PIPELINE_HASH_CACHE):
+    """SHA-256 of a file, reused while its size and modification time are
+    unchanged"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    entry = cache.get(path)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['sha256']
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    cache[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, 'w') as f:
+        json.dump(cache, f, indent=2)
+    return digest.hexdigest()
+
+# Left out of the source hashes: each stage lists the settings it depends
+# on instead, so editing an unrelated setting reruns nothing
+UNHASHED_MODULES = {'config'}
+
+def _module_imports(tree):
+    """Names imported at module level, including inside ``try`` and ``if``
+    blocks but not in functions, which are imported only when called"""
+    pending = list(tree.body)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, ast.Import):
+            yield from (alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            yield node.module.split('.')[0]
+        elif isinstance(node, (ast.Try, ast.If)):
+            pending.extend(node.body + node.orelse + getattr(node, 'finalbody', [])
+                           + [child for handler in getattr(node, 'handlers', []) for child in handler.body])
+
+def local_imports(module):
+    """``module`` and every module of this directory it imports at module
+    level, directly or through other local modules"""
+    found, pending = set(), [module]
+    while pending:
+        name = pending.pop()
+        path = os.path.join(SCRIPTS_DIR, f"{name}.py")
+        if name in found or name in UNHASHED_MODULES or not os.path.exists(path):
+            continue
+        found.add(name)
+        with open(path) as f:
+            tree = ast.parse(f.read(), path)
+        pending.extend(_module_imports(tree))
+    return found
+
+def source_hashes(*modules):
+    """Hashes of the scripts implementing a stage: its entry modules and the
+    local modules they import, so editing any of them reruns it"""
+    found = set().union(*(local_imports(module) for module in modules))
+    return {f"{name}.py": file_hash(os.path.join(SCRIPTS_DIR, f"{name}.py")) for name in sorted(found)}
+
+# Inputs of each stage besides the fingerprint of the stage before it
+
+def schema_inputs(engine, options):
+    return {
+        'backend': get_dialect(engine).name,
+        'tables': {table: TABLE_SCHEMAS[table] for table in TABLE_DEPENDENCIES},
+        'indexes': TABLE_INDEXES,
+        'partition_results': PARTITION_RESULTS,
+        'sources': source_hashes('create_schema')
+    }
+
+def load_inputs(engine, options):
+    return {
+        'athlete_events': file_hash(options['csv']),
+        'noc_regions': file_hash(NOC_REGIONS_CSV),
+        'dtypes': {'athlete_events': ATHLETE_EVENTS_DTYPES, 'tables': TABLE_DTYPES},
+        'sources': source_hashes('load_data')
+    }
+
+def clean_inputs(engine, options):
+    return {
+        'method': options['clean_method'],
+        'stream': options['stream'],
+        'chunk_size': options['clean_chunk_size'],
+        'outliers': {'columns': OUTLIER_COLUMNS, 'method': OUTLIER_METHOD,
+                     'threshold': OUTLIER_THRESHOLD, 'group_by': OUTLIER_GROUP_BY},
+        'dtypes': TABLE_DTYPES,
+        'sources': source_hashes('clean_data')
+    }
+
+def analyze_inputs(engine, options):
+    return {
+        'use_summary_tables': USE_SUMMARY_TABLES,
+        'outputs': {f"{name}.{fmt}": os.path.exists(os.path.join(ANALYSIS_DIR, f"{name}.{fmt}"))
+                    for name in ANALYSIS_OUTPUTS for fmt in RENDER_FORMATS},
+        'sources': source_hashes('analyze')
+    }
+
+# The stages are imported when they run, so a rerun that only analyzes does
+# not import the loaders
+
+def run_create_schema(options):
+    from create_schema import create_schema
+    create_schema()
+
+def run_load(options):
+    from load_data import load_data_to_db, load_data_streaming
+    if options['stream']:
+        load_data_streaming(options['csv'], options['chunk_size'])
+    else:
+        load_data_to_db(options['csv'])
+
+def run_clean(options):
+    from clean_data import main
+    main(method=options['clean_method'], stream=options['stream'], chunk_size=options['clean_chunk_size'])
+
+def run_analyze(options):
+    from analyze import main
+    main()
+
+# Stages in order: name -> (run function, inputs function)
+STAGES = {
+    'create_schema': (run_create_schema, schema_inputs),
+    'load': (run_load, load_inputs),
+    'clean': (run_clean, clean_inputs),
+    'analyze': (run_analyze, analyze_inputs)
+}
+
+def fingerprints(engine, options):
+    """Fingerprint of every stage. Each one covers the fingerprint of the
+    stage before it, so a changed input reruns all later stages too."""
+    result, upstream = {}, None
+    for name, (_, inputs) in STAGES.items():
+        payload = json.dumps({'upstream': upstream, **inputs(engine, options)}, sort_keys=True, default=str)
+        upstream = result[name] = hashlib.sha256(payload.encode()).hexdigest()
+    return result
+
+def read_state(engine):
+    """Completed stages recorded in the database: name -> (fingerprint,
+    data version after the stage)"""
+    if 'pipeline_state' not in inspect(engine).get_table_names():
+        return {}
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT stage, fingerprint, data_version FROM pipeline_state")).fetchall()
+    state = {row.stage: (row.fingerprint, row.data_version) for row in rows}
+
+    # The state is only valid if the data was last changed by the pipeline:
+    # the last completed stage must have left the current data version
+    completed = [name for name in STAGES if name in state]
+    if completed and state[completed[-1]][1] != data_version(engine):
+        print("The database was changed outside the pipeline; running all stages")
+        return {}
+    return state
+
+def record_stage(engine, name, fingerprint):
+    with engine.begin() as conn:
+        execute_ddl(conn, METADATA_SCHEMAS['pipeline_state'])
+        conn.execute(text("DELETE FROM pipeline_state WHERE stage = :stage"), {'stage': name})
+        conn.execute(text("INSERT INTO pipeline_state (stage, fingerprint, data_version) "
+                          "VALUES (:stage, :fingerprint, :version)"),
+                     {'stage': name, 'fingerprint': fingerprint, 'version': data_version(engine)})
+
+def forget_stages(engine, names):
+    """Drop the state of stages about to rerun, so a failure leaves them
+    to be run again"""
+    if 'pipeline_state' not in inspect(engine).get_table_names():
+        return
+    with engine.begin() as conn:
+        for name in names:
+            conn.execute(text("DELETE FROM pipeline_state WHERE stage = :stage"), {'stage': name})
+
+def plan(engine, options, force=()):
+    """(stage, fingerprint, reason to run or None to skip) of every stage"""
+    current = fingerprints(engine, options)
+    state = read_state(engine)
+    steps, rerun = [], False
+    for name in STAGES:
+        if rerun:
+            reason = 'an earlier stage runs'
+        elif name in force:
+            reason = 'forced'
+        elif name not in state:
+            reason = 'not run yet'
+        elif state[name][0] != current[name]:
+            reason = 'inputs changed'
+        else:
+            reason = None
+        rerun = rerun or reason is not None
+        steps.append((name, current[name], reason))
+    return steps
+
+def run_pipeline(options, force=(), until=None):
+    """Run the stages whose inputs changed since they last completed.
+
+    A stage is skipped when its fingerprint matches the one recorded when it
+    last completed; once a stage runs, every later stage runs too. A failed
+    run leaves the stages before the failure recorded, so the next run
+    resumes at the failed stage.
+    """
+    if not os.path.exists(options['csv']):
+        raise FileNotFoundError(f"Athlete events CSV not found at: {options['csv']}")
+    engine = get_engine()
+    steps = plan(engine, options, force)
+    names = list(STAGES)
+    if until is not None:
+        steps = steps[:names.index(until) + 1]
+
+    forget_stages(engine, [name for name, _, reason in steps if reason])
+    for name, _, reason in steps:
+        if reason is None:
+            print(f"\n=== {name}: up to date, skipped ===")
+            continue
+        print(f"\n=== {name}: running ({reason}) ===")
+        with stage(name):
+            STAGES[name][0](options)
+        # Taken again now that the stage's outputs exist
+        record_stage(engine, name, fingerprints(engine, options)[name])
+    print("\nPipeline finished.")
+
+def print_status(options):
+    engine = get_engine()
+    print(f"{'Stage':<15} Status")
+    for name, _, reason in plan(engine, options):
+        print(f"{name:<15} {'up to date' if reason is None else 'to run: ' + reason}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run create_schema, load, clean and analyze, skipping stages whose inputs are unchanged")
+    parser.add_argument('--csv', default=ATHLETE_EVENTS_CSV,
+                        help="athlete events CSV to load")
+    parser.add_argument('--stream', action='store_true',
+                        help="load the CSV and clean results in chunks with bounded memory")
+    parser.add_argument('--chunk-size', type=int, default=LOAD_CHUNK_SIZE,
+                        help="rows per chunk of the CSV when loading with --stream")
+    parser.add_argument('--clean-chunk-size', type=int, default=CLEAN_CHUNK_SIZE,
+                        help="rows per chunk of results when cleaning with --stream")
+    parser.add_argument('--clean-method', choices=['sql', 'pandas'], default='sql',
+                        help="clean in the database with SQL, or round-trip through pandas")
+    parser.add_argument('--force', nargs='+', choices=list(STAGES), default=[], metavar='STAGE',
+                        help="rerun these stages (and the ones after them) even if up to date")
+    parser.add_argument('--until', choices=list(STAGES), default=None, metavar='STAGE',
+                        help="stop after this stage")
+    parser.add_argument('--status', action='store_true',
+                        help="show which stages would run, without running them")
+    args = parser.parse_args()
+    options = {'csv': args.csv, 'stream': args.stream, 'chunk_size': args.chunk_size,
+               'clean_chunk_size': args.clean_chunk_size, 'clean_method': args.clean_method}
+
+    if args.status:
+        print_status(options)
+    else:
+        with run_report('pipeline', force=args.force, until=args.until):
+            run_pipeline(options, force=args.force, until=args.until)
+        print_pool_metrics()
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import re
+import uuid
+import pandas as pd
+from sqlalchemy import text, inspect
+from dialects import execute_ddl
+from config import METADATA_SCHEMAS, QUERY_CACHE_ENABLED, QUERY_CACHE_DIR, QUERY_CACHE_MAX_BYTES
+
+try:
+    import pyarrow  # noqa: F401  (Parquet engine for pandas)
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+def bump_data_version(engine):
+    """Stamp the database with a new data version; called by every step that
+    changes the data, so cached query results from before are not reused"""
+    version = uuid.uuid4().hex
+    with engine.begin() as conn:
+        execute_ddl(conn, METADATA_SCHEMAS['data_version'])
+        updated = conn.execute(text("UPDATE data_version SET version = :version WHERE id = 1"),
+                               {'version': version}).rowcount
+        if not updated:
+            conn.execute(text("INSERT INTO data_version (id, version) VALUES (1, :version)"),
+                         {'version': version})
+    return version
+
+def data_version(engine):
+    """Current data version, or None when the database has never been stamped"""
+    if 'data_version' not in inspect(engine).get_table_names():
+        return None
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT version FROM data_version WHERE id = 1")).scalar()
+
+def normalize_sql(query):
+    """Collapse whitespace and drop the trailing semicolon so formatting
+    changes do not miss the cache"""
+    return re.sub(r"\s+", " ", query).strip().rstrip(";").strip()
+
+class QueryCache:
+    """On-disk cache of query results as Parquet files.
+
+    Entries are keyed by a hash of the data version, the database and the
+    normalized SQL. The cache is bounded by ``max_bytes``; the least recently
+    used entries (by file modification time, refreshed on every hit) are
+    evicted first.
+    """
+
+    def __init__(self, directory=QUERY_CACHE_DIR, max_bytes=QUERY_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, engine, query, version):
+        source = f"{version}\n{engine.url.render_as_string(hide_password=True)}\n{normalize_sql(query)}"
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            df = pd.read_parquet(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return df
+
+    def put(self, key, df):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.parquet'):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.parquet'):
+                os.remove(os.path.join(self.directory, name))
+
+_cache = None
+
+def get_query_cache():
+    """The process-wide query cache, or None when caching is off or no
+    Parquet engine is installed"""
+    global _cache
+    if not QUERY_CACHE_ENABLED or not HAS_PARQUET:
+        return None
+    if _cache is None:
+        _cache = QueryCache()
+    return _cache
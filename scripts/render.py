@@ -0,0 +1,75 @@
+import hashlib
+import inspect
+import json
+import os
+import matplotlib
+import matplotlib.pyplot as plt
+import pandas as pd
+import seaborn as sns
+from config import ANALYSIS_DIR, RENDER_FORMATS
+
+# Render manifests (one JSON file per figure) live here, next to the plots
+MANIFEST_DIR = '.render'
+
+def data_digest(df):
+    """Hash of a DataFrame's values, column names and dtypes"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([list(map(str, df.columns)), list(map(str, df.dtypes))]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def figure_digest(plot, df, figsize, formats=RENDER_FORMATS, params=None):
+    """Hash of everything a figure depends on: its data, the source of its
+    plot function, its size, parameters and formats, and the plotting
+    library versions"""
+    spec = {
+        'plot': inspect.getsource(plot),
+        'figsize': list(figsize),
+        'formats': sorted(formats),
+        'params': params or {},
+        'versions': [matplotlib.__version__, sns.__version__]
+    }
+    digest = hashlib.sha256(data_digest(df).encode())
+    digest.update(json.dumps(spec, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+def output_paths(stem, directory=ANALYSIS_DIR, formats=RENDER_FORMATS):
+    return [os.path.join(directory, f"{stem}.{fmt}") for fmt in formats]
+
+def _manifest_path(stem, directory):
+    return os.path.join(directory, MANIFEST_DIR, f"{stem}.json")
+
+def up_to_date(stem, digest, directory=ANALYSIS_DIR, formats=RENDER_FORMATS):
+    """Whether the figure was last rendered from the same inputs and all of
+    its files still exist"""
+    try:
+        with open(_manifest_path(stem, directory)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return manifest.get('digest') == digest and all(os.path.exists(path) for path in
+                                                    output_paths(stem, directory, formats))
+
+def _figure(figsize):
+    """A cleared figure of the given size, reused across renders in this
+    process instead of creating and destroying one per plot"""
+    return plt.figure(num=f"render {figsize[0]}x{figsize[1]}", figsize=figsize, clear=True)
+
+def render_figure(plot, df, stem, figsize, digest, directory=ANALYSIS_DIR, formats=RENDER_FORMATS, params=None):
+    """Draw a figure once and save it in every format.
+
+    ``plot(df, **params)`` draws onto the current pyplot figure. The manifest
+    recording ``digest`` is written after all files, so an interrupted
+    render is redone next time.
+    """
+    figure = _figure(figsize)
+    plot(df, **(params or {}))
+    for path in output_paths(stem, directory, formats):
+        figure.savefig(path)
+
+    manifest_path = _manifest_path(stem, directory)
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        json.dump({'digest': digest, 'files': [os.path.basename(p) for p in output_paths(stem, directory, formats)]},
+                  f, indent=2)
+    return stem
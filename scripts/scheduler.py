@@ -0,0 +1,63 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+def topological_order(steps):
+    """Step names with every step after the steps it depends on.
+
+    ``steps`` maps a name to a (function, dependencies) pair. Raises
+    ValueError on unknown dependencies and cycles.
+    """
+    order, done, visiting = [], set(), set()
+
+    def visit(name, path):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+        if name not in steps:
+            raise ValueError(f"Unknown step {name!r} required by {path[-1]!r}")
+        visiting.add(name)
+        for dependency in steps[name][1]:
+            visit(dependency, path + [name])
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+
+    for name in steps:
+        visit(name, [])
+    return order
+
+def run_dag(steps, inputs, max_workers=None, initializer=None):
+    """Run a DAG of steps on a process pool.
+
+    Each step is called as ``function(inputs[name], *outputs_of_dependencies)``
+    as soon as all of its dependencies have finished, so independent steps
+    run concurrently and the total time approaches the longest dependency
+    chain. Functions and their arguments must be picklable. With
+    ``max_workers=1`` the steps run in order in this process. Returns the
+    output of every step by name.
+    """
+    order = topological_order(steps)
+    outputs = {}
+
+    def arguments(name):
+        func, dependencies = steps[name]
+        return (func, inputs[name], *(outputs[dependency] for dependency in dependencies))
+
+    if max_workers == 1:
+        for name in order:
+            func, *args = arguments(name)
+            outputs[name] = func(*args)
+        return outputs
+
+    pending = list(order)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer) as executor:
+        running = {}
+        while pending or running:
+            for name in [name for name in pending if all(d in outputs for d in steps[name][1])]:
+                func, *args = arguments(name)
+                running[executor.submit(func, *args)] = name
+                pending.remove(name)
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                outputs[running.pop(future)] = future.result()
+    return outputs
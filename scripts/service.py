@@ -0,0 +1,381 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from decimal import Decimal
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+from sqlalchemy import event, text, inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+from config import DB_POOL_CONFIG, SERVICE_CONFIG
+from dialects import get_dialect
+
+def _season(value):
+    season = value.strip().capitalize()
+    if season not in ('Summer', 'Winter'):
+        raise ValueError(value)
+    return season
+
+def _noc(value):
+    noc = value.strip().upper()
+    if len(noc) != 3 or not noc.isalpha():
+        raise ValueError(value)
+    return noc
+
+def _limit(value):
+    limit = int(value)
+    if not 1 <= limit <= SERVICE_CONFIG['max_limit']:
+        raise ValueError(value)
+    return limit
+
+# Filters every analysis accepts: name -> (parse function, condition on the
+# results rows, aliases of the tables the condition needs joined)
+FILTERS = {
+    'year_from': (int, "g.year >= :year_from", ['g']),
+    'year_to': (int, "g.year <= :year_to", ['g']),
+    'season': (_season, "g.season = :season", ['g']),
+    'sport': (str.strip, "s.sport_name = :sport", ['e', 's']),
+    'noc': (_noc, "r.NOC = :noc", [])
+}
+
+# Joins from results to the tables filters refer to, in join order
+JOINS = {
+    'g': "JOIN games g ON r.game_id = g.game_id",
+    'e': "JOIN events e ON r.event_id = e.event_id",
+    's': "JOIN sports s ON e.sport_id = s.sport_id"
+}
+
+# The analyses of analyze.py as parameterized queries over the results fact
+# table: name -> (SQL with {joins} and {where} placeholders, conditions
+# always applied, default row limit or None for all rows). Sports only count
+# events that have results, so that filters apply to the event counts too.
+ENDPOINT_QUERIES = {
+    'medals_by_country': ("""
+    SELECT
+        c.Region AS Country,
+        COUNT(CASE WHEN r.medal = 'Gold' THEN 1 END) AS Gold,
+        COUNT(CASE WHEN r.medal = 'Silver' THEN 1 END) AS Silver,
+        COUNT(CASE WHEN r.medal = 'Bronze' THEN 1 END) AS Bronze,
+        COUNT(r.medal) AS Total_Medals
+    FROM results r
+    JOIN countries c ON r.NOC = c.NOC
+    {joins}
+    {where}
+    GROUP BY c.Region
+    ORDER BY Total_Medals DESC
+    """, ["r.medal IS NOT NULL"], 10),
+    'athlete_performance': ("""
+    SELECT
+        g.year,
+        g.season,
+        COUNT(DISTINCT r.athlete_id) AS Total_Athletes,
+        AVG(r.age) AS Avg_Age,
+        AVG(r.height_cm) AS Avg_Height,
+        AVG(r.weight_kg) AS Avg_Weight
+    FROM results r
+    JOIN games g ON r.game_id = g.game_id
+    {joins}
+    {where}
+    GROUP BY g.year, g.season
+    ORDER BY g.year
+    """, [], None),
+    'sports_distribution': ("""
+    SELECT
+        s.sport_name,
+        COUNT(DISTINCT e.event_id) AS Event_Count,
+        COUNT(DISTINCT r.athlete_id) AS Athlete_Count
+    FROM results r
+    JOIN events e ON r.event_id = e.event_id
+    JOIN sports s ON e.sport_id = s.sport_id
+    {joins}
+    {where}
+    GROUP BY s.sport_name
+    ORDER BY Event_Count DESC
+    """, [], None),
+    'gender_distribution': ("""
+    SELECT
+        g.year,
+        g.season,
+        a.sex,
+        COUNT(DISTINCT r.athlete_id) AS Athlete_Count
+    FROM results r
+    JOIN games g ON r.game_id = g.game_id
+    JOIN athletes a ON r.athlete_id = a.athlete_id
+    {joins}
+    {where}
+    GROUP BY g.year, g.season, a.sex
+    ORDER BY g.year
+    """, [], None)
+}
+
+def parse_filters(query_string):
+    """Filters of a request from its query string, sorted by name; raises
+    ValueError on unknown, repeated or malformed parameters"""
+    filters = {}
+    for key, values in parse_qs(query_string, keep_blank_values=True).items():
+        if key not in FILTERS and key != 'limit':
+            raise ValueError(f"Unknown parameter: {key}")
+        if len(values) > 1:
+            raise ValueError(f"Parameter given more than once: {key}")
+        parse = _limit if key == 'limit' else FILTERS[key][0]
+        try:
+            filters[key] = parse(values[0])
+        except ValueError:
+            raise ValueError(f"Invalid {key}: {values[0]!r}") from None
+    return dict(sorted(filters.items()))
+
+def build_query(name, filters):
+    """SQL and bound parameters of an analysis with ``filters`` applied"""
+    sql, conditions, limit = ENDPOINT_QUERIES[name]
+    conditions, aliases, params = list(conditions), set(), {}
+    for key, value in filters.items():
+        if key == 'limit':
+            continue
+        _, condition, needed = FILTERS[key]
+        conditions.append(condition)
+        aliases.update(needed)
+        params[key] = value
+    joins = [join for alias, join in JOINS.items() if alias in aliases and f" {alias} ON " not in sql]
+    sql = sql.format(joins="\n    ".join(joins),
+                     where=f"WHERE {' AND '.join(conditions)}" if conditions else "").rstrip()
+    limit = filters.get('limit', limit)
+    if limit is not None:
+        sql += "\n    LIMIT :limit"
+        params['limit'] = limit
+    return sql, params
+
+def _json_value(value):
+    # MySQL returns AVG() as Decimal
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+class ResponseCache:
+    """Response bodies by key, least recently used first out, each expiring
+    ``ttl`` seconds after it was stored"""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, body = entry
+        if time.monotonic() >= expires:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return body
+
+    def put(self, key, body):
+        self._entries[key] = (time.monotonic() + self.ttl, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+def create_service_engine():
+    """Async engine for the configured backend, pooled like DB_POOL_CONFIG"""
+    dialect = get_dialect()
+    engine = create_async_engine(
+        dialect.async_connection_url(),
+        pool_size=DB_POOL_CONFIG['pool_size'],
+        max_overflow=DB_POOL_CONFIG['max_overflow'],
+        pool_timeout=DB_POOL_CONFIG['pool_timeout'],
+        pool_recycle=DB_POOL_CONFIG['pool_recycle'],
+        pool_pre_ping=DB_POOL_CONFIG['pool_pre_ping']
+    )
+
+    @event.listens_for(engine.sync_engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        dialect.on_async_connect(dbapi_connection)
+
+    return engine
+
+class AnalyticsService:
+    """The analyses as parameterized JSON endpoints over HTTP/1.1.
+
+    Requests are served from one event loop. Identical requests arriving
+    while the first is still querying await that query instead of running
+    their own, and finished responses are cached by analysis, filters and
+    data version, so polling dashboards mostly hit the cache.
+    """
+
+    def __init__(self, engine, config=SERVICE_CONFIG):
+        self.engine = engine
+        self.config = config
+        self.cache = ResponseCache(config['cache_ttl'], config['cache_max_entries'])
+        self.in_flight = {}
+        self.stats = dict.fromkeys(['requests', 'cache_hits', 'coalesced', 'queries', 'errors'], 0)
+        self._version = None
+        self._version_checked = float('-inf')
+
+    def _shared(self, key, factory):
+        """The task in flight for ``key``, started from ``factory`` if there
+        is none; shielded so a client hanging up does not cancel it for the
+        others"""
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        return asyncio.shield(task)
+
+    async def data_version(self):
+        """The data version stamped by load and clean, re-read at most every
+        version_ttl seconds"""
+        if time.monotonic() - self._version_checked >= self.config['version_ttl']:
+            self._version = await self._shared(('data_version',), self._read_version)
+        return self._version
+
+    async def _read_version(self):
+        async with self.engine.connect() as conn:
+            if not await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table('data_version')):
+                version = None
+            else:
+                version = (await conn.execute(text("SELECT version FROM data_version WHERE id = 1"))).scalar()
+        self._version_checked = time.monotonic()
+        return version
+
+    async def analysis(self, name, filters):
+        """JSON body of an analysis and where it came from: 'hit' (cache),
+        'coalesced' (a query already in flight) or 'miss'"""
+        version = await self.data_version()
+        key = (name, tuple(filters.items()), version)
+        body = self.cache.get(key)
+        if body is not None:
+            self.stats['cache_hits'] += 1
+            return body, 'hit'
+        source = 'miss'
+        if key in self.in_flight:
+            self.stats['coalesced'] += 1
+            source = 'coalesced'
+        return await self._shared(key, lambda: self._query(key, name, filters, version)), source
+
+    async def _query(self, key, name, filters, version):
+        sql, params = build_query(name, filters)
+        self.stats['queries'] += 1
+        async with self.engine.connect() as conn:
+            result = await conn.execute(text(sql), params)
+            columns = list(result.keys())
+            rows = [dict(zip(columns, row)) for row in result.all()]
+        body = json.dumps({'analysis': name, 'filters': filters, 'data_version': version, 'rows': rows},
+                          default=_json_value).encode()
+        self.cache.put(key, body)
+        return body
+
+    def status(self):
+        pool = self.engine.sync_engine.pool
+        return {**self.stats, 'cached_responses': len(self.cache), 'in_flight': len(self.in_flight),
+                'pool': {'size': pool.size(), 'checked_out': pool.checkedout()}}
+
+    async def respond(self, method, target):
+        """(status, JSON body, extra headers) of one request"""
+        if method != 'GET':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': f"Method not allowed: {method}"}, {}
+        url = urlsplit(target)
+        path = url.path.rstrip('/')
+        if path == '/health':
+            return HTTPStatus.OK, {'status': 'ok'}, {}
+        if path == '/stats':
+            return HTTPStatus.OK, self.status(), {}
+        if path == '/analyses':
+            return HTTPStatus.OK, {name: {'filters': list(FILTERS) + ['limit'], 'default_limit': limit}
+                                   for name, (_, _, limit) in ENDPOINT_QUERIES.items()}, {}
+        name = path[len('/analyses/'):] if path.startswith('/analyses/') else None
+        if name not in ENDPOINT_QUERIES:
+            return HTTPStatus.NOT_FOUND, {'error': f"Not found: {url.path}"}, {}
+        try:
+            filters = parse_filters(url.query)
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {'error': str(e)}, {}
+        body, source = await self.analysis(name, filters)
+        return HTTPStatus.OK, body, {'X-Cache': source}
+
+    async def handle(self, reader, writer):
+        """Serve the requests of one client connection, keeping it open
+        between requests unless the client asks to close it"""
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), self.config['keep_alive_timeout'])
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+                headers = await _read_headers(reader)
+                if 'content-length' in headers:
+                    await reader.readexactly(int(headers['content-length']))
+
+                self.stats['requests'] += 1
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                    status, body, extra = await self.respond(method, target)
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                except ValueError:
+                    status, body, extra, keep_alive = HTTPStatus.BAD_REQUEST, {'error': "Bad request"}, {}, False
+                except Exception as e:
+                    print(f"Error serving {request_line!r}: {e}")
+                    self.stats['errors'] += 1
+                    status, body, extra, keep_alive = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}, {}, False
+
+                writer.write(_response(status, body, keep_alive, extra))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+async def _read_headers(reader, max_headers=100):
+    headers = {}
+    for _ in range(max_headers):
+        line = await reader.readline()
+        if not line.strip():
+            return headers
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    raise ConnectionError("Too many request headers")
+
+def _response(status, body, keep_alive, headers):
+    if not isinstance(body, bytes):
+        body = json.dumps(body, default=_json_value).encode()
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}",
+             "Content-Type: application/json",
+             f"Content-Length: {len(body)}",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body
+
+async def serve(host=SERVICE_CONFIG['host'], port=SERVICE_CONFIG['port']):
+    engine = create_service_engine()
+    service = AnalyticsService(engine)
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"Serving the analyses on http://{host}:{port}/analyses")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the Olympics analyses as JSON over HTTP")
+    parser.add_argument('--host', default=SERVICE_CONFIG['host'],
+                        help="address to listen on")
+    parser.add_argument('--port', type=int, default=SERVICE_CONFIG['port'],
+                        help="port to listen on")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nService stopped.")
@@ -0,0 +1,104 @@
+import re
+from sqlalchemy import text, inspect
+from config import TABLE_DEPENDENCIES, TABLE_SCHEMAS, TABLE_INDEXES
+from dialects import get_dialect, execute_ddl, set_foreign_key_checks
+from bulk_writer import bulk_write, choose_strategy
+from indexes import create_indexes
+
+SHADOW_SUFFIX = '__shadow'
+RETIRED_SUFFIX = '__old'
+
+def shadow_ddl(table, shadows):
+    """TABLE_SCHEMAS DDL of ``table`` creating its shadow, with the foreign
+    keys to parents in ``shadows`` pointing at their shadows"""
+    ddl = re.sub(rf"(CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?){table}\b", rf"\g<1>{shadows[table]}",
+                 TABLE_SCHEMAS[table], count=1, flags=re.IGNORECASE)
+    for parent, shadow in shadows.items():
+        ddl = re.sub(rf"\bREFERENCES\s+{parent}\s*\(", f"REFERENCES {shadow}(", ddl, flags=re.IGNORECASE)
+    return ddl
+
+class TableSwap:
+    """Replaces whole tables by loading shadow copies and swapping them in.
+
+    ``write`` bulk loads a table's new rows into ``<table>__shadow``, whose
+    foreign keys point at the other shadows, while the live tables stay
+    untouched and fully readable. ``commit`` swaps every shadow in at once:
+    on MySQL the shadows get their secondary indexes first and one RENAME
+    TABLE retires the live tables and renames the shadows (foreign keys
+    follow renamed tables); on SQLite, whose DDL is transactional, the live
+    tables are dropped, the shadows renamed and indexed in one transaction.
+    Readers see either the old tables or the new ones, and a failure before
+    the swap leaves the old ones in place.
+    """
+
+    def __init__(self, engine, tables):
+        self.engine = engine
+        self.dialect = get_dialect(engine)
+        # Parents first, so each shadow's parents exist when it is created
+        self.tables = [table for table in reversed(TABLE_DEPENDENCIES) if table in tables]
+        self.shadows = {table: f"{table}{SHADOW_SUFFIX}" for table in self.tables}
+        self._drop(self.shadows.values())
+        with engine.connect() as conn:
+            for table in self.tables:
+                execute_ddl(conn, shadow_ddl(table, self.shadows))
+            conn.commit()
+
+    def _drop(self, tables):
+        """Drop tables if they exist, children first"""
+        with self.engine.connect() as conn:
+            set_foreign_key_checks(conn, False)
+            for table in reversed(list(tables)):
+                conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+            set_foreign_key_checks(conn, True)
+            conn.commit()
+
+    def write(self, table, df):
+        bulk_write(self.engine, df, self.shadows[table], choose_strategy(table, len(df)))
+
+    def commit(self):
+        live = set(inspect(self.engine).get_table_names())
+        if self.dialect.transactional_ddl:
+            self._swap_in_transaction(live)
+        else:
+            self._swap_by_rename(live)
+        print(f"Swapped in {', '.join(self.tables)}")
+        self.shadows = {}
+
+    def _swap_by_rename(self, live):
+        # Built before the swap so the new tables are never read unindexed
+        create_indexes(self.engine, self.tables, targets=self.shadows)
+        retired = [f"{table}{RETIRED_SUFFIX}" for table in self.tables if table in live]
+        self._drop(retired)
+        renames = ([(table, f"{table}{RETIRED_SUFFIX}") for table in self.tables if table in live] +
+                   [(self.shadows[table], table) for table in self.tables])
+        with self.engine.connect() as conn:
+            for statement in self.dialect.rename_tables(renames):
+                conn.execute(text(statement))
+        self._drop(retired)
+
+    def _swap_in_transaction(self, live):
+        with self.engine.connect() as conn:
+            # Foreign key enforcement can only be switched outside a transaction
+            set_foreign_key_checks(conn, False)
+            conn.commit()
+            try:
+                conn.exec_driver_sql(self.dialect.begin_ddl())
+                for table in reversed(self.tables):
+                    if table in live:
+                        conn.execute(text(f"DROP TABLE {table}"))
+                for statement in self.dialect.rename_tables([(self.shadows[t], t) for t in self.tables]):
+                    conn.execute(text(statement))
+                for table in self.tables:
+                    for statement in self.dialect.add_indexes(table, TABLE_INDEXES.get(table, {})):
+                        conn.execute(text(statement))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                set_foreign_key_checks(conn, True)
+                conn.commit()
+
+    def discard(self):
+        self._drop(self.shadows.values())
+        self.shadows = {}
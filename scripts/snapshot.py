@@ -0,0 +1,168 @@
+import argparse
+import datetime
+import decimal
+import json
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import text, inspect
+from config import SNAPSHOT_DIR, SNAPSHOT_TABLES, SNAPSHOT_COMPRESSION, SNAPSHOT_CHUNK_SIZE
+from query_cache import data_version
+
+MANIFEST_FILE = 'snapshot.json'
+
+_ARROW_TYPES = {
+    int: pa.int64(),
+    float: pa.float64(),
+    decimal.Decimal: pa.float64(),
+    str: pa.string(),
+    datetime.datetime: pa.timestamp('us'),
+    datetime.date: pa.date32()
+}
+
+def _arrow_schema(engine, table):
+    """Arrow schema of a table from its SQL column types, so chunks with
+    all-NULL columns still get the right type"""
+    fields = []
+    for column in inspect(engine).get_columns(table):
+        try:
+            arrow_type = _ARROW_TYPES.get(column['type'].python_type, pa.string())
+        except NotImplementedError:
+            arrow_type = pa.string()
+        fields.append(pa.field(column['name'], arrow_type))
+    return pa.schema(fields)
+
+def export_table(engine, table, path):
+    """Stream one table into a Parquet file, a chunk per row group"""
+    schema = _arrow_schema(engine, table)
+    rows = 0
+    with engine.connect().execution_options(stream_results=True) as conn, \
+         pq.ParquetWriter(path, schema, compression=SNAPSHOT_COMPRESSION) as writer:
+        for chunk in pd.read_sql(text(f"SELECT * FROM {table}"), conn, chunksize=SNAPSHOT_CHUNK_SIZE):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    return rows
+
+def export_snapshot(engine, directory=SNAPSHOT_DIR, tables=SNAPSHOT_TABLES):
+    """Export the tables as a Parquet snapshot.
+
+    The snapshot is written next to ``directory`` and moved into place once
+    complete, so readers never see a partial snapshot. Its manifest records
+    the data version it was taken at.
+    """
+    print(f"\nExporting snapshot to {directory}...")
+    staging = f"{directory}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    manifest = {
+        'data_version': data_version(engine),
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'tables': {}
+    }
+    for table in tables:
+        rows = export_table(engine, table, os.path.join(staging, f"{table}.parquet"))
+        manifest['tables'][table] = rows
+        print(f"  {table}: {rows} rows")
+    with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    old = f"{directory}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(directory):
+        os.rename(directory, old)
+    os.rename(staging, directory)
+    shutil.rmtree(old, ignore_errors=True)
+    print("Snapshot exported")
+    return manifest
+
+class Snapshot:
+    """Read access to an exported snapshot.
+
+    Tables are read memory-mapped with only the requested columns, and row
+    filters are pushed down to the Parquet reader so row groups that cannot
+    match are skipped.
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+
+    @property
+    def data_version(self):
+        return self.manifest.get('data_version')
+
+    def read(self, table, columns=None, filters=None):
+        """``filters`` is a pyarrow expression or a list of (column, op, value)
+        tuples as accepted by ``pyarrow.parquet.read_table``"""
+        path = os.path.join(self.directory, f"{table}.parquet")
+        return pq.read_table(path, columns=columns, filters=filters, memory_map=True).to_pandas()
+
+def _medals_by_country(snapshot):
+    results = snapshot.read('results', ['NOC', 'medal'], pc.field('medal').is_valid())
+    countries = snapshot.read('countries', ['NOC', 'Region'])
+    df = results.merge(countries, on='NOC')
+    df = df.groupby('Region', dropna=False).agg(
+        Gold=('medal', lambda m: (m == 'Gold').sum()),
+        Silver=('medal', lambda m: (m == 'Silver').sum()),
+        Bronze=('medal', lambda m: (m == 'Bronze').sum()),
+        Total_Medals=('medal', 'count')
+    ).reset_index().rename(columns={'Region': 'Country'})
+    return df.sort_values('Total_Medals', ascending=False, kind='stable').head(10).reset_index(drop=True)
+
+def _athlete_performance(snapshot):
+    results = snapshot.read('results', ['game_id', 'athlete_id', 'age', 'height_cm', 'weight_kg'])
+    games = snapshot.read('games', ['game_id', 'year', 'season'])
+    df = results.merge(games, on='game_id')
+    df = df.groupby(['year', 'season']).agg(
+        Total_Athletes=('athlete_id', 'nunique'),
+        Avg_Age=('age', 'mean'),
+        Avg_Height=('height_cm', 'mean'),
+        Avg_Weight=('weight_kg', 'mean')
+    ).reset_index()
+    return df.sort_values('year', kind='stable').reset_index(drop=True)
+
+def _sports_distribution(snapshot):
+    sports = snapshot.read('sports', ['sport_id', 'sport_name'])
+    events = snapshot.read('events', ['event_id', 'sport_id'])
+    results = snapshot.read('results', ['event_id', 'athlete_id'])
+    df = sports.merge(events, on='sport_id', how='left').merge(results, on='event_id', how='left')
+    df = df.groupby('sport_name', dropna=False).agg(
+        Event_Count=('event_id', 'nunique'),
+        Athlete_Count=('athlete_id', 'nunique')
+    ).reset_index()
+    return df.sort_values('Event_Count', ascending=False, kind='stable').reset_index(drop=True)
+
+def _gender_distribution(snapshot):
+    results = snapshot.read('results', ['game_id', 'athlete_id'], pc.field('athlete_id').is_valid())
+    games = snapshot.read('games', ['game_id', 'year', 'season'])
+    athletes = snapshot.read('athletes', ['athlete_id', 'sex'])
+    df = results.merge(games, on='game_id').merge(athletes, on='athlete_id')
+    df = df.groupby(['year', 'season', 'sex'], dropna=False).agg(
+        Athlete_Count=('athlete_id', 'nunique')
+    ).reset_index()
+    return df.sort_values('year', kind='stable').reset_index(drop=True)
+
+# The analyze.py reports computed from a snapshot, by analysis name
+SNAPSHOT_ANALYSES = {
+    'medals_by_country': _medals_by_country,
+    'athlete_performance': _athlete_performance,
+    'sports_distribution': _sports_distribution,
+    'gender_distribution': _gender_distribution
+}
+
+def snapshot_analysis(name, directory=SNAPSHOT_DIR):
+    """Result of an analysis computed from the snapshot in ``directory``"""
+    return SNAPSHOT_ANALYSES[name](Snapshot(directory))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the Olympics tables as a Parquet snapshot")
+    parser.add_argument('--dir', default=SNAPSHOT_DIR, help="snapshot directory")
+    args = parser.parse_args()
+
+    from db import get_engine
+    export_snapshot(get_engine(), args.dir)
@@ -0,0 +1,147 @@
+from sqlalchemy import text
+from config import OUTLIER_COLUMNS, OUTLIER_METHOD, OUTLIER_THRESHOLD, OUTLIER_GROUP_BY
+from dialects import get_dialect, set_foreign_key_checks
+from outliers import DEFAULT_THRESHOLDS
+from partitions import games_partition_filter
+from instrumentation import staged
+
+def _trim(dialect, table, column):
+    return (f"trim {column}",
+            f"UPDATE {table} SET {column} = TRIM({column}) "
+            f"WHERE {dialect.char_length(column)} <> {dialect.char_length(f'TRIM({column})')}")
+
+def _fill_null(table, column, value):
+    return (f"fill missing {column}",
+            f"UPDATE {table} SET {column} = '{value}' WHERE {column} IS NULL")
+
+def _dedupe(dialect, table, id_column, key_exprs):
+    """Delete all but the lowest-ID row of each group of duplicate keys"""
+    match = " AND ".join(f"{expr.format(t='t1')} = {expr.format(t='t2')}" for expr in key_exprs)
+    return ("remove duplicates",
+            dialect.delete_joined(table, 't1', id_column, f"JOIN {table} t2 ON {match}",
+                                  f"t1.{id_column} > t2.{id_column}"))
+
+def _delete_orphans(dialect, table, id_column, column, parent, parent_column, scope=""):
+    return (f"remove rows with invalid {column}",
+            dialect.delete_joined(table, 'c', id_column,
+                                  f"LEFT JOIN {parent} p ON c.{column} = p.{parent_column}",
+                                  f"p.{parent_column} IS NULL{scope}"))
+
+def games_scope(game_ids, alias=None):
+    """SQL predicate suffix restricting results rows to some Games"""
+    if game_ids is None:
+        return ""
+    column = f"{alias}.game_id" if alias else "game_id"
+    return f" AND {column} IN ({', '.join(str(int(game_id)) for game_id in game_ids)})"
+
+def cleaning_steps(game_ids=None, engine=None):
+    """The set-based equivalent of the clean_*_data functions, by table.
+
+    Parents come before children so orphan checks see cleaned parents. Every
+    UPDATE only matches rows whose value actually changes. With ``game_ids``
+    only the results rows of those Games are cleaned and the other tables are
+    left alone; given the ``engine`` as well, those statements also prune
+    results partitions. Statements are written for the engine's backend, or
+    the configured one without an engine.
+    """
+    dialect = get_dialect(engine)
+    scope = games_scope(game_ids)
+    alias_scope = games_scope(game_ids, 'c')
+    if engine is not None:
+        scope += games_partition_filter(engine, game_ids)
+        alias_scope += games_partition_filter(engine, game_ids, 'c')
+    results = [
+        ("fill missing medal", f"UPDATE results SET medal = 'No Medal' WHERE medal IS NULL{scope}"),
+        _delete_orphans(dialect, 'results', 'result_id', 'athlete_id', 'athletes', 'athlete_id', alias_scope)
+    ]
+    if game_ids is not None:
+        return {'results': results}
+
+    capitalized_season = dialect.concat("UPPER(SUBSTR(season, 1, 1))", "LOWER(SUBSTR(season, 2))")
+    return {
+        'countries': [
+            _fill_null('countries', 'Region', 'Unknown'),
+            _fill_null('countries', 'Notes', ''),
+            ("normalize NOC",
+             f"UPDATE countries SET NOC = UPPER(TRIM(NOC)) "
+             f"WHERE {dialect.case_sensitive('NOC')} <> {dialect.case_sensitive('UPPER(TRIM(NOC))')}")
+        ],
+        'athletes': [
+            _fill_null('athletes', 'sex', 'Unknown'),
+            _trim(dialect, 'athletes', 'athlete_name')
+        ],
+        'sports': [
+            _dedupe(dialect, 'sports', 'sport_id', ["TRIM({t}.sport_name)"]),
+            _trim(dialect, 'sports', 'sport_name')
+        ],
+        'cities': [
+            _dedupe(dialect, 'cities', 'city_id', ["TRIM({t}.city_name)"]),
+            _trim(dialect, 'cities', 'city_name')
+        ],
+        'teams': [
+            _dedupe(dialect, 'teams', 'team_id', ["TRIM({t}.team_name)"]),
+            _trim(dialect, 'teams', 'team_name')
+        ],
+        'events': [
+            _delete_orphans(dialect, 'events', 'event_id', 'sport_id', 'sports', 'sport_id'),
+            _trim(dialect, 'events', 'event_name'),
+            _dedupe(dialect, 'events', 'event_id', ["{t}.event_name", "{t}.sport_id"])
+        ],
+        'games': [
+            _delete_orphans(dialect, 'games', 'game_id', 'city_id', 'cities', 'city_id'),
+            _trim(dialect, 'games', 'game_name'),
+            ("capitalize season",
+             f"UPDATE games SET season = {capitalized_season} "
+             f"WHERE {dialect.case_sensitive('season')} <> {dialect.case_sensitive(capitalized_season)}")
+        ],
+        'results': results
+    }
+
+def outlier_bounds(conn):
+    """Sigma bounds of each measurement over the whole results table"""
+    threshold = DEFAULT_THRESHOLDS['sigma'] if OUTLIER_THRESHOLD is None else OUTLIER_THRESHOLD
+    select = ", ".join(f"AVG({col}), STDDEV_SAMP({col})" for col in OUTLIER_COLUMNS)
+    row = conn.execute(text(f"SELECT {select} FROM results")).fetchone()
+    bounds = {}
+    for i, col in enumerate(OUTLIER_COLUMNS):
+        mean, std = row[2 * i], row[2 * i + 1]
+        if mean is not None and std is not None:
+            bounds[col] = (float(mean) - threshold * float(std), float(mean) + threshold * float(std))
+    return bounds
+
+@staged('clean in database', rows=lambda changed: sum(changed.values()))
+def clean_in_database(engine, game_ids=None):
+    """Clean the Olympics tables in place with set-based SQL.
+
+    Runs in a single transaction with foreign key checks off, like
+    save_cleaned_data. Returns the number of rows changed per table and step.
+    Only global sigma outlier bounds are computed in SQL; other outlier
+    settings raise ValueError so the caller can clean with pandas instead.
+    """
+    if OUTLIER_METHOD != 'sigma' or OUTLIER_GROUP_BY:
+        raise ValueError(f"outlier method {OUTLIER_METHOD!r} grouped by {OUTLIER_GROUP_BY} needs pandas")
+    changed = {}
+    scope = games_scope(game_ids) + games_partition_filter(engine, game_ids)
+
+    with engine.begin() as conn:
+        set_foreign_key_checks(conn, False)
+        try:
+            for table, steps in cleaning_steps(game_ids, engine).items():
+                print(f"\nCleaning {table} data in database...")
+                for name, sql in steps:
+                    rows = conn.execute(text(sql)).rowcount
+                    changed[(table, name)] = rows
+                    print(f"  {name}: {rows} rows")
+
+            # Outlier bounds depend on the data left after the steps above
+            for col, (low, high) in outlier_bounds(conn).items():
+                rows = conn.execute(
+                    text(f"UPDATE results SET {col} = NULL WHERE ({col} < :low OR {col} > :high){scope}"),
+                    {'low': low, 'high': high}
+                ).rowcount
+                changed[('results', f"null {col} outliers")] = rows
+                print(f"  null {col} outliers: {rows} rows")
+        finally:
+            set_foreign_key_checks(conn, True)
+
+    return changed
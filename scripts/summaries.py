@@ -0,0 +1,98 @@
+from sqlalchemy import text, inspect
+from config import SUMMARY_SCHEMAS
+from dialects import execute_ddl
+from instrumentation import staged
+
+def _in_list(column, ids):
+    return f"{column} IN ({', '.join(str(int(i)) for i in ids)})"
+
+def _medals_sql(game_filter="1 = 1"):
+    return f"""
+        INSERT INTO summary_medals (game_id, Region, medal, medal_count)
+        SELECT r.game_id, c.Region, r.medal, COUNT(*)
+        FROM results r
+        JOIN countries c ON r.NOC = c.NOC
+        WHERE r.medal IS NOT NULL AND {game_filter}
+        GROUP BY r.game_id, c.Region, r.medal
+    """
+
+def _participation_sql(game_filter="1 = 1"):
+    # Athletes have exactly one sex, so distinct athlete counts per sex add up
+    # to the distinct count per Games
+    return f"""
+        INSERT INTO summary_participation (game_id, year, season, sex, has_athlete, athlete_count,
+                                           age_sum, age_count, height_sum, height_count,
+                                           weight_sum, weight_count)
+        SELECT r.game_id, g.year, g.season, a.sex,
+               CASE WHEN a.athlete_id IS NULL THEN 0 ELSE 1 END,
+               COUNT(DISTINCT r.athlete_id),
+               SUM(r.age), COUNT(r.age),
+               SUM(r.height_cm), COUNT(r.height_cm),
+               SUM(r.weight_kg), COUNT(r.weight_kg)
+        FROM results r
+        JOIN games g ON r.game_id = g.game_id
+        LEFT JOIN athletes a ON r.athlete_id = a.athlete_id
+        WHERE {game_filter}
+        GROUP BY r.game_id, g.year, g.season, a.sex, CASE WHEN a.athlete_id IS NULL THEN 0 ELSE 1 END
+    """
+
+def _sports_sql(sport_filter="1 = 1"):
+    return f"""
+        INSERT INTO summary_sports (sport_id, sport_name, event_count, athlete_count)
+        SELECT s.sport_id, s.sport_name, COUNT(DISTINCT e.event_id), COUNT(DISTINCT r.athlete_id)
+        FROM sports s
+        LEFT JOIN events e ON s.sport_id = e.sport_id
+        LEFT JOIN results r ON e.event_id = r.event_id
+        WHERE {sport_filter}
+        GROUP BY s.sport_id, s.sport_name
+    """
+
+def summaries_available(engine):
+    """Whether all summary tables exist"""
+    return set(SUMMARY_SCHEMAS) <= set(inspect(engine).get_table_names())
+
+@staged('build summaries')
+def build_summaries(engine):
+    """Recreate every summary table from the fact and dimension tables"""
+    print("\nBuilding summary tables...")
+    with engine.begin() as conn:
+        for table, schema in SUMMARY_SCHEMAS.items():
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+            execute_ddl(conn, schema)
+        conn.execute(text(_medals_sql()))
+        conn.execute(text(_participation_sql()))
+        conn.execute(text(_sports_sql()))
+    print("Summary tables built")
+
+@staged('refresh summaries')
+def refresh_summaries(engine, game_ids):
+    """Recompute the summary rows affected by changed results of some Games.
+
+    Medal and participation rows are stored per Games and are replaced for
+    just those Games. Distinct athlete counts per sport do not add up across
+    Games, so the sports of those Games are recomputed in full.
+    """
+    game_ids = list(game_ids)
+    if not game_ids:
+        return
+    if not summaries_available(engine):
+        build_summaries(engine)
+        return
+
+    print(f"\nRefreshing summary tables for {len(game_ids)} Games...")
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM summary_medals WHERE {_in_list('game_id', game_ids)}"))
+        conn.execute(text(_medals_sql(_in_list('r.game_id', game_ids))))
+
+        conn.execute(text(f"DELETE FROM summary_participation WHERE {_in_list('game_id', game_ids)}"))
+        conn.execute(text(_participation_sql(_in_list('r.game_id', game_ids))))
+
+        sport_ids = conn.execute(text(
+            f"SELECT DISTINCT e.sport_id FROM results r JOIN events e ON r.event_id = e.event_id "
+            f"WHERE {_in_list('r.game_id', game_ids)}"
+        )).scalars().all()
+        sport_ids = [sport_id for sport_id in sport_ids if sport_id is not None]
+        if sport_ids:
+            conn.execute(text(f"DELETE FROM summary_sports WHERE {_in_list('sport_id', sport_ids)}"))
+            conn.execute(text(_sports_sql(_in_list('s.sport_id', sport_ids))))
+    print("Summary tables refreshed")
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+class DimensionKeys:
+    """Assigns surrogate IDs for one dimension table in-process.
+
+    Members are identified by their natural key columns (e.g. event name and
+    sport name) and numbered in order of first appearance. Known keys are held
+    in a pandas index, so mapping a frame to IDs is a factorize of its key
+    columns followed by one hash join of the distinct keys against that index.
+    """
+
+    def __init__(self, table, id_column, key_columns):
+        self.table = table
+        self.id_column = id_column
+        self.key_columns = list(key_columns)
+        self._known = pd.Series(dtype='int64')
+        self.next_id = 1
+
+    def __len__(self):
+        return len(self._known)
+
+    def seed(self, members):
+        """Register existing members, e.g. read back from the database.
+
+        ``members`` holds the key columns and the ID column; numbering of new
+        members continues after the largest seeded ID.
+        """
+        if len(members) == 0:
+            return
+        codes, uniques = self._factorize(members)
+        ids = members[self.id_column].to_numpy(dtype='int64')
+        _, first_positions = np.unique(codes, return_index=True)
+        added = pd.Series(ids[first_positions], index=uniques)
+        self._known = added if len(self._known) == 0 else pd.concat([self._known, added])
+        self.next_id = max(self.next_id, int(ids.max()) + 1)
+
+    def ids(self):
+        """IDs of every registered member"""
+        return self._known.to_numpy()
+
+    def _factorize(self, df):
+        keys = df[self.key_columns]
+        if len(self.key_columns) == 1:
+            index = pd.Index(keys.iloc[:, 0])
+        else:
+            index = pd.MultiIndex.from_frame(keys)
+        return index.factorize()
+
+    def _known_ids(self, uniques):
+        if len(self._known) == 0:
+            return np.full(len(uniques), np.nan)
+        return self._known.reindex(uniques).to_numpy(dtype='float64', copy=True)
+
+    def encode(self, df):
+        """Map each row of ``df`` to its surrogate ID, registering unseen keys.
+
+        Returns the IDs (a nullable integer array aligned with ``df``; rows
+        with a missing key get NA) and a DataFrame holding the first row of
+        ``df`` for every newly registered key, with the ID column added.
+        """
+        codes, uniques = self._factorize(df)
+        ids = self._known_ids(uniques)
+
+        is_new = np.isnan(ids)
+        n_new = int(is_new.sum())
+        ids[is_new] = np.arange(self.next_id, self.next_id + n_new)
+        self.next_id += n_new
+        ids = ids.astype('int64')
+
+        if n_new:
+            added = pd.Series(ids[is_new], index=uniques[is_new])
+            self._known = added if len(self._known) == 0 else pd.concat([self._known, added])
+
+        # First occurrence of each distinct key, for the new members' attributes
+        present = codes >= 0
+        _, first_positions = np.unique(codes[present], return_index=True)
+        first_positions = np.flatnonzero(present)[first_positions]
+        new_members = df.iloc[first_positions[is_new]].copy()
+        new_members[self.id_column] = ids[is_new]
+
+        return pd.array(ids, dtype='Int64').take(codes, allow_fill=True), new_members
+
+    def lookup(self, df):
+        """Map rows of ``df`` to existing IDs without registering anything"""
+        codes, uniques = self._factorize(df)
+        ids = pd.array(self._known_ids(uniques), dtype='Int64')
+        return ids.take(codes, allow_fill=True)
@@ -0,0 +1,126 @@
+import os
+import time
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+from config import FOREIGN_KEYS, VALIDATION_CREATE_PARENTS, VALIDATION_QUARANTINE_DIR
+from bulk_writer import bulk_write
+
+def foreign_keys(table):
+    """(column, parent table, parent column) of each logical foreign key of
+    a table, whether or not its schema can declare it"""
+    return FOREIGN_KEYS.get(table, [])
+
+def referenced_columns(table):
+    """Columns of ``table`` that foreign keys of other tables reference"""
+    return sorted({parent_column for child in FOREIGN_KEYS
+                   for _, parent, parent_column in foreign_keys(child) if parent == table})
+
+def find_orphans(values, parent_keys):
+    """Mask of the non-null values missing from ``parent_keys``: one hash
+    anti-join of the column against the parent's keys"""
+    return values.notna().to_numpy() & ~values.isin(parent_keys).to_numpy()
+
+@dataclass
+class Violation:
+    table: str
+    column: str
+    parent: str
+    action: str
+    rows: int = 0
+    keys: set = field(default_factory=set)
+
+class ReferentialValidator:
+    """Checks frames against the foreign keys in FOREIGN_KEYS before they
+    are written, so the loaders can write with foreign key checks off.
+
+    Each foreign key column is anti-joined against the parent keys passed to
+    ``check``, minus the rows quarantined so far. Orphan keys of a parent in
+    ``create_parents`` get new members, built once by
+    ``create[parent](keys, source)`` and written before the rows that
+    reference them; other orphan rows are appended to a CSV per table under
+    ``quarantine_dir`` and left out of the load.
+    """
+
+    def __init__(self, engine, create=None, create_parents=VALIDATION_CREATE_PARENTS,
+                 quarantine_dir=VALIDATION_QUARANTINE_DIR):
+        self.engine = engine
+        self.create = {parent: build for parent, build in (create or {}).items() if parent in create_parents}
+        self.quarantine_dir = os.path.join(quarantine_dir, time.strftime('%Y%m%d-%H%M%S'))
+        self.created = {}       # (parent, column) -> keys of created members
+        self.quarantined = {}   # (table, column) -> keys of quarantined rows
+        self.violations = {}    # (table, column) -> Violation
+
+    def _violation(self, table, column, parent, action):
+        if (table, column) not in self.violations:
+            self.violations[(table, column)] = Violation(table, column, parent, action)
+        return self.violations[(table, column)]
+
+    def _orphans(self, values, parent, parent_column, parent_keys):
+        mask = find_orphans(values, parent_keys)
+        quarantined = self.quarantined.get((parent, parent_column))
+        if quarantined is not None:
+            mask |= values.isin(quarantined).to_numpy()
+        return mask
+
+    def check(self, table, df, parents, source=None):
+        """Rows of ``df`` whose foreign keys all reference a parent row.
+
+        ``parents`` maps each parent table to the keys it holds once the
+        current batch is written. ``source`` (e.g. the CSV rows the batch
+        came from) is passed on to the functions building new members.
+        """
+        quarantine = np.zeros(len(df), dtype=bool)
+        reasons = np.full(len(df), '', dtype=object)
+        for column, parent, parent_column in foreign_keys(table):
+            if parent not in parents:
+                raise ValueError(f"No keys of {parent} to check {table}.{column} against")
+            values = df[column]
+            mask = self._orphans(values, parent, parent_column, parents[parent])
+            if not mask.any():
+                continue
+            keys = pd.unique(values.to_numpy()[mask])
+
+            if parent in self.create:
+                created = self.created.get((parent, parent_column), pd.Index([]))
+                new_keys = pd.Index(keys).difference(created)
+                if len(new_keys):
+                    bulk_write(self.engine, self.create[parent](new_keys, source), parent)
+                    self.created[(parent, parent_column)] = created.append(new_keys)
+                violation = self._violation(table, column, parent, 'created')
+            else:
+                reasons[mask & ~quarantine] = f"{column} -> {parent}({parent_column})"
+                quarantine |= mask
+                violation = self._violation(table, column, parent, 'quarantined')
+            violation.rows += int(mask.sum())
+            violation.keys.update(keys)
+
+        if not quarantine.any():
+            return df
+        self._quarantine(table, df[quarantine].assign(violation=reasons[quarantine]))
+        return df[~quarantine]
+
+    def _quarantine(self, table, rows):
+        """Append rows to the table's quarantine file and remember their keys,
+        so rows referencing them are quarantined too"""
+        for column in referenced_columns(table):
+            keys = pd.Index(rows[column].dropna().unique())
+            quarantined = self.quarantined.get((table, column))
+            self.quarantined[(table, column)] = keys if quarantined is None else quarantined.append(keys)
+        os.makedirs(self.quarantine_dir, exist_ok=True)
+        path = os.path.join(self.quarantine_dir, f"{table}.csv")
+        rows.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+
+    def report(self):
+        """Print the violations found, by foreign key"""
+        if not self.violations:
+            print("Referential integrity: no foreign key violations")
+            return
+        print("Referential integrity violations:")
+        for violation in self.violations.values():
+            sample = ", ".join(map(str, sorted(violation.keys, key=str)[:5]))
+            more = ", ..." if len(violation.keys) > 5 else ""
+            print(f"  {violation.table}.{violation.column} -> {violation.parent}: "
+                  f"{violation.rows} rows, {len(violation.keys)} orphan keys ({sample}{more}), {violation.action}")
+        if any(violation.action == 'quarantined' for violation in self.violations.values()):
+            print(f"  Quarantined rows written to {self.quarantine_dir}")